@@ -1,70 +1,286 @@
 #!/usr/bin/env python3
-import boto3
+# Only what the first prompt needs is imported here; boto3, the rest of rich
+# and prompt_toolkit are imported by the functions that use them so the
+# script starts fast (see check_startup.py at the repository root)
 from rich.console import Console
-from rich.table import Table
-from rich.prompt import Prompt
+from rich.prompt import Prompt, Confirm
 from rich import print as rprint
+import argparse
+import hashlib
+import json
+import os
 import subprocess
 import sys
-from botocore.exceptions import ProfileNotFound, ClientError
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 
-def get_ec2_instances(profile_name, region):
-    """Get list of EC2 instances for the selected profile and region"""
+CACHE_DIR = os.path.expanduser(os.path.join('~', '.cache', 'connect_ec2'))
+MAX_REGION_WORKERS = 8
+# Rows shown in the instance table; the rest are reachable through the search
+TABLE_LIMIT = 50
+SEARCH_RESULTS = 15
+
+def get_cache_path(profile_name, regions=None, filters=None):
+    """Cache file of the inventory listed with these regions and filters
+
+    Filtered listings get their own file so they never replace the full
+    inventory of the profile, nor show up in a later run without filters.
+    """
+    if not regions and not filters:
+        return os.path.join(CACHE_DIR, f"{profile_name}.json")
+    scope = json.dumps({'regions': sorted(regions or []), 'filters': filters or []}, sort_keys=True)
+    digest = hashlib.sha1(scope.encode()).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"{profile_name}-{digest}.json")
+
+def load_cached_instances(profile_name, regions=None, filters=None):
+    """Load the last known inventory for the profile and scope, or None if there is none"""
     try:
-        session = boto3.Session(profile_name=profile_name, region_name=region)
-        ec2_client = session.client('ec2')
-        instances = ec2_client.describe_instances()
-        
-        instance_list = []
-        for reservation in instances['Reservations']:
+        with open(get_cache_path(profile_name, regions, filters)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_cached_instances(profile_name, instances, regions=None, filters=None):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = get_cache_path(profile_name, regions, filters)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'updated': datetime.now().isoformat(timespec='seconds'), 'instances': instances}, f)
+    os.replace(tmp_path, path)
+
+def build_filters(states=None, tags=None):
+    """Build server-side describe_instances filters from states and Key=Value tags"""
+    filters = []
+    if states:
+        filters.append({'Name': 'instance-state-name', 'Values': list(states)})
+    for tag in tags or []:
+        key, _, value = tag.partition('=')
+        filters.append({'Name': f'tag:{key}', 'Values': [value or '*']})
+    return filters
+
+def get_enabled_regions(profile_name):
+    """Regions enabled for the account of the profile"""
+    import boto3
+    session = boto3.Session(profile_name=profile_name)
+    ec2_client = session.client('ec2', region_name=session.region_name or 'us-east-1')
+    response = ec2_client.describe_regions(AllRegions=False)
+    return sorted(region['RegionName'] for region in response['Regions'])
+
+def get_ec2_instances(profile_name, region, filters=None):
+    """Get list of EC2 instances for the selected profile and region"""
+    import boto3
+    # Sessions are not thread-safe, so each region gets its own
+    session = boto3.Session(profile_name=profile_name, region_name=region)
+    ec2_client = session.client('ec2')
+    paginator = ec2_client.get_paginator('describe_instances')
+
+    instance_list = []
+    for page in paginator.paginate(Filters=filters or []):
+        for reservation in page['Reservations']:
             for instance in reservation['Instances']:
                 # Get instance name from tags
-                name = "No Name"
-                if 'Tags' in instance:
-                    for tag in instance['Tags']:
-                        if tag['Key'] == 'Name':
-                            name = tag['Value']
-                            break
-                
+                tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
+                name = tags.get('Name', "No Name")
+
                 instance_list.append({
                     'InstanceId': instance['InstanceId'],
                     'Name': name,
+                    'Tags': tags,
                     'State': instance['State']['Name'],
                     'PublicIp': instance.get('PublicIpAddress', 'N/A'),
-                    'PrivateIp': instance.get('PrivateIpAddress', 'N/A')
+                    'PrivateIp': instance.get('PrivateIpAddress', 'N/A'),
+                    'Region': region
                 })
-        return instance_list
-    except ProfileNotFound:
-        rprint("[red]Error: Profile not found[/red]")
-        sys.exit(1)
-    except ClientError as e:
-        rprint(f"[red]Error: {str(e)}[/red]")
-        sys.exit(1)
-    except Exception as e:
-        rprint(f"[red]Error: {str(e)}[/red]")
-        sys.exit(1)
+    return instance_list
 
-def display_instances(instances):
-    """Display EC2 instances in a rich table"""
-    table = Table(title="EC2 Instances")
+def get_ssm_ping_status(profile_name, region):
+    """Map instance ID -> SSM agent ping status for the managed instances of a region"""
+    import boto3
+    session = boto3.Session(profile_name=profile_name, region_name=region)
+    ssm_client = session.client('ssm')
+    paginator = ssm_client.get_paginator('describe_instance_information')
+
+    ping_status = {}
+    for page in paginator.paginate(PaginationConfig={'PageSize': 50}):
+        for info in page['InstanceInformationList']:
+            ping_status[info['InstanceId']] = info['PingStatus']
+    return ping_status
+
+def refresh_inventory(profile_name, regions, filters, on_progress=None):
+    """Describe instances and their SSM status in all regions in parallel
+
+    The EC2 and SSM calls of each region run at the same time and are joined
+    by instance ID; instances unknown to SSM are marked 'Not managed'. If SSM
+    cannot be queried in a region its instances are marked 'Unknown'.
+    Returns (instances, errors) where errors maps region -> message.
+    on_progress(done, total) is called each time a region finishes.
+    """
+    instances, errors = [], {}
+    ping_status, ssm_errors = {}, set()
+    with ThreadPoolExecutor(max_workers=MAX_REGION_WORKERS * 2) as executor:
+        futures = {}
+        for region in regions:
+            futures[executor.submit(get_ec2_instances, profile_name, region, filters)] = ('ec2', region)
+            futures[executor.submit(get_ssm_ping_status, profile_name, region)] = ('ssm', region)
+        pending = {region: 2 for region in regions}
+        done = 0
+        for future in as_completed(futures):
+            kind, region = futures[future]
+            try:
+                if kind == 'ec2':
+                    instances.extend(future.result())
+                else:
+                    ping_status.update(future.result())
+            except Exception as e:
+                if kind == 'ec2':
+                    errors[region] = str(e)
+                else:
+                    ssm_errors.add(region)
+            pending[region] -= 1
+            if not pending[region]:
+                done += 1
+                if on_progress:
+                    on_progress(done, len(regions))
+
+    for instance in instances:
+        default = 'Unknown' if instance['Region'] in ssm_errors else 'Not managed'
+        instance['PingStatus'] = ping_status.get(instance['InstanceId'], default)
+    instances.sort(key=lambda i: (i['Region'], i['Name'], i['InstanceId']))
+    return instances, errors
+
+def format_ping_status(ping_status):
+    color = {'Online': 'green', 'ConnectionLost': 'red', 'Inactive': 'red', 'Not managed': 'dim'}.get(ping_status, 'yellow')
+    return f"[{color}]{ping_status}[/{color}]"
+
+def build_table(instances, title="EC2 Instances"):
+    """Build the rich table for the given instances"""
+    from rich.table import Table
+    table = Table(title=title)
     table.add_column("Name", style="cyan")
     table.add_column("Instance ID", style="magenta")
     table.add_column("State", style="bold")
+    table.add_column("SSM")
+    table.add_column("Region", style="yellow")
     table.add_column("Public IP", style="green")
     table.add_column("Private IP", style="blue")
 
-    for instance in instances:
+    for instance in instances[:TABLE_LIMIT]:
         state_color = "green" if instance['State'] == 'running' else "red"
         table.add_row(
             instance['Name'],
             instance['InstanceId'],
             f"[{state_color}]{instance['State']}[/{state_color}]",
+            format_ping_status(instance.get('PingStatus', 'N/A')),
+            instance.get('Region', 'N/A'),
             instance['PublicIp'],
             instance['PrivateIp']
         )
+    if len(instances) > TABLE_LIMIT:
+        table.caption = f"... and {len(instances) - TABLE_LIMIT} more, type to search them"
+    return table
 
+def display_instances(instances):
+    """Display EC2 instances in a rich table"""
     console = Console()
-    console.print(table)
+    console.print(build_table(instances))
+
+def load_instances(console, profile_name, regions, filters):
+    """Show the cached inventory at once and replace it in place when the refresh ends
+
+    Ctrl+C stops waiting for the refresh and keeps the instances shown.
+    """
+    from rich.live import Live
+    from botocore.exceptions import ProfileNotFound
+    cached = load_cached_instances(profile_name, regions, filters)
+    instances = cached['instances'] if cached else []
+    status = {'text': f"cached {cached['updated']}" if cached else "no cached inventory"}
+    result = {}
+
+    def _title():
+        return f"EC2 Instances ({status['text']})"
+
+    def _progress(done, total):
+        status['text'] = f"refreshing {done}/{total} regions"
+
+    def _refresh():
+        try:
+            result['value'] = refresh_inventory(profile_name, regions or get_enabled_regions(profile_name), filters, _progress)
+        except Exception as e:
+            result['error'] = e
+
+    status['text'] = "refreshing in background"
+    worker = threading.Thread(target=_refresh, daemon=True)
+    worker.start()
+    try:
+        with Live(build_table(instances, _title()), console=console, refresh_per_second=4) as live:
+            while worker.is_alive():
+                worker.join(timeout=0.25)
+                live.update(build_table(instances, _title()))
+            if 'value' in result:
+                fresh, errors = result['value']
+                for region, message in errors.items():
+                    console.print(f"[yellow]Could not list instances in {region}: {message}[/yellow]")
+                # Keep the cached instances of regions that failed to refresh
+                instances = fresh + [i for i in instances if i.get('Region') in errors]
+                save_cached_instances(profile_name, instances, regions, filters)
+                status['text'] = f"updated {datetime.now().strftime('%H:%M:%S')}"
+            elif 'error' in result:
+                error = result['error']
+                if isinstance(error, ProfileNotFound):
+                    console.print("[red]Error: Profile not found[/red]")
+                else:
+                    console.print(f"[red]Error refreshing inventory: {str(error)}[/red]")
+                if not cached:
+                    sys.exit(1)
+                status['text'] = f"cached {cached['updated']}, refresh failed"
+            live.update(build_table(instances, _title()))
+    except KeyboardInterrupt:
+        console.print("[yellow]Refresh skipped, using the instances shown[/yellow]")
+    return instances
+
+def instance_completions(index, text):
+    """Completions for the instances matching the text typed so far"""
+    from prompt_toolkit.completion import Completion
+    for instance in index.search(text, limit=SEARCH_RESULTS):
+        yield Completion(
+            instance['InstanceId'],
+            start_position=-len(text),
+            display=f"{instance['Name']}  {instance['InstanceId']}",
+            display_meta=f"{instance['State']}  SSM {instance.get('PingStatus', 'N/A')}  {instance.get('Region', '')}  {instance['PrivateIp']}"
+        )
+
+def pick_instance(instances):
+    """Let the user search and select an instance; returns it or None"""
+    from prompt_toolkit import prompt as prompt_input
+    from prompt_toolkit.completion import Completer
+    from instance_index import InstanceIndex
+
+    class InstanceCompleter(Completer):
+        """Fuzzy completion of instances by name, tags, IPs or ID as the user types"""
+
+        def get_completions(self, document, complete_event):
+            return instance_completions(index, document.text)
+
+    index = InstanceIndex(instances)
+    query = prompt_input(
+        "Search instance (name, tag, IP or ID, arrows to select): ",
+        completer=InstanceCompleter(),
+        complete_while_typing=True
+    )
+    matches = index.search(query, limit=1)
+    if not matches:
+        return None
+    instance = matches[0]
+    if instance['InstanceId'].lower() != query.strip().lower():
+        if not Confirm.ask(f"Connect to {instance['Name']} ({instance['InstanceId']})?"):
+            return None
+    ping_status = instance.get('PingStatus', 'N/A')
+    if ping_status not in ('Online', 'N/A', 'Unknown'):
+        rprint(f"[yellow]SSM agent status of {instance['InstanceId']}: {ping_status}, the session will probably fail[/yellow]")
+        if not Confirm.ask("Try to connect anyway?"):
+            return None
+    return instance
 
 def connect_to_instance(instance_id, profile_name, region):
     """Connect to EC2 instance using AWS SSM Session Manager"""
@@ -83,33 +299,103 @@ def connect_to_instance(instance_id, profile_name, region):
         rprint(f"[red]Error: {str(e)}[/red]")
         sys.exit(1)
 
+def run_batch(console, profile_name, instances, command, max_concurrency, timeout_seconds):
+    """Run a command on the running instances, printing each output as it arrives"""
+    import boto3
+    from rich.panel import Panel
+    from rich.table import Table
+    from ssm_batch import run_command
+
+    clients = {}
+    lock = threading.Lock()
+
+    def _get_client(region):
+        with lock:
+            if region not in clients:
+                clients[region] = boto3.Session(profile_name=profile_name, region_name=region).client('ssm')
+            return clients[region]
+
+    results = []
+    with console.status(f"Running on {len(instances)} instances...") as status:
+        for result in run_command(_get_client, instances, command, max_concurrency, timeout_seconds):
+            results.append(result)
+            ok = result['Status'] == 'Success'
+            console.print(Panel(
+                (result['Output'] + result['Error']).rstrip() or "(no output)",
+                title=f"{result['Name']} ({result['InstanceId']}) - {result['Status']}",
+                border_style="green" if ok else "red"
+            ))
+            status.update(f"Running on {len(instances)} instances... {len(results)} done")
+
+    table = Table(title=f"Command summary: {command}")
+    table.add_column("Name", style="cyan")
+    table.add_column("Instance ID", style="magenta")
+    table.add_column("Region", style="yellow")
+    table.add_column("Status", style="bold")
+    table.add_column("Exit code")
+    for result in sorted(results, key=lambda r: (r['Status'] == 'Success', r['Name'])):
+        color = "green" if result['Status'] == 'Success' else "red"
+        table.add_row(
+            result['Name'],
+            result['InstanceId'],
+            result['Region'],
+            f"[{color}]{result['Status']}[/{color}]",
+            str(result['ResponseCode'])
+        )
+    console.print(table)
+    return all(result['Status'] == 'Success' for result in results)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Connect to EC2 instances using AWS SSM Session Manager")
+    parser.add_argument('--profile', help="AWS profile name (prompted if omitted)")
+    parser.add_argument('--region', action='append', help="Region to list (repeatable, default: all enabled regions)")
+    parser.add_argument('--state', action='append', help="Only instances in this state (repeatable, e.g. running)")
+    parser.add_argument('--tag', action='append', help="Only instances with this tag, as Key=Value (repeatable)")
+    parser.add_argument('--command', help="Run this shell command on all the running instances listed instead of connecting")
+    parser.add_argument('--max-concurrency', type=int, default=10, help="Instances running the command at the same time across all regions, at least one per region and batch of 50 (default: 10)")
+    parser.add_argument('--timeout', type=int, default=600, help="Command timeout in seconds (default: 600)")
+    parser.add_argument('--yes', action='store_true', help="Do not ask for confirmation before running the command")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     console = Console()
     console.print("[bold blue]AWS EC2 Instance Connector[/bold blue]")
-    
-    # Get AWS profile and region
-    profile_name = Prompt.ask("Enter AWS profile name")
-    region = Prompt.ask("Enter AWS region (e.g., us-east-1)")
-    
-    # Get and display instances
-    instances = get_ec2_instances(profile_name, region)
+
+    # Get AWS profile
+    profile_name = args.profile or Prompt.ask("Enter AWS profile name")
+    filters = build_filters(args.state, args.tag)
+
+    # Show cached instances and refresh them in the background
+    instances = load_instances(console, profile_name, args.region, filters)
     if not instances:
-        rprint("[yellow]No EC2 instances found in the selected profile and region[/yellow]")
+        rprint("[yellow]No EC2 instances found in the selected profile and regions[/yellow]")
         sys.exit(0)
-    
-    display_instances(instances)
-    
-    # Get instance ID to connect to
-    instance_id = Prompt.ask("Enter the Instance ID to connect to")
-    
-    # Validate instance ID
-    if not any(instance['InstanceId'] == instance_id for instance in instances):
-        rprint("[red]Invalid Instance ID[/red]")
+
+    if args.command:
+        targets = [i for i in instances if i['State'] == 'running']
+        reachable = [i for i in targets if i.get('PingStatus', 'N/A') in ('Online', 'N/A', 'Unknown')]
+        if len(reachable) < len(targets):
+            rprint(f"[yellow]Skipping {len(targets) - len(reachable)} running instances not reachable through SSM[/yellow]")
+            targets = reachable
+        if not targets:
+            rprint("[yellow]No running instances to run the command on[/yellow]")
+            sys.exit(0)
+        if not args.yes and not Confirm.ask(f"Run '{args.command}' on {len(targets)} running instances?"):
+            sys.exit(0)
+        ok = run_batch(console, profile_name, targets, args.command, args.max_concurrency, args.timeout)
+        sys.exit(0 if ok else 1)
+
+    # Search the instance to connect to
+    instance = pick_instance(instances)
+    if instance is None:
+        rprint("[red]No instance selected[/red]")
         sys.exit(1)
-    
+    instance_id = instance['InstanceId']
+
     # Connect to the instance
     rprint(f"[green]Connecting to instance {instance_id}...[/green]")
-    connect_to_instance(instance_id, profile_name, region)
+    connect_to_instance(instance_id, profile_name, instance['Region'])
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,153 @@
+import bisect
+import re
+
+
+def instance_search_text(instance):
+    """Lowercase text searched for an instance: name, ID, IPs, region and tags"""
+    parts = [
+        instance.get('Name', ''),
+        instance.get('InstanceId', ''),
+        instance.get('PrivateIp', ''),
+        instance.get('PublicIp', ''),
+        instance.get('Region', ''),
+    ]
+    for key, value in (instance.get('Tags') or {}).items():
+        parts.append(f"{key}={value}")
+    return ' '.join(p for p in parts if p and p != 'N/A').lower()
+
+
+def fuzzy_pattern(query):
+    """Regex matching the query characters in order
+
+    Each gap excludes the next character, so the regex finds the leftmost
+    occurrence without backtracking.
+    """
+    parts = [re.escape(query[0])]
+    for char in query[1:]:
+        escaped = re.escape(char)
+        parts.append(f'[^{escaped}]*{escaped}')
+    return re.compile(''.join(parts))
+
+
+def iter_bits(mask):
+    """Yield the positions of the set bits of mask in increasing order"""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    # Skipping the zero bytes happens in C, which keeps sparse masks cheap
+    for match in NONZERO_BYTE.finditer(data):
+        byte, base = match.group()[0], match.start() * 8
+        while byte:
+            low = byte & -byte
+            yield base + low.bit_length() - 1
+            byte ^= low
+
+
+NONZERO_BYTE = re.compile(b'[^\x00]')
+
+
+class InstanceIndex:
+    """In-memory fuzzy search index over EC2 instances
+
+    Results are ranked in tiers: exact instance ID, name or ID prefix,
+    substring anywhere (tags, IPs, region...) and finally fuzzy matches where
+    the query characters appear in order. Inside a tier instances keep name
+    order. Substrings are found by scanning all the texts joined in one
+    string; for fuzzy matches each character has a bitmask of the instances
+    that contain it, so the candidates are found with a few big-integer ANDs.
+    The search stops as soon as `limit` results are collected, which keeps a
+    keystroke far below a frame even with 50,000 instances.
+    """
+
+    def __init__(self, instances):
+        self.instances = sorted(instances, key=lambda i: (i.get('Name', '').lower(), i.get('InstanceId', '')))
+        self.texts = [instance_search_text(i) for i in self.instances]
+        # All texts joined by newlines, for C-level substring scans
+        self.text = '\n'.join(self.texts) + '\n'
+        self.line_starts = []
+        offset = 0
+        for text in self.texts:
+            self.line_starts.append(offset)
+            offset += len(text) + 1
+
+        bitmaps = {}
+        size = len(self.texts) // 8 + 1
+        for position, text in enumerate(self.texts):
+            byte, bit = position >> 3, 1 << (position & 7)
+            for char in set(text):
+                bitmap = bitmaps.get(char)
+                if bitmap is None:
+                    bitmap = bitmaps[char] = bytearray(size)
+                bitmap[byte] |= bit
+        self.char_masks = {char: int.from_bytes(bitmap, 'little') for char, bitmap in bitmaps.items()}
+        self.all_mask = (1 << len(self.texts)) - 1
+
+        # Sorted (key, position) pairs for prefix lookups on names and IDs
+        self.prefix_keys = sorted(
+            [(i.get('Name', '').lower(), p) for p, i in enumerate(self.instances)]
+            + [(i.get('InstanceId', '').lower(), p) for p, i in enumerate(self.instances)]
+        )
+        self.ids = {i.get('InstanceId', '').lower(): p for p, i in enumerate(self.instances)}
+
+    def __len__(self):
+        return len(self.instances)
+
+    def _candidates(self, query):
+        """Instances containing every character of the query"""
+        mask = self.all_mask
+        for char in set(query):
+            mask &= self.char_masks.get(char, 0)
+            if not mask:
+                break
+        return mask
+
+    def _prefix_matches(self, query):
+        index = bisect.bisect_left(self.prefix_keys, (query,))
+        while index < len(self.prefix_keys):
+            key, position = self.prefix_keys[index]
+            if not key.startswith(query):
+                break
+            yield position
+            index += 1
+
+    def _substring_matches(self, query):
+        offset = 0
+        while True:
+            found = self.text.find(query, offset)
+            if found < 0:
+                return
+            position = bisect.bisect_right(self.line_starts, found) - 1
+            yield position
+            # One hit per instance is enough: continue at the next one
+            offset = self.line_starts[position + 1] if position + 1 < len(self.line_starts) else len(self.text)
+
+    def _fuzzy_matches(self, query, candidates):
+        search = fuzzy_pattern(query).search
+        texts = self.texts
+        return (p for p in iter_bits(candidates) if search(texts[p]))
+
+    def search(self, query, limit=20):
+        """Return up to limit instances ranked for the query"""
+        query = query.strip().lower()
+        if not query:
+            return self.instances[:limit]
+
+        tiers = []
+        exact = query in self.ids
+        if exact:
+            tiers.append([self.ids[query]])
+        tiers.append(self._prefix_matches(query))
+        if '\n' not in query:
+            tiers.append(self._substring_matches(query))
+        # A complete instance ID is a direct pick, fuzzy matches would only add noise
+        if not exact:
+            tiers.append(self._fuzzy_matches(query, self._candidates(query)))
+
+        seen, results = set(), []
+        for tier in tiers:
+            for position in tier:
+                if position in seen:
+                    continue
+                seen.add(position)
+                results.append(self.instances[position])
+                if len(results) >= limit:
+                    return results
+        return results
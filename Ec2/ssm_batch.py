@@ -0,0 +1,136 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from botocore.exceptions import ClientError
+
+# send_command accepts at most 50 instance IDs per call
+SEND_BATCH_SIZE = 50
+POLL_WORKERS = 16
+POLL_INTERVAL_SECONDS = 2
+TERMINAL_STATUSES = {'Success', 'Cancelled', 'TimedOut', 'Failed'}
+
+
+def batch_count(instance_count):
+    """Number of send_command calls needed for the instances"""
+    return -(-instance_count // SEND_BATCH_SIZE)
+
+
+def split_concurrency(max_concurrency, parts):
+    """Split a concurrency budget across send_command calls
+
+    MaxConcurrency applies to each call on its own, so the budget is shared
+    out as evenly as possible. Every call needs at least 1, so with more calls
+    than budget the total is the number of calls.
+    """
+    share, extra = divmod(max_concurrency, parts)
+    return [max(1, share + (1 if part < extra else 0)) for part in range(parts)]
+
+
+def send_command(ssm_client, instance_ids, command, max_concurrency, timeout_seconds):
+    """Send a shell command to the instances; returns {instance_id: command_id}
+
+    The instances are sent in batches of SEND_BATCH_SIZE and `max_concurrency`
+    is split across the batches, so SSM runs the command on at most that many
+    instances at the same time (or one per batch if there are more batches).
+    """
+    command_ids = {}
+    batches = [instance_ids[start:start + SEND_BATCH_SIZE] for start in range(0, len(instance_ids), SEND_BATCH_SIZE)]
+    for batch, concurrency in zip(batches, split_concurrency(max_concurrency, len(batches))):
+        response = ssm_client.send_command(
+            InstanceIds=batch,
+            DocumentName='AWS-RunShellScript',
+            Parameters={'commands': [command], 'executionTimeout': [str(timeout_seconds)]},
+            TimeoutSeconds=max(30, timeout_seconds),
+            MaxConcurrency=str(concurrency),
+            MaxErrors='100%'
+        )
+        command_id = response['Command']['CommandId']
+        for instance_id in batch:
+            command_ids[instance_id] = command_id
+    return command_ids
+
+
+def wait_for_invocation(ssm_client, command_id, instance_id, timeout_seconds,
+                        poll_interval=POLL_INTERVAL_SECONDS, sleep=time.sleep):
+    """Poll one invocation until it finishes and return its result"""
+    deadline = time.monotonic() + timeout_seconds + 60
+    while True:
+        try:
+            invocation = ssm_client.get_command_invocation(CommandId=command_id, InstanceId=instance_id)
+        except ClientError as e:
+            # The invocation is not visible for a moment right after send_command
+            if e.response['Error']['Code'] != 'InvocationDoesNotExist':
+                raise
+            invocation = {'Status': 'Pending'}
+        if invocation['Status'] in TERMINAL_STATUSES or time.monotonic() > deadline:
+            return {
+                'InstanceId': instance_id,
+                'Status': invocation['Status'],
+                'ResponseCode': invocation.get('ResponseCode', -1),
+                'Output': invocation.get('StandardOutputContent', ''),
+                'Error': invocation.get('StandardErrorContent', '')
+            }
+        sleep(poll_interval)
+
+
+def run_command(get_client, instances, command, max_concurrency=10, timeout_seconds=600,
+                poll_workers=POLL_WORKERS, poll_interval=POLL_INTERVAL_SECONDS, sleep=time.sleep):
+    """Run a command on the instances and yield each result as soon as it completes
+
+    `get_client(region)` returns the SSM client for a region, which allows
+    passing stubbed clients. Commands are sent per region, with
+    `max_concurrency` shared out across every region and batch; the
+    invocations are then polled in parallel. Errors sending or polling are yielded as results
+    with status 'Error'.
+    """
+    by_region = {}
+    for instance in instances:
+        by_region.setdefault(instance['Region'], []).append(instance)
+
+    # Budget of each region: the sum of the shares of its batches
+    counts = [batch_count(len(region_instances)) for region_instances in by_region.values()]
+    shares = split_concurrency(max_concurrency, sum(counts))
+    budgets = {}
+    for region, count in zip(by_region, counts):
+        budgets[region], shares = sum(shares[:count]), shares[count:]
+
+    names = {instance['InstanceId']: instance['Name'] for instance in instances}
+    with ThreadPoolExecutor(max_workers=poll_workers) as executor:
+        futures = {}
+        for region, region_instances in by_region.items():
+            ssm_client = get_client(region)
+            instance_ids = [instance['InstanceId'] for instance in region_instances]
+            try:
+                command_ids = send_command(ssm_client, instance_ids, command, budgets[region], timeout_seconds)
+            except Exception as e:
+                for instance_id in instance_ids:
+                    yield _error_result(instance_id, names[instance_id], region, e)
+                continue
+            for instance_id, command_id in command_ids.items():
+                future = executor.submit(
+                    wait_for_invocation, ssm_client, command_id, instance_id,
+                    timeout_seconds, poll_interval, sleep
+                )
+                futures[future] = (instance_id, region)
+
+        for future in as_completed(futures):
+            instance_id, region = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                yield _error_result(instance_id, names[instance_id], region, e)
+                continue
+            result.update({'Name': names[instance_id], 'Region': region})
+            yield result
+
+
+def _error_result(instance_id, name, region, error):
+    return {
+        'InstanceId': instance_id,
+        'Name': name,
+        'Region': region,
+        'Status': 'Error',
+        'ResponseCode': -1,
+        'Output': '',
+        'Error': str(error)
+    }
@@ -0,0 +1,116 @@
+import os
+import sys
+
+import boto3
+from botocore.stub import Stubber
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ssm_batch import run_command, send_command, split_concurrency, wait_for_invocation
+
+COMMAND = 'uptime'
+
+
+def _client():
+    return boto3.session.Session(
+        aws_access_key_id='test', aws_secret_access_key='test', region_name='us-east-1'
+    ).client('ssm')
+
+
+def _command_id(n):
+    return f'00000000-0000-0000-0000-{n:012d}'
+
+
+def _instance_ids(count, prefix=0):
+    return [f'i-{prefix:04x}{n:013x}' for n in range(count)]
+
+
+def _send_params(instance_ids, concurrency, timeout_seconds=600):
+    return {
+        'InstanceIds': instance_ids,
+        'DocumentName': 'AWS-RunShellScript',
+        'Parameters': {'commands': [COMMAND], 'executionTimeout': [str(timeout_seconds)]},
+        'TimeoutSeconds': timeout_seconds,
+        'MaxConcurrency': str(concurrency),
+        'MaxErrors': '100%',
+    }
+
+
+def _invocation(command_id, instance_id, status='Success', code=0):
+    return {
+        'CommandId': command_id,
+        'InstanceId': instance_id,
+        'Status': status,
+        'ResponseCode': code,
+        'StandardOutputContent': f'{instance_id} up',
+        'StandardErrorContent': '',
+    }
+
+
+def test_split_concurrency_keeps_the_total_budget():
+    assert split_concurrency(10, 3) == [4, 3, 3]
+    assert sum(split_concurrency(25, 4)) == 25
+    # Each call needs at least one
+    assert split_concurrency(2, 3) == [1, 1, 1]
+
+
+def test_send_command_batches_and_splits_concurrency():
+    ssm = _client()
+    instance_ids = _instance_ids(120)
+    with Stubber(ssm) as stubber:
+        for n, (start, concurrency) in enumerate([(0, 4), (50, 3), (100, 3)]):
+            stubber.add_response(
+                'send_command',
+                {'Command': {'CommandId': _command_id(n)}},
+                _send_params(instance_ids[start:start + 50], concurrency)
+            )
+        command_ids = send_command(ssm, instance_ids, COMMAND, 10, 600)
+        stubber.assert_no_pending_responses()
+
+    assert command_ids[instance_ids[0]] == _command_id(0)
+    assert command_ids[instance_ids[119]] == _command_id(2)
+
+
+def test_wait_for_invocation_retries_until_visible_and_finished():
+    ssm = _client()
+    instance_id = _instance_ids(1)[0]
+    params = {'CommandId': _command_id(1), 'InstanceId': instance_id}
+    with Stubber(ssm) as stubber:
+        stubber.add_client_error('get_command_invocation', 'InvocationDoesNotExist', expected_params=params)
+        stubber.add_response('get_command_invocation', _invocation(_command_id(1), instance_id, 'InProgress', -1), params)
+        stubber.add_response('get_command_invocation', _invocation(_command_id(1), instance_id), params)
+        result = wait_for_invocation(ssm, _command_id(1), instance_id, 600, sleep=lambda seconds: None)
+        stubber.assert_no_pending_responses()
+
+    assert result['Status'] == 'Success'
+    assert result['Output'] == f'{instance_id} up'
+
+
+def test_run_command_shares_budget_across_regions_and_reports_send_errors():
+    clients = {'eu-west-1': _client(), 'us-east-1': _client()}
+    eu_ids, us_ids = _instance_ids(2, 1), _instance_ids(1, 2)
+    instances = (
+        [{'InstanceId': i, 'Name': f'web {i}', 'Region': 'eu-west-1'} for i in eu_ids]
+        + [{'InstanceId': i, 'Name': f'db {i}', 'Region': 'us-east-1'} for i in us_ids]
+    )
+    eu = Stubber(clients['eu-west-1'])
+    eu.add_response('send_command', {'Command': {'CommandId': _command_id(1)}}, _send_params(eu_ids, 2))
+    for instance_id in eu_ids:
+        eu.add_response(
+            'get_command_invocation', _invocation(_command_id(1), instance_id),
+            {'CommandId': _command_id(1), 'InstanceId': instance_id}
+        )
+    us = Stubber(clients['us-east-1'])
+    us.add_client_error('send_command', 'AccessDeniedException', expected_params=_send_params(us_ids, 1))
+
+    with eu, us:
+        results = list(run_command(
+            clients.get, instances, COMMAND, max_concurrency=3, poll_workers=1, sleep=lambda seconds: None
+        ))
+        eu.assert_no_pending_responses()
+        us.assert_no_pending_responses()
+
+    by_id = {result['InstanceId']: result for result in results}
+    assert len(results) == 3
+    assert all(by_id[i]['Status'] == 'Success' and by_id[i]['Region'] == 'eu-west-1' for i in eu_ids)
+    assert by_id[us_ids[0]]['Status'] == 'Error'
+    assert by_id[us_ids[0]]['Name'] == f'db {us_ids[0]}'
@@ -1,8 +1,14 @@
+import os
+import sys
 import streamlit as st
 import boto3
 import pandas as pd
-import plotly.express as px
-from botocore.exceptions import ProfileNotFound, ClientError
+
+# Los componentes compartidos entre dashboards viven en la raíz del repositorio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fanout import run_progressive
+from rate_limit import limited_call, CLIENT_CONFIG
+from region_catalog import get_region_catalog
 
 # Configuración de la página
 st.set_page_config(page_title="AWS RDS Dashboard", layout="wide")
@@ -12,33 +18,47 @@ st.title("AWS RDS Instances Dashboard")
 AWS_PROFILES = ["Profile1", "Profile2", "Profile3"]
 
 def get_rds_instances(profile_name, region):
-    """Obtiene la lista de instancias RDS para el perfil y región seleccionados"""
-    try:
-        session = boto3.Session(profile_name=profile_name, region_name=region)
-        rds_client = session.client('rds')
-        instances = rds_client.describe_db_instances()
-        
-        instance_list = []
-        for instance in instances['DBInstances']:
-            instance_list.append({
-                'Profile': profile_name,
-                'Region': region,
-                'DBInstanceIdentifier': instance['DBInstanceIdentifier'],
-                'Engine': instance['Engine'],
-                'DBInstanceClass': instance['DBInstanceClass'],
-                'Status': instance['DBInstanceStatus'],
-                'Endpoint': instance.get('Endpoint', {}).get('Address', 'N/A'),
-                'Port': instance.get('Endpoint', {}).get('Port', 'N/A'),
-                'MultiAZ': instance.get('MultiAZ', False),
-                'StorageType': instance.get('StorageType', 'N/A'),
-                'AllocatedStorage': instance.get('AllocatedStorage', 'N/A'),
-                'Latitude': get_region_coordinates(region)[0],
-                'Longitude': get_region_coordinates(region)[1]
-            })
-        return instance_list
-    except (ProfileNotFound, ClientError) as e:
-        st.error(f"Error con el perfil {profile_name} en la región {region}: {str(e)}")
-        return []
+    """Obtiene la lista de instancias RDS para el perfil y región seleccionados
+
+    Se ejecuta en un hilo por perfil, así que los errores se lanzan en lugar
+    de mostrarse con st.
+    """
+    session = boto3.Session(profile_name=profile_name, region_name=region)
+    rds_client = session.client('rds', config=CLIENT_CONFIG)
+    instances = limited_call(profile_name, region, 'DescribeDBInstances', rds_client.describe_db_instances)
+    
+    instance_list = []
+    for instance in instances['DBInstances']:
+        instance_list.append({
+            'Profile': profile_name,
+            'Region': region,
+            'DBInstanceIdentifier': instance['DBInstanceIdentifier'],
+            'Engine': instance['Engine'],
+            'DBInstanceClass': instance['DBInstanceClass'],
+            'Status': instance['DBInstanceStatus'],
+            'Endpoint': instance.get('Endpoint', {}).get('Address', 'N/A'),
+            'Port': instance.get('Endpoint', {}).get('Port', 'N/A'),
+            'MultiAZ': instance.get('MultiAZ', False),
+            'StorageType': instance.get('StorageType', 'N/A'),
+            'AllocatedStorage': instance.get('AllocatedStorage', 'N/A'),
+            'Latitude': get_region_coordinates(region)[0],
+            'Longitude': get_region_coordinates(region)[1]
+        })
+    return instance_list
+
+def get_profile_instances(profile_name):
+    """Instancias RDS del perfil en su región por defecto
+
+    La región sale del catálogo de regiones, sin crear una sesión por perfil
+    en cada carga, y el recuento de instancias queda anotado en él.
+    """
+    catalog = get_region_catalog()
+    region = catalog.default_region(profile_name)
+    instances = get_rds_instances(profile_name, region)
+    # Sin región por defecto boto3 usa la suya; no se anota como región del perfil
+    if region is not None:
+        catalog.record_scan(profile_name, region, len(instances))
+    return instances
 
 def get_region_coordinates(region):
     """Obtiene las coordenadas aproximadas para cada región AWS"""
@@ -57,29 +77,18 @@ def get_region_coordinates(region):
     }
     return region_coordinates.get(region, (0, 0))
 
-def main():
-    # Obtener todas las instancias RDS
-    all_instances = []
-    for profile in AWS_PROFILES:
-        # Obtener la región por defecto para el perfil
-        session = boto3.Session(profile_name=profile)
-        region = session.region_name
-        instances = get_rds_instances(profile, region)
-        all_instances.extend(instances)
-
-    if not all_instances:
-        st.warning("No se encontraron instancias RDS en los perfiles especificados.")
+def render_results(df):
+    if df.empty:
+        st.info("No hay instancias RDS que mostrar.")
         return
 
-    # Convertir a DataFrame
-    df = pd.DataFrame(all_instances)
-
     # Mostrar tabla de instancias
     st.subheader("Instancias RDS")
     st.dataframe(df)
 
     # Crear mapa
     st.subheader("Ubicación de las Instancias RDS")
+    import plotly.express as px
     fig = px.scatter_geo(
         df,
         lat='Latitude',
@@ -105,5 +114,25 @@ def main():
     with col3:
         st.metric("Regiones Activas", df['Region'].nunique())
 
+def main():
+    # Los resultados se redibujan cada vez que responde un perfil
+    results_placeholder = st.empty()
+
+    def _show(instances):
+        with results_placeholder.container():
+            render_results(pd.DataFrame(instances))
+
+    # Obtener todas las instancias RDS en paralelo
+    all_instances, errors = run_progressive(
+        {profile: (lambda profile=profile: get_profile_instances(profile)) for profile in AWS_PROFILES},
+        on_update=_show,
+        label="Perfiles"
+    )
+    for profile, error in errors.items():
+        st.error(f"Error con el perfil {profile}: {error}")
+
+    if not all_instances:
+        st.warning("No se encontraron instancias RDS en los perfiles especificados.")
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
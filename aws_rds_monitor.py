@@ -1,9 +1,22 @@
 import streamlit as st
 import boto3
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 import pandas as pd
-import plotly.graph_objects as go
 from botocore.exceptions import ProfileNotFound
+from rate_limit import limited_call, CLIENT_CONFIG
+
+# Tabs: (label, CloudWatch metric, chart title, y axis label)
+METRIC_TABS = [
+    ("CPU Utilization", 'CPUUtilization', "CPU Utilization", "Percentage"),
+    ("Memory Usage", 'FreeableMemory', "Freeable Memory", "Bytes"),
+    ("Storage", 'FreeStorageSpace', "Free Storage Space", "Bytes"),
+    ("Logs", 'LogFileSize', "Log File Size", "Bytes"),
+    ("Connections", 'DatabaseConnections', "Database Connections", "Count"),
+]
+# Metrics kept in the session before fetching them again
+METRICS_TTL_SECONDS = 300
 
 def get_aws_profiles():
     """Get list of AWS profiles from credentials file"""
@@ -18,8 +31,8 @@ def get_rds_instances(profile_name):
     """Get list of RDS instances for the selected profile"""
     try:
         session = boto3.Session(profile_name=profile_name)
-        rds_client = session.client('rds')
-        instances = rds_client.describe_db_instances()
+        rds_client = session.client('rds', config=CLIENT_CONFIG)
+        instances = limited_call(profile_name, rds_client.meta.region_name, 'DescribeDBInstances', rds_client.describe_db_instances)
         return instances['DBInstances']
     except ProfileNotFound:
         st.error(f"Profile '{profile_name}' not found")
@@ -29,51 +42,99 @@ def get_rds_instances(profile_name):
         return []
 
 def get_rds_metrics(profile_name, instance_id, metric_name, period=3600):
-    """Get CloudWatch metrics for a specific RDS instance"""
-    try:
-        session = boto3.Session(profile_name=profile_name)
-        cloudwatch = session.client('cloudwatch')
-        
-        end_time = datetime.utcnow()
-        start_time = end_time - timedelta(seconds=period)
-        
-        response = cloudwatch.get_metric_data(
-            MetricDataQueries=[
-                {
-                    'Id': 'm1',
-                    'MetricStat': {
-                        'Metric': {
-                            'Namespace': 'AWS/RDS',
-                            'MetricName': metric_name,
-                            'Dimensions': [
-                                {
-                                    'Name': 'DBInstanceIdentifier',
-                                    'Value': instance_id
-                                }
-                            ]
-                        },
-                        'Period': 300,
-                        'Stat': 'Average'
+    """Get CloudWatch metrics for a specific RDS instance
+
+    Errors are raised rather than shown with st, since this also runs in the
+    prefetch threads; load_metric shows them on the script thread.
+    """
+    session = boto3.Session(profile_name=profile_name)
+    cloudwatch = session.client('cloudwatch', config=CLIENT_CONFIG)
+    
+    end_time = datetime.utcnow()
+    start_time = end_time - timedelta(seconds=period)
+    
+    # Throttled calls are retried at a slower pace instead of showing an empty chart
+    response = limited_call(
+        profile_name, cloudwatch.meta.region_name, 'GetMetricData',
+        cloudwatch.get_metric_data,
+        MetricDataQueries=[
+            {
+                'Id': 'm1',
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': 'AWS/RDS',
+                        'MetricName': metric_name,
+                        'Dimensions': [
+                            {
+                                'Name': 'DBInstanceIdentifier',
+                                'Value': instance_id
+                            }
+                        ]
                     },
-                    'StartTime': start_time,
-                    'EndTime': end_time
-                }
-            ]
-        )
-        
-        if response['MetricDataResults']:
-            return response['MetricDataResults'][0]['Values']
-        return []
-    except Exception as e:
-        st.error(f"Error getting metrics for {metric_name}: {str(e)}")
-        return []
+                    'Period': 300,
+                    'Stat': 'Average'
+                },
+                'StartTime': start_time,
+                'EndTime': end_time
+            }
+        ]
+    )
+    
+    if response['MetricDataResults']:
+        return response['MetricDataResults'][0]['Values']
+    return []
+
+@st.cache_resource
+def get_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix='metrics-prefetch')
+
+def _cached_metric(profile_name, instance_id, metric_name):
+    """Session entry for the metric if it is still fresh, else None"""
+    cache = st.session_state.setdefault('metrics_cache', {})
+    entry = cache.get((profile_name, instance_id, metric_name))
+    if entry is None or time.time() - entry[1] > METRICS_TTL_SECONDS:
+        return None
+    return entry
+
+def load_metric(profile_name, instance_id, metric_name):
+    """Metric values from the session, waiting for a background prefetch if there is one"""
+    key = (profile_name, instance_id, metric_name)
+    cache = st.session_state.setdefault('metrics_cache', {})
+    entry = _cached_metric(*key)
+    if entry is not None and isinstance(entry[0], Future):
+        future = entry[0]
+        # A failed prefetch is repeated here so the error is shown
+        if future.exception() is None:
+            cache[key] = (future.result(), entry[1])
+            return future.result()
+        entry = None
+    if entry is None:
+        try:
+            values = get_rds_metrics(*key)
+        except Exception as e:
+            # Not cached, so the next rerun tries again
+            cache.pop(key, None)
+            st.error(f"Error getting metrics for {metric_name}: {str(e)}")
+            return []
+        cache[key] = (values, time.time())
+    return cache[key][0]
+
+def prefetch_metrics(profile_name, instance_id, metric_names):
+    """Fetch the metrics that are not in the session in background threads"""
+    cache = st.session_state.setdefault('metrics_cache', {})
+    for metric_name in metric_names:
+        if _cached_metric(profile_name, instance_id, metric_name) is None:
+            future = get_prefetch_executor().submit(get_rds_metrics, profile_name, instance_id, metric_name)
+            cache[(profile_name, instance_id, metric_name)] = (future, time.time())
 
 def plot_metric(metric_data, title, y_label):
     """Create a line plot for metric data"""
     if not metric_data:
         st.warning(f"No data available for {title}")
         return
-    
+
+    # Loaded on first chart so the app starts without plotly
+    import plotly.graph_objects as go
     fig = go.Figure()
     fig.add_trace(go.Scatter(
         y=metric_data,
@@ -132,34 +193,21 @@ def main():
     if selected_instance:
         st.subheader(f"Metrics for {selected_instance}")
         
-        # Create tabs for different metrics
-        tab1, tab2, tab3, tab4, tab5 = st.tabs([
-            "CPU Utilization",
-            "Memory Usage",
-            "Storage",
-            "Logs",
-            "Connections"
-        ])
-        
-        with tab1:
-            cpu_data = get_rds_metrics(selected_profile, selected_instance, 'CPUUtilization')
-            plot_metric(cpu_data, "CPU Utilization", "Percentage")
-        
-        with tab2:
-            memory_data = get_rds_metrics(selected_profile, selected_instance, 'FreeableMemory')
-            plot_metric(memory_data, "Freeable Memory", "Bytes")
-        
-        with tab3:
-            storage_data = get_rds_metrics(selected_profile, selected_instance, 'FreeStorageSpace')
-            plot_metric(storage_data, "Free Storage Space", "Bytes")
+        # st.tabs runs every tab on each rerun; with a horizontal selector only
+        # the visible metric is fetched, the others are optionally prefetched
+        labels = [label for label, _, _, _ in METRIC_TABS]
+        selected_tab = st.radio("Metric", labels, horizontal=True, label_visibility="collapsed")
+        prefetch = st.checkbox("Prefetch the other tabs in background", value=True)
         
-        with tab4:
-            log_data = get_rds_metrics(selected_profile, selected_instance, 'LogFileSize')
-            plot_metric(log_data, "Log File Size", "Bytes")
+        _, metric_name, title, y_label = METRIC_TABS[labels.index(selected_tab)]
+        plot_metric(load_metric(selected_profile, selected_instance, metric_name), title, y_label)
         
-        with tab5:
-            connections_data = get_rds_metrics(selected_profile, selected_instance, 'DatabaseConnections')
-            plot_metric(connections_data, "Database Connections", "Count")
+        if prefetch:
+            prefetch_metrics(
+                selected_profile,
+                selected_instance,
+                [metric for label, metric, _, _ in METRIC_TABS if label != selected_tab]
+            )
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Comprueba que el arranque de cada script no supera su presupuesto de imports
+
+Para cada punto de entrada se ejecutan sus imports de nivel superior en un
+intérprete nuevo con `python -X importtime` y se suma el tiempo acumulado de
+los módulos importados directamente. Los imports diferidos dentro de funciones
+o páginas no cuentan, que es justo lo que se quiere vigilar. Sale con código 1
+si algún script supera su presupuesto o sus imports fallan.
+
+    python check_startup.py
+    python check_startup.py --scale 1.5 dash.py rds_map.py
+
+La misma comprobación se ejecuta con pytest (tests/test_startup.py).
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Presupuesto de imports en milisegundos por punto de entrada
+BUDGETS_MS = {
+    'aws_rds_monitor.py': 2500,
+    'dash.py': 2500,
+    'rds_map.py': 2500,
+    'dashboard_rds.py': 2500,
+    'monitor-rds.py': 2500,
+    'metricas_rds.py': 2500,
+    'script1.py': 2500,
+    'script2.py': 2500,
+    'cuadro_text.py': 2500,
+    'RDS/rds_dashboard.py': 2500,
+    'dasboard_v1/dashboard_rds.py': 2500,
+    'dash/patch_dashboard.py': 3000,
+    'dash/esc.py': 2500,
+    'Ec2/connect_ec2.py': 300,
+}
+RUNS = 3
+
+
+def top_level_imports(path):
+    """Código con los imports de nivel superior del script (incluidos los de try/except)"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    statements = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            statements.append(ast.unparse(node))
+        elif isinstance(node, ast.Try):
+            # Imports opcionales: se conserva el try/except tal cual
+            if all(isinstance(n, (ast.Import, ast.ImportFrom)) for n in node.body):
+                statements.append(ast.unparse(node))
+    return '\n'.join(statements)
+
+
+def run_importtime(code, cwd):
+    """Ejecuta el código con -X importtime y devuelve [(ms acumulados, módulo)] de primer nivel"""
+    env = dict(os.environ)
+    # Los dashboards de dash/ encuentran los módulos compartidos en la raíz
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [cwd, ROOT, env.get('PYTHONPATH')]))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Solo los módulos importados directamente, sin sangría; así no se cuentan dos veces
+        if not name.startswith('  '):
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return modules
+
+
+def measure_imports(path, baseline=()):
+    """Milisegundos de imports de nivel superior y los módulos que más pesan
+
+    Los módulos de `baseline` (los que carga el intérprete al arrancar) no cuentan.
+    """
+    modules = [
+        (ms, name) for ms, name in run_importtime(top_level_imports(path), os.path.dirname(path))
+        if name not in baseline
+    ]
+    modules.sort(reverse=True)
+    return sum(ms for ms, _ in modules), modules[:5]
+
+
+def measure_script(script, baseline=(), runs=RUNS):
+    """Medición más rápida de `runs` ejecuciones de un script relativo a la raíz"""
+    return min(
+        (measure_imports(os.path.join(ROOT, script), baseline) for _ in range(max(1, runs))),
+        key=lambda m: m[0]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprueba el tiempo de imports al arrancar cada script")
+    parser.add_argument('scripts', nargs='*', help="Scripts a comprobar (por defecto, todos los configurados)")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplicador de los presupuestos para máquinas lentas")
+    parser.add_argument('--runs', type=int, default=RUNS, help="Ejecuciones por script; se usa la más rápida")
+    args = parser.parse_args()
+
+    baseline = {name for _, name in run_importtime('pass', ROOT)}
+    failed = False
+    for script in args.scripts or BUDGETS_MS:
+        budget = BUDGETS_MS.get(script.replace(os.sep, '/'))
+        if budget is None:
+            print(f"{script}: sin presupuesto configurado")
+            failed = True
+            continue
+        budget *= args.scale
+        try:
+            total, heaviest = measure_script(script, baseline, args.runs)
+        except RuntimeError as e:
+            print(f"FALLO {script}: los imports no se pueden ejecutar ({e})")
+            failed = True
+            continue
+
+        status = 'OK   ' if total <= budget else 'FALLO'
+        failed |= total > budget
+        print(f"{status} {script}: {total:.0f} ms (presupuesto {budget:.0f} ms)")
+        if total > budget:
+            for ms, name in heaviest:
+                print(f"        {ms:8.1f} ms  {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
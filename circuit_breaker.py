@@ -0,0 +1,134 @@
+import threading
+import time
+
+from rate_limit import is_throttle
+
+# Fallos seguidos que abren el circuito de un origen
+FAILURE_THRESHOLD = 2
+# Primer periodo sin consultar el origen; se duplica con cada sondeo fallido
+COOLDOWN_SECONDS = 300
+MAX_COOLDOWN_SECONDS = 6 * 3600
+
+
+class CircuitOpenError(Exception):
+    """El origen ha fallado hace poco y se omite hasta que pase su periodo de espera"""
+
+
+class _Health:
+    def __init__(self):
+        self.failures = 0
+        self.open_until = 0
+        self.cooldown = COOLDOWN_SECONDS
+        self.probing = False
+        self.last_error = None
+
+
+class HealthTracker:
+    """Estado de salud por origen (p. ej. (perfil, región)) con circuit breaker
+
+    Tras FAILURE_THRESHOLD fallos seguidos el circuito se abre y el origen se
+    omite durante su periodo de espera. Pasado ese periodo no se vuelve a
+    consultar en primer plano: `probe_expired` lo sondea en un hilo y, si
+    responde, el circuito se cierra para la siguiente carga. Los throttles no
+    cuentan como fallo, ya que el origen funciona.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN_SECONDS,
+                 max_cooldown=MAX_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def is_open(self, key):
+        with self.lock:
+            state = self.states.get(key)
+            return state is not None and state.failures >= self.failure_threshold
+
+    def record_success(self, key):
+        with self.lock:
+            self.states.pop(key, None)
+
+    def record_failure(self, key, error):
+        if is_throttle(error):
+            return
+        with self.lock:
+            state = self.states.setdefault(key, _Health())
+            state.failures += 1
+            state.last_error = str(error)
+            if state.failures >= self.failure_threshold:
+                if state.open_until:
+                    # Sondeo fallido: se espera el doble antes del siguiente
+                    state.cooldown = min(self.max_cooldown, state.cooldown * 2)
+                else:
+                    state.cooldown = self.cooldown
+                state.open_until = time.monotonic() + state.cooldown
+
+    def call(self, key, func, *args, **kwargs):
+        """func(*args, **kwargs) registrando el resultado; lanza CircuitOpenError
+        sin llamar si el circuito del origen está abierto"""
+        if self.is_open(key):
+            raise CircuitOpenError(f"{key} omitido por fallos recientes")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(key, e)
+            raise
+        self.record_success(key)
+        return result
+
+    def probe_expired(self, probe):
+        """Sondea en segundo plano los orígenes abiertos cuyo periodo de espera
+        ha terminado; `probe(key)` se ejecuta en un hilo, así que no debe usar st"""
+        now = time.monotonic()
+        with self.lock:
+            keys = [
+                key for key, state in self.states.items()
+                if state.failures >= self.failure_threshold and now >= state.open_until and not state.probing
+            ]
+            for key in keys:
+                self.states[key].probing = True
+        for key in keys:
+            threading.Thread(target=self._probe, args=(key, probe), name='health-probe', daemon=True).start()
+        return keys
+
+    def _probe(self, key, probe):
+        try:
+            probe(key)
+        except Exception as e:
+            self.record_failure(key, e)
+            with self.lock:
+                state = self.states.get(key)
+                if state is not None:
+                    state.probing = False
+            return
+        self.record_success(key)
+
+    def report(self):
+        """Orígenes con fallos: número, segundos hasta el próximo sondeo y último error"""
+        now = time.monotonic()
+        with self.lock:
+            return [
+                {
+                    'Origen': ' / '.join(str(part) for part in key),
+                    'Fallos': state.failures,
+                    'Abierto': state.failures >= self.failure_threshold,
+                    'Próximo sondeo (s)': max(0, int(state.open_until - now)) if state.open_until else None,
+                    'Último error': state.last_error,
+                }
+                for key, state in self.states.items()
+            ]
+
+
+# Compartido por todas las sesiones del proceso de Streamlit
+_TRACKERS = {}
+_TRACKERS_LOCK = threading.Lock()
+
+
+def get_tracker(name):
+    with _TRACKERS_LOCK:
+        tracker = _TRACKERS.get(name)
+        if tracker is None:
+            tracker = _TRACKERS[name] = HealthTracker()
+        return tracker
@@ -1,12 +1,14 @@
 import streamlit as st
 import boto3
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import sqlite3
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from rds_database import RDSDatabase
+from paged_table import FramePageSource, render_paged_table
+from single_flight import coalesce
+from rate_limit import limited_call, CLIENT_CONFIG
 
 # Predefined AWS Profiles
 AWS_PROFILES = [
@@ -147,8 +149,14 @@ class AWSRDS_Dashboard:
         Obtiene las instancias RDS
         """
         try:
-            rds = session.client('rds')
-            response = rds.describe_db_instances()
+            rds = session.client('rds', config=CLIENT_CONFIG)
+            # Las sesiones que piden lo mismo a la vez comparten una sola llamada,
+            # limitada al ritmo de la cuenta y región para no provocar throttles
+            response = coalesce(
+                ('describe_db_instances', session.profile_name, session.region_name),
+                limited_call, session.profile_name, rds.meta.region_name, 'DescribeDBInstances',
+                rds.describe_db_instances
+            )
             
             instances = []
             for instance in response['DBInstances']:
@@ -168,17 +176,23 @@ class AWSRDS_Dashboard:
             st.error(f"Error obteniendo instancias RDS: {e}")
             return pd.DataFrame()
     
-    def get_cloudwatch_metrics(self, session, instance_id, metric_name, period=300, hours=24):
+    def get_cloudwatch_metrics(self, session, instance_id, metric_name, period=300, hours=24, raise_errors=False):
         """
         Obtiene métricas de CloudWatch para una instancia RDS específica
+
+        Con raise_errors el error se lanza en lugar de mostrarse con st, para
+        poder llamarla desde los hilos de precarga.
         """
         try:
-            cloudwatch = session.client('cloudwatch')
+            cloudwatch = session.client('cloudwatch', config=CLIENT_CONFIG)
             
             end_time = datetime.utcnow()
             start_time = end_time - timedelta(hours=hours)
             
-            response = cloudwatch.get_metric_data(
+            response = coalesce(
+                ('get_metric_data', session.profile_name, session.region_name, instance_id, metric_name, period, hours),
+                limited_call, session.profile_name, cloudwatch.meta.region_name, 'GetMetricData',
+                cloudwatch.get_metric_data,
                 MetricDataQueries=[
                     {
                         'Id': 'rds_metric',
@@ -210,10 +224,12 @@ class AWSRDS_Dashboard:
                 'Value': values
             }).sort_values('Timestamp')
         except Exception as e:
+            if raise_errors:
+                raise
             st.error(f"Error obteniendo métricas para {instance_id} - {metric_name}: {e}")
             return pd.DataFrame()
     
-    def get_rds_events(self, session, instance_id=None):
+    def get_rds_events(self, session, instance_id=None, raise_errors=False):
         """
         Obtiene eventos de RDS para una instancia específica o todas las instancias
         """
@@ -227,7 +243,11 @@ class AWSRDS_Dashboard:
             if instance_id:
                 kwargs['DBInstanceIdentifier'] = instance_id
             
-            response = rds.describe_events(**kwargs)
+            response = coalesce(
+                ('describe_events', session.profile_name, session.region_name, instance_id),
+                rds.describe_events,
+                **kwargs
+            )
             
             events = []
             for event in response['Events']:
@@ -241,10 +261,12 @@ class AWSRDS_Dashboard:
             
             return pd.DataFrame(events)
         except Exception as e:
+            if raise_errors:
+                raise
             st.error(f"Error obteniendo eventos RDS: {e}")
             return pd.DataFrame()
     
-    def get_cloudwatch_logs(self, session, instance_id, hours=24):
+    def get_cloudwatch_logs(self, session, instance_id, hours=24, raise_errors=False):
         """
         Obtiene los logs de CloudWatch para una instancia RDS específica
         """
@@ -257,7 +279,9 @@ class AWSRDS_Dashboard:
             start_time = int((datetime.utcnow() - timedelta(hours=hours)).timestamp() * 1000)
             
             # Obtener los grupos de logs relacionados con RDS
-            log_groups = logs.describe_log_groups(
+            log_groups = coalesce(
+                ('describe_log_groups', session.profile_name, session.region_name, instance_id),
+                logs.describe_log_groups,
                 logGroupNamePrefix=f'/aws/rds/instance/{instance_id}'
             )
             
@@ -266,7 +290,9 @@ class AWSRDS_Dashboard:
                 group_name = group['logGroupName']
                 
                 # Obtener los streams de logs
-                streams = logs.describe_log_streams(
+                streams = coalesce(
+                    ('describe_log_streams', session.profile_name, session.region_name, group_name),
+                    logs.describe_log_streams,
                     logGroupName=group_name,
                     orderBy='LastEventTime',
                     descending=True
@@ -275,7 +301,10 @@ class AWSRDS_Dashboard:
                 # Obtener los eventos de logs de cada stream
                 for stream in streams.get('logStreams', [])[:5]:  # Limitamos a los 5 streams más recientes
                     try:
-                        log_events = logs.get_log_events(
+                        log_events = coalesce(
+                            ('get_log_events', session.profile_name, session.region_name,
+                             group_name, stream['logStreamName'], hours),
+                            logs.get_log_events,
                             logGroupName=group_name,
                             logStreamName=stream['logStreamName'],
                             startTime=start_time,
@@ -289,14 +318,249 @@ class AWSRDS_Dashboard:
                                 'stream': stream['logStreamName']
                             })
                     except Exception as e:
+                        if raise_errors:
+                            raise
                         st.warning(f"Error obteniendo logs del stream {stream['logStreamName']}: {e}")
                         continue
             
             return pd.DataFrame(all_logs)
         except Exception as e:
+            if raise_errors:
+                raise
             st.error(f"Error obteniendo logs de CloudWatch para {instance_id}: {e}")
             return pd.DataFrame()
 
+# st.fragment (o st.experimental_fragment en versiones anteriores) vuelve a
+# ejecutar solo la función decorada cuando cambia uno de sus widgets. Con
+# versiones de Streamlit sin fragments se hace un rerun completo, pero los
+# datos siguen saliendo de la sesión sin volver a llamar a AWS.
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+# Pestañas de métricas de CloudWatch: título, métrica, divisor del valor,
+# etiqueta del eje, color y si se guarda en el histórico
+METRIC_TABS = [
+    {'tab': "CPU", 'metric': 'CPUUtilization', 'divisor': 1, 'title': 'Utilización de CPU (%)',
+     'axis': "CPU (%)", 'color': '#1f77b4', 'store': True, 'empty': "No hay datos de CPU disponibles para esta instancia."},
+    {'tab': "Memoria", 'metric': 'FreeableMemory', 'divisor': 1024 * 1024 * 1024, 'title': 'Memoria Disponible (GB)',
+     'axis': "Memoria (GB)", 'color': '#ff7f0e', 'store': False, 'empty': "No hay datos de memoria disponibles para esta instancia."},
+    {'tab': "Conexiones", 'metric': 'DatabaseConnections', 'divisor': 1, 'title': 'Conexiones a la Base de Datos',
+     'axis': "Conexiones", 'color': '#2ca02c', 'store': False, 'empty': "No hay datos de conexiones disponibles para esta instancia."},
+    {'tab': "Almacenamiento", 'metric': 'FreeStorageSpace', 'divisor': 1024 * 1024 * 1024, 'title': 'Espacio de Almacenamiento Libre (GB)',
+     'axis': "Espacio Libre (GB)", 'color': '#d62728', 'store': False, 'empty': "No hay datos de almacenamiento disponibles para esta instancia."},
+]
+
+@st.cache_resource
+def get_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix='rds-prefetch')
+
+def get_session_data(key, loader, prepare=None):
+    """Devuelve el dato guardado en la sesión o lo carga una única vez
+
+    Si el dato se está precargando en segundo plano se espera a que termine
+    en lugar de volver a pedirlo. Los loaders lanzan sus errores: se muestran
+    aquí, en el hilo del script, y el dato no se guarda para que el siguiente
+    rerun lo vuelva a intentar. `prepare` se aplica una sola vez al dato
+    cargado, también desde el hilo del script.
+    """
+    cache = st.session_state.setdefault('rds_cache', {})
+    if isinstance(cache.get(key), Future):
+        future = cache.pop(key)
+        # Si la precarga falló se repite la carga aquí para mostrar el error
+        if future.exception() is None:
+            cache[key] = prepare(future.result()) if prepare else future.result()
+    if key not in cache:
+        try:
+            data = loader()
+        except Exception as e:
+            st.error(f"Error obteniendo datos de AWS: {e}")
+            return pd.DataFrame()
+        cache[key] = prepare(data) if prepare else data
+    return cache[key]
+
+def prefetch_session_data(key, loader):
+    """Lanza la carga en un hilo si el dato no está en la sesión
+
+    El loader no debe usar la sesión: el resultado se guarda al leerlo con
+    get_session_data desde el script.
+    """
+    cache = st.session_state.setdefault('rds_cache', {})
+    if key not in cache:
+        cache[key] = get_prefetch_executor().submit(loader)
+
+def render_instances_summary(instances_df):
+    # Mostrar resumen de instancias en tarjetas
+    st.subheader("Resumen de Instancias RDS")
+    
+    total_instances = len(instances_df)
+    instances_online = instances_df[instances_df['Status'] == 'available'].shape[0]
+    total_storage = instances_df['AllocatedStorage'].sum()
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Instancias Totales", total_instances)
+    with col2:
+        st.metric("Instancias Online", instances_online)
+    with col3:
+        st.metric("Almacenamiento Total (GB)", total_storage)
+    
+    # Mostrar tabla de instancias
+    st.subheader("Instancias RDS")
+    st.dataframe(instances_df)
+
+def metric_loader(dashboard, profile, instance_id, config, hours):
+    def _load():
+        session = dashboard.get_session_for_profile(profile)
+        return dashboard.get_cloudwatch_metrics(
+            session, instance_id, config['metric'], hours=hours, raise_errors=True
+        )
+    return (profile, instance_id, config['metric'], hours), _load
+
+def prepare_metric(dashboard, instance_id, config):
+    """Guarda la métrica en el histórico y la pasa a la unidad de la pestaña
+
+    Se aplica desde el hilo del script, no en los hilos de precarga, para no
+    escribir en SQLite desde ellos.
+    """
+    def _prepare(metric_df):
+        if not metric_df.empty:
+            if config['store']:
+                # Store metrics in database
+                dashboard.db.store_metrics(instance_id, config['metric'], metric_df)
+            metric_df['Value'] = metric_df['Value'] / config['divisor']
+        return metric_df
+    return _prepare
+
+def events_loader(dashboard, profile, instance_id):
+    return (
+        (profile, instance_id, 'events'),
+        lambda: dashboard.get_rds_events(dashboard.get_session_for_profile(profile), instance_id, raise_errors=True)
+    )
+
+def logs_loader(dashboard, profile, instance_id, hours):
+    return (
+        (profile, instance_id, 'logs', hours),
+        lambda: dashboard.get_cloudwatch_logs(
+            dashboard.get_session_for_profile(profile), instance_id, hours=hours, raise_errors=True
+        )
+    )
+
+def tab_loaders(dashboard, profile, instance_id, hours):
+    """(clave, loader) de los datos de cada pestaña, en el orden de las pestañas"""
+    loaders = {
+        config['tab']: metric_loader(dashboard, profile, instance_id, config, hours)
+        for config in METRIC_TABS
+    }
+    loaders["Eventos"] = events_loader(dashboard, profile, instance_id)
+    loaders["Logs"] = logs_loader(dashboard, profile, instance_id, hours)
+    return loaders
+
+def render_metric_tab(dashboard, profile, instance_id, config, hours):
+    import plotly.express as px
+    metric_df = get_session_data(
+        *metric_loader(dashboard, profile, instance_id, config, hours),
+        prepare=prepare_metric(dashboard, instance_id, config)
+    )
+    
+    if not metric_df.empty:
+        fig = px.line(
+            metric_df, 
+            x='Timestamp', 
+            y='Value', 
+            title=config['title']
+        )
+        fig.update_traces(line_color=config['color'])
+        fig.update_layout(
+            xaxis_title="Hora",
+            yaxis_title=config['axis'],
+            height=400
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info(config['empty'])
+
+def render_events_tab(dashboard, profile, instance_id):
+    events = get_session_data(*events_loader(dashboard, profile, instance_id))
+    
+    if not events.empty:
+        st.dataframe(events.sort_values(by='Date', ascending=False))
+    else:
+        st.info("No hay eventos recientes para esta instancia.")
+
+@fragment
+def render_logs_tab(dashboard, profile, instance_id, hours):
+    st.subheader("Logs de CloudWatch")
+    logs_df = get_session_data(*logs_loader(dashboard, profile, instance_id, hours))
+    
+    if not logs_df.empty:
+        # Agregar filtros para los logs
+        col1, col2 = st.columns(2)
+        with col1:
+            selected_streams = st.multiselect(
+                "Filtrar por Stream",
+                options=sorted(logs_df['stream'].unique()),
+                default=sorted(logs_df['stream'].unique())
+            )
+        
+        with col2:
+            search_term = st.text_input("Buscar en logs", "")
+        
+        # Aplicar filtros
+        filtered_logs = logs_df[logs_df['stream'].isin(selected_streams)]
+        if search_term:
+            filtered_logs = filtered_logs[
+                filtered_logs['message'].str.contains(search_term, case=False, na=False)
+            ]
+        
+        # Mostrar los logs filtrados, enviando al navegador solo la página visible
+        render_paged_table(
+            FramePageSource(filtered_logs, 'rds_logs'),
+            key='rds_logs',
+            default_sort='timestamp',
+            default_ascending=False,
+            searchable=False
+        )
+        
+        # Mostrar estadísticas básicas
+        st.metric("Total de logs encontrados", len(filtered_logs))
+    else:
+        st.info("No se encontraron logs para esta instancia. Asegúrate de que los logs de CloudWatch estén habilitados para esta instancia RDS.")
+
+@fragment
+def render_instance_details(dashboard, profile, hours, instances_df, prefetch=True):
+    """Selector de instancia y pestañas de métricas
+
+    Al cambiar de instancia solo se vuelve a ejecutar este fragmento, y las
+    métricas ya consultadas salen de la sesión. Solo se cargan los datos de la
+    pestaña visible; con `prefetch` el resto se piden en segundo plano cuando
+    la pestaña visible ya se ha mostrado.
+    """
+    # Seleccionar una instancia para métricas detalladas
+    selected_instance = st.selectbox(
+        "Seleccionar Instancia para Métricas", 
+        instances_df['DBInstanceIdentifier'].tolist()
+    )
+    
+    # Mostrar métricas en gráficos
+    st.subheader(f"Métricas de la Instancia: {selected_instance}")
+    
+    # st.tabs ejecuta todas las pestañas en cada rerun; con un selector
+    # horizontal solo se ejecuta (y se consulta en AWS) la visible
+    loaders = tab_loaders(dashboard, profile, selected_instance, hours)
+    selected_tab = st.radio("Métrica", list(loaders), horizontal=True, label_visibility="collapsed")
+    
+    if selected_tab == "Eventos":
+        render_events_tab(dashboard, profile, selected_instance)
+    elif selected_tab == "Logs":
+        render_logs_tab(dashboard, profile, selected_instance, hours)
+    else:
+        config = next(config for config in METRIC_TABS if config['tab'] == selected_tab)
+        render_metric_tab(dashboard, profile, selected_instance, config, hours)
+    
+    if prefetch:
+        for tab, (key, loader) in loaders.items():
+            if tab != selected_tab:
+                prefetch_session_data(key, loader)
+
 def main():
     st.set_page_config(page_title="AWS Monitoring Dashboard", layout="wide")
     
@@ -313,6 +577,8 @@ def main():
         st.write("Contenido del dashboard de Patch Management")
         
     else:  # RDS Monitoring
+        # plotly solo se carga cuando se abre este dashboard
+        import plotly.express as px
         dashboard = AWSRDS_Dashboard()
         
         st.sidebar.title("Configuración RDS")
@@ -320,6 +586,7 @@ def main():
         
         st.sidebar.markdown("---")
         hours = st.sidebar.slider("Periodo de Tiempo (horas)", 1, 72, 24)
+        prefetch = st.sidebar.checkbox("Precargar el resto de pestañas", value=True)
         
         # Add historical data query section
         st.sidebar.markdown("---")
@@ -389,193 +656,29 @@ def main():
             session = dashboard.get_session_for_profile(selected_profile)
             
             if session:
-                # Obtener instancias RDS
+                # Obtener instancias RDS; las métricas ya descargadas se descartan
                 instances_df = dashboard.get_rds_instances(session)
+                st.session_state['rds_data'] = {'profile': selected_profile, 'instances': instances_df}
+                st.session_state['rds_cache'] = {}
                 
                 if not instances_df.empty:
                     # Store instances in database
                     dashboard.db.store_instances(instances_df)
-                    
-                    # Mostrar resumen de instancias en tarjetas
-                    st.subheader("Resumen de Instancias RDS")
-                    
-                    total_instances = len(instances_df)
-                    instances_online = instances_df[instances_df['Status'] == 'available'].shape[0]
-                    total_storage = instances_df['AllocatedStorage'].sum()
-                    
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("Instancias Totales", total_instances)
-                    with col2:
-                        st.metric("Instancias Online", instances_online)
-                    with col3:
-                        st.metric("Almacenamiento Total (GB)", total_storage)
-                    
-                    # Mostrar tabla de instancias
-                    st.subheader("Instancias RDS")
-                    st.dataframe(instances_df)
-                    
-                    # Seleccionar una instancia para métricas detalladas
-                    selected_instance = st.selectbox(
-                        "Seleccionar Instancia para Métricas", 
-                        instances_df['DBInstanceIdentifier'].tolist()
-                    )
-                    
-                    # Mostrar métricas en gráficos
-                    st.subheader(f"Métricas de la Instancia: {selected_instance}")
-                    
-                    # Crear pestañas para diferentes métricas
-                    tabs = st.tabs([
-                        "CPU", "Memoria", "Conexiones", "Almacenamiento", "Eventos", "Logs"
-                    ])
-                    
-                    # Pestaña de CPU
-                    with tabs[0]:
-                        cpu_metric = dashboard.get_cloudwatch_metrics(
-                            session, selected_instance, 'CPUUtilization', hours=hours
-                        )
-                        
-                        if not cpu_metric.empty:
-                            # Store metrics in database
-                            dashboard.db.store_metrics(selected_instance, 'CPUUtilization', cpu_metric)
-                            
-                            fig = px.line(
-                                cpu_metric, 
-                                x='Timestamp', 
-                                y='Value', 
-                                title='Utilización de CPU (%)'
-                            )
-                            fig.update_traces(line_color='#1f77b4')
-                            fig.update_layout(
-                                xaxis_title="Hora",
-                                yaxis_title="CPU (%)",
-                                height=400
-                            )
-                            st.plotly_chart(fig, use_container_width=True)
-                        else:
-                            st.info("No hay datos de CPU disponibles para esta instancia.")
-                    
-                    # Pestaña de Memoria
-                    with tabs[1]:
-                        memory_metric = dashboard.get_cloudwatch_metrics(
-                            session, selected_instance, 'FreeableMemory', hours=hours
-                        )
-                        
-                        if not memory_metric.empty:
-                            # Convertir a GB
-                            memory_metric['Value'] = memory_metric['Value'] / (1024 * 1024 * 1024)
-                            
-                            fig = px.line(
-                                memory_metric, 
-                                x='Timestamp', 
-                                y='Value', 
-                                title='Memoria Disponible (GB)'
-                            )
-                            fig.update_traces(line_color='#ff7f0e')
-                            fig.update_layout(
-                                xaxis_title="Hora",
-                                yaxis_title="Memoria (GB)",
-                                height=400
-                            )
-                            st.plotly_chart(fig, use_container_width=True)
-                        else:
-                            st.info("No hay datos de memoria disponibles para esta instancia.")
-                    
-                    # Pestaña de Conexiones
-                    with tabs[2]:
-                        conn_metric = dashboard.get_cloudwatch_metrics(
-                            session, selected_instance, 'DatabaseConnections', hours=hours
-                        )
-                        
-                        if not conn_metric.empty:
-                            fig = px.line(
-                                conn_metric, 
-                                x='Timestamp', 
-                                y='Value', 
-                                title='Conexiones a la Base de Datos'
-                            )
-                            fig.update_traces(line_color='#2ca02c')
-                            fig.update_layout(
-                                xaxis_title="Hora",
-                                yaxis_title="Conexiones",
-                                height=400
-                            )
-                            st.plotly_chart(fig, use_container_width=True)
-                        else:
-                            st.info("No hay datos de conexiones disponibles para esta instancia.")
-                    
-                    # Pestaña de Almacenamiento
-                    with tabs[3]:
-                        storage_metric = dashboard.get_cloudwatch_metrics(
-                            session, selected_instance, 'FreeStorageSpace', hours=hours
-                        )
-                        
-                        if not storage_metric.empty:
-                            # Convertir a GB
-                            storage_metric['Value'] = storage_metric['Value'] / (1024 * 1024 * 1024)
-                            
-                            fig = px.line(
-                                storage_metric, 
-                                x='Timestamp', 
-                                y='Value', 
-                                title='Espacio de Almacenamiento Libre (GB)'
-                            )
-                            fig.update_traces(line_color='#d62728')
-                            fig.update_layout(
-                                xaxis_title="Hora",
-                                yaxis_title="Espacio Libre (GB)",
-                                height=400
-                            )
-                            st.plotly_chart(fig, use_container_width=True)
-                        else:
-                            st.info("No hay datos de almacenamiento disponibles para esta instancia.")
-                    
-                    # Pestaña de Eventos
-                    with tabs[4]:
-                        events = dashboard.get_rds_events(session, selected_instance)
-                        
-                        if not events.empty:
-                            st.dataframe(events.sort_values(by='Date', ascending=False))
-                        else:
-                            st.info("No hay eventos recientes para esta instancia.")
-                    
-                    # Nueva pestaña de Logs (después de la pestaña de Eventos)
-                    with tabs[5]:
-                        st.subheader("Logs de CloudWatch")
-                        logs_df = dashboard.get_cloudwatch_logs(session, selected_instance, hours=hours)
-                        
-                        if not logs_df.empty:
-                            # Agregar filtros para los logs
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                selected_streams = st.multiselect(
-                                    "Filtrar por Stream",
-                                    options=sorted(logs_df['stream'].unique()),
-                                    default=sorted(logs_df['stream'].unique())
-                                )
-                            
-                            with col2:
-                                search_term = st.text_input("Buscar en logs", "")
-                            
-                            # Aplicar filtros
-                            filtered_logs = logs_df[logs_df['stream'].isin(selected_streams)]
-                            if search_term:
-                                filtered_logs = filtered_logs[
-                                    filtered_logs['message'].str.contains(search_term, case=False, na=False)
-                                ]
-                            
-                            # Mostrar los logs filtrados
-                            st.dataframe(
-                                filtered_logs.sort_values('timestamp', ascending=False),
-                                use_container_width=True
-                            )
-                            
-                            # Mostrar estadísticas básicas
-                            st.metric("Total de logs encontrados", len(filtered_logs))
-                        else:
-                            st.info("No se encontraron logs para esta instancia. Asegúrate de que los logs de CloudWatch estén habilitados para esta instancia RDS.")
-                else:
-                    st.warning("No se encontraron instancias RDS para este perfil.")
+        
+        # Los datos cargados se conservan entre reruns hasta volver a pulsar "Cargar Datos"
+        rds_data = st.session_state.get('rds_data')
+        if rds_data is None:
+            st.info("Pulsa \"Cargar Datos\" para consultar las instancias RDS del perfil.")
+        elif rds_data['profile'] != selected_profile:
+            st.info(f"Se muestran los datos del perfil **{rds_data['profile']}**. Pulsa \"Cargar Datos\" para cargar **{selected_profile}**.")
+        
+        if rds_data is not None:
+            instances_df = rds_data['instances']
+            if not instances_df.empty:
+                render_instances_summary(instances_df)
+                render_instance_details(dashboard, rds_data['profile'], hours, instances_df, prefetch)
+            else:
+                st.warning("No se encontraron instancias RDS para este perfil.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
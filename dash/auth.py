@@ -2,42 +2,83 @@ import streamlit as st
 import streamlit_authenticator as stauth
 import yaml
 from yaml.loader import SafeLoader
+import copy
 import os
+import sys
 
-def init_auth():
-    # Configuración de usuarios (en un entorno real, esto debería estar en una base de datos)
+# Fichero con los usuarios y sus contraseñas ya cifradas con bcrypt
+AUTH_CONFIG = os.environ.get('AUTH_CONFIG', 'config.yaml')
+
+# Usuario inicial (en un entorno real, esto debería estar en una base de datos).
+# Solo se cifra una vez, al crear el fichero de configuración si no existe.
+DEFAULT_USERS = {
+    'admin': {
+        'name': 'Administrador',
+        'password': 'admin123'
+    }
+}
+
+def hash_password(password):
+    """Cifra una contraseña con bcrypt para guardarla en el fichero de configuración"""
+    return stauth.Hasher([password]).generate()[0]
+
+def ensure_config(path=AUTH_CONFIG):
+    """Crea el fichero de configuración con el usuario inicial si todavía no existe"""
+    if os.path.exists(path):
+        return
     credentials = {
         'usernames': {
-            'admin': {
-                'name': 'Administrador',
-                'password': stauth.Hasher(['admin123']).generate()[0]
-            }
+            username: {'name': user['name'], 'password': hash_password(user['password'])}
+            for username, user in DEFAULT_USERS.items()
         }
     }
-
-    # Guardar las credenciales en un archivo YAML
-    with open('config.yaml', 'w') as file:
+    with open(path, 'w') as file:
         yaml.dump(credentials, file, default_flow_style=False)
 
-    # Cargar las credenciales
-    with open('config.yaml') as file:
-        config = yaml.load(file, Loader=SafeLoader)
+@st.cache_resource
+def _load_credentials(path, modified):
+    with open(path) as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+def load_credentials(path=AUTH_CONFIG):
+    """Credenciales con las contraseñas ya cifradas, leídas una vez por proceso
+
+    La fecha de modificación forma parte de la clave de la caché, así que
+    editar el fichero recarga los usuarios sin reiniciar el dashboard.
+    """
+    ensure_config(path)
+    return _load_credentials(path, os.path.getmtime(path))
 
-    # Crear el autenticador
+def init_auth():
+    """Autenticador de la sesión actual
+
+    Se crea una vez por sesión de navegador y se reutiliza en cada rerun.
+    No se comparte entre sesiones porque incluye el gestor de cookies del
+    navegador de cada usuario.
+    """
+    credentials = load_credentials()
+    cached = st.session_state.get('_authenticator')
+    if cached is not None and cached[0] is credentials:
+        return cached[1]
+
+    # Crear el autenticador con una copia: la librería modifica las credenciales
     authenticator = stauth.Authenticate(
-        config['usernames'],
+        copy.deepcopy(credentials),
         'dashboard_cookie',
         'dashboard_key',
         cookie_expiry_days=30
     )
-
+    st.session_state['_authenticator'] = (credentials, authenticator)
     return authenticator
 
 def login():
     authenticator = init_auth()
-    
-    # Crear la interfaz de login
-    name, authentication_status, username = authenticator.login('Iniciar Sesión', 'main')
+
+    # Crear la interfaz de login (API de streamlit-authenticator 0.3)
+    name, authentication_status, username = authenticator.login(
+        'main',
+        fields={'Form name': 'Iniciar Sesión', 'Username': 'Usuario', 'Password': 'Contraseña', 'Login': 'Entrar'}
+    )
 
     if authentication_status == False:
         st.error('Usuario/contraseña incorrectos')
@@ -51,4 +92,11 @@ def login():
 
 def logout():
     authenticator = init_auth()
-    authenticator.logout('Cerrar Sesión', 'main') 
\ No newline at end of file
+    authenticator.logout('Cerrar Sesión', 'main')
+
+if __name__ == '__main__':
+    # Uso: python auth.py <contraseña>  -> imprime el hash para config.yaml
+    if len(sys.argv) != 2:
+        print("Uso: python auth.py <contraseña>")
+        sys.exit(1)
+    print(hash_password(sys.argv[1]))
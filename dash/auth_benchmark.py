@@ -0,0 +1,58 @@
+"""Mide lo que cuesta la autenticación en cada rerun del dashboard
+
+Compara el método anterior (cifrar la contraseña con bcrypt y reescribir y
+releer config.yaml en cada llamada) con la lectura de las credenciales ya
+cifradas desde la caché del proceso.
+
+    python auth_benchmark.py [repeticiones]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+from yaml.loader import SafeLoader
+
+import auth
+
+
+def old_init(path):
+    credentials = {
+        'usernames': {
+            'admin': {'name': 'Administrador', 'password': auth.hash_password('admin123')}
+        }
+    }
+    with open(path, 'w') as file:
+        yaml.dump(credentials, file, default_flow_style=False)
+    with open(path) as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+def per_call_ms(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.yaml')
+        old_ms = per_call_ms(lambda: old_init(path), repeat)
+        os.remove(path)
+
+        start = time.perf_counter()
+        auth.load_credentials(path)
+        first_ms = (time.perf_counter() - start) * 1000
+        new_ms = per_call_ms(lambda: auth.load_credentials(path), repeat * 100)
+
+    # login() y logout() llamaban a init_auth, así que un rerun pagaba dos veces
+    print(f"Antes:   {old_ms:8.2f} ms por llamada ({2 * old_ms:.2f} ms por rerun con login y logout)")
+    print(f"Ahora:   {first_ms:8.2f} ms la primera vez por proceso (crea config.yaml si no existe)")
+    print(f"         {new_ms:8.4f} ms por llamada después")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@ import streamlit as st
 import boto3
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from task_definition_cache import TaskDefinitionCache, TaskDefinitionPrefetcher
 
 # Configure the page
 st.set_page_config(
@@ -16,49 +18,93 @@ def get_aws_clients():
     ecs_client = boto3.client('ecs')
     return ecs_client
 
+CACHE_TTL_SECONDS = 60
+# describe_services accepts at most 10 services per call
+DESCRIBE_SERVICES_BATCH = 10
+MAX_CLUSTER_WORKERS = 8
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def list_clusters(_ecs_client):
+    paginator = _ecs_client.get_paginator('list_clusters')
+    return [arn for page in paginator.paginate() for arn in page['clusterArns']]
+
 def get_clusters(ecs_client):
     try:
-        response = ecs_client.list_clusters()
-        clusters = response['clusterArns']
-        return clusters
+        return list_clusters(ecs_client)
     except Exception as e:
         st.error(f"Error getting clusters: {str(e)}")
         return []
 
 def get_cluster_services(ecs_client, cluster_name):
-    try:
-        response = ecs_client.list_services(cluster=cluster_name)
-        services = response['serviceArns']
-        return services
-    except Exception as e:
-        st.error(f"Error getting services for cluster {cluster_name}: {str(e)}")
-        return []
+    """List every service ARN in a cluster, following pagination"""
+    paginator = ecs_client.get_paginator('list_services')
+    return [arn for page in paginator.paginate(cluster=cluster_name) for arn in page['serviceArns']]
 
-def get_service_details(ecs_client, cluster_name, service_name):
-    try:
+def get_service_details(ecs_client, cluster_name, service_arns):
+    """Describe services in batches of DESCRIBE_SERVICES_BATCH"""
+    services = []
+    for start in range(0, len(service_arns), DESCRIBE_SERVICES_BATCH):
         response = ecs_client.describe_services(
             cluster=cluster_name,
-            services=[service_name]
+            services=service_arns[start:start + DESCRIBE_SERVICES_BATCH]
         )
-        return response['services'][0]
-    except Exception as e:
-        st.error(f"Error getting service details: {str(e)}")
-        return None
+        services.extend(response['services'])
+    return services
+
+def collect_cluster(ecs_client, cluster_name):
+    return get_service_details(ecs_client, cluster_name, get_cluster_services(ecs_client, cluster_name))
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner="Loading ECS services...")
+def get_ecs_inventory(_ecs_client, cluster_arns):
+    """Collect the services of all clusters concurrently
+
+    Returns a dict of cluster ARN -> {'services': [...], 'error': str or None}
+    so one failing cluster does not hide the others.
+    """
+    inventory = {}
+    with ThreadPoolExecutor(max_workers=MAX_CLUSTER_WORKERS) as executor:
+        futures = {
+            executor.submit(collect_cluster, _ecs_client, cluster): cluster
+            for cluster in cluster_arns
+        }
+        for future in as_completed(futures):
+            cluster = futures[future]
+            try:
+                inventory[cluster] = {'services': future.result(), 'error': None}
+            except Exception as e:
+                inventory[cluster] = {'services': [], 'error': str(e)}
+    return inventory
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def list_task_definitions(_ecs_client, family_prefix=None):
+    paginator = _ecs_client.get_paginator('list_task_definitions')
+    kwargs = {'familyPrefix': family_prefix} if family_prefix else {}
+    return [arn for page in paginator.paginate(**kwargs) for arn in page['taskDefinitionArns']]
 
 def get_task_definitions(ecs_client, family_prefix=None):
     try:
-        if family_prefix:
-            response = ecs_client.list_task_definitions(familyPrefix=family_prefix)
-        else:
-            response = ecs_client.list_task_definitions()
-        return response['taskDefinitionArns']
+        return list_task_definitions(ecs_client, family_prefix)
     except Exception as e:
         st.error(f"Error getting task definitions: {str(e)}")
         return []
 
+@st.cache_resource
+def get_task_definition_cache():
+    return TaskDefinitionCache()
+
+@st.cache_resource
+def get_task_definition_prefetcher(_ecs_client):
+    return TaskDefinitionPrefetcher(get_task_definition_cache(), _ecs_client)
+
 def get_task_definition_details(ecs_client, task_definition_arn):
+    # Revisions are immutable, so a cached copy never goes stale
+    cache = get_task_definition_cache()
+    cached = cache.get(task_definition_arn)
+    if cached is not None:
+        return cached
     try:
         response = ecs_client.describe_task_definition(taskDefinition=task_definition_arn)
+        cache.put(response['taskDefinition'])
         return response['taskDefinition']
     except Exception as e:
         st.error(f"Error getting task definition details: {str(e)}")
@@ -91,18 +137,20 @@ else:
         )
         
         if selected_cluster:
-            # Get services for selected cluster
-            services = get_cluster_services(ecs_client, selected_cluster)
+            # Services of every cluster are collected at once and cached
+            inventory = get_ecs_inventory(ecs_client, tuple(clusters))
+            cluster_inventory = inventory.get(selected_cluster, {'services': [], 'error': None})
+            services = cluster_inventory['services']
             
-            if services:
+            if cluster_inventory['error']:
+                st.error(f"Error getting services for cluster {selected_cluster}: {cluster_inventory['error']}")
+            elif services:
                 st.subheader("Services in Cluster")
                 
                 # Create columns for service details
-                for service in services:
-                    service_details = get_service_details(ecs_client, selected_cluster, service)
-                    
+                for service_details in services:
                     if service_details:
-                        with st.expander(f"Service: {service.split('/')[-1]}"):
+                        with st.expander(f"Service: {service_details.get('serviceName', 'N/A')}"):
                             col1, col2 = st.columns(2)
                             
                             with col1:
@@ -130,6 +178,10 @@ else:
         task_definitions = get_task_definitions(ecs_client, family_prefix if family_prefix else None)
         
         if task_definitions:
+            # Describe the remaining revisions in the background for the search index
+            prefetcher = get_task_definition_prefetcher(ecs_client)
+            prefetcher.prefetch(task_definitions)
+            
             st.subheader("Available Task Definitions")
             
             # Display task definitions in a selectbox
@@ -162,6 +214,21 @@ else:
                                 st.write("---")
         else:
             st.info("No task definitions found.")
+        
+        st.subheader("Search Cached Task Definitions")
+        cache = get_task_definition_cache()
+        pending = get_task_definition_prefetcher(ecs_client).pending()
+        st.caption(
+            f"{cache.count()} task definitions cached"
+            + (f", {pending} still being fetched" if pending else "")
+        )
+        search_term = st.text_input("Family or container image contains")
+        if search_term:
+            matches = cache.search(search_term)
+            if matches:
+                st.dataframe(pd.DataFrame(matches), use_container_width=True, hide_index=True)
+            else:
+                st.info("No cached task definitions match the search.")
 
 # Add footer
 st.markdown("---")
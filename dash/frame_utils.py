@@ -0,0 +1,48 @@
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    STRING_DTYPE = None
+
+# Proporción máxima de valores distintos para convertir una columna en categórica
+CATEGORY_MAX_RATIO = 0.5
+
+
+def memory_usage_mb(df):
+    """Memoria real ocupada por el DataFrame en MB"""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def compact_dataframe(df, category_max_ratio=CATEGORY_MAX_RATIO):
+    """Reduce la memoria de las columnas de texto del DataFrame
+
+    Las columnas con pocos valores distintos (cuentas, plataformas, versiones)
+    pasan a categóricas y, si pyarrow está instalado, el resto de columnas de
+    texto pasa a cadenas Arrow. Guarda en `df.attrs['memory_mb']` la memoria
+    antes y después de compactar.
+    """
+    before = memory_usage_mb(df)
+    rows = len(df)
+    for column in df.columns:
+        if df[column].dtype != object:
+            continue
+        values = df[column]
+        # Solo se convierten columnas con valores de texto (no listas ni diccionarios)
+        if not values.dropna().map(type).eq(str).all():
+            continue
+        if rows and values.nunique() / rows <= category_max_ratio:
+            df[column] = values.astype('category')
+        elif STRING_DTYPE:
+            df[column] = values.astype(STRING_DTYPE)
+    df.attrs['memory_mb'] = (before, memory_usage_mb(df))
+    return df
+
+
+def filter_mask(df, equals):
+    """Máscara booleana para los filtros de igualdad, sin copiar el DataFrame"""
+    mask = pd.Series(True, index=df.index)
+    for column, value in equals.items():
+        mask &= df[column] == value
+    return mask
@@ -0,0 +1,93 @@
+import pandas as pd
+
+from frame_utils import compact_dataframe, filter_mask
+
+DIMENSIONS = ['AccountId', 'PlataformaName', 'PlataformVersion']
+
+# Límites (en días desde el último parche) de los tramos de antigüedad
+AGE_BUCKET_EDGES = [7, 30, 60, 90, 180]
+NEVER_PATCHED = 'Sin parchear'
+
+
+def _age_bucket_labels():
+    labels, lower = [], 0
+    for upper in AGE_BUCKET_EDGES:
+        labels.append(f'{lower}-{upper} días')
+        lower = upper + 1
+    labels.append(f'> {AGE_BUCKET_EDGES[-1]} días')
+    return labels
+
+
+AGE_BUCKET_LABELS = _age_bucket_labels()
+
+
+def _finish_cube(cube):
+    cube['creation_day'] = pd.to_datetime(cube['creation_day'], errors='coerce')
+    cube['patch_day'] = pd.to_datetime(cube['patch_day'], errors='coerce')
+    cube['instances'] = cube['instances'].astype('int64')
+    return compact_dataframe(cube, category_max_ratio=1.0)
+
+
+def build_aggregates(df):
+    """Agrega el DataFrame de parches por cuenta, plataforma, versión, día de creación y día del último parche
+
+    Cada fila del resultado tiene el número de instancias de esa combinación.
+    Se asume una fila por instancia, que es la clave de la tabla de parches.
+    """
+    columns = DIMENSIONS + ['creation_day', 'patch_day', 'instances']
+    if df.empty:
+        return _finish_cube(pd.DataFrame(columns=columns))
+
+    def _column(name):
+        if name in df.columns:
+            # object evita que groupby combine todas las categorías entre sí
+            return df[name].astype(object)
+        return pd.Series(None, index=df.index, name=name, dtype=object)
+
+    keys = [_column(name) for name in DIMENSIONS]
+    keys.append(pd.to_datetime(_column('CreationDate'), errors='coerce').dt.normalize().rename('creation_day'))
+    keys.append(pd.to_datetime(_column('LastUpdatePatching'), errors='coerce').dt.normalize().rename('patch_day'))
+    cube = df.groupby(keys, dropna=False).size().rename('instances').reset_index()
+    return _finish_cube(cube[columns])
+
+
+def aggregates_from_rows(rows):
+    """Construye el agregado a partir de las filas leídas de la réplica local"""
+    columns = DIMENSIONS + ['creation_day', 'patch_day', 'instances']
+    return _finish_cube(pd.DataFrame(rows, columns=columns))
+
+
+def slice_aggregates(cube, equals, date_range=None):
+    """Filtra el agregado por igualdad en las dimensiones y por rango de días de creación"""
+    mask = filter_mask(cube, equals)
+    if date_range:
+        start_date, end_date = date_range
+        mask &= (cube['creation_day'] >= pd.to_datetime(start_date)) & (cube['creation_day'] <= pd.to_datetime(end_date))
+    return cube if mask.all() else cube[mask]
+
+
+def count_by(cube, column):
+    """Número de instancias por valor de una dimensión, sin categorías vacías"""
+    counts = cube.groupby(column, observed=True)['instances'].sum()
+    counts = counts[counts > 0]
+    return counts.sort_values(ascending=False)
+
+
+def days_since_patch(cube, today=None):
+    """Días transcurridos desde el último parche de cada celda (NaN si nunca se parcheó)"""
+    today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+    return (today - cube['patch_day']).dt.days
+
+
+def patch_age_buckets(cube, today=None):
+    """Número de instancias por tramo de días desde el último parche"""
+    days = days_since_patch(cube, today)
+    buckets = pd.cut(days, bins=[-float('inf')] + AGE_BUCKET_EDGES + [float('inf')], labels=AGE_BUCKET_LABELS)
+    buckets = buckets.cat.add_categories([NEVER_PATCHED]).fillna(NEVER_PATCHED)
+    return cube['instances'].groupby(buckets, observed=False).sum()
+
+
+def unpatched_instances(cube, min_days, today=None):
+    """Número de instancias sin parchear en más de min_days días (incluye las nunca parcheadas)"""
+    days = days_since_patch(cube, today)
+    return int(cube.loc[days.isna() | (days > min_days), 'instances'].sum())
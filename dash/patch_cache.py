@@ -0,0 +1,447 @@
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+
+from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.types import TypeDeserializer
+
+from patch_query import date_bounds, get_table_indexes, plan_sync_queries
+
+WATERMARK_ATTRIBUTE = 'LastUpdatePatching'
+# Columnas que se guardan aparte del item para poder filtrar en SQLite
+INDEXED_COLUMNS = ['AccountId', 'PlataformaName', 'PlataformVersion', 'CreationDate', 'LastUpdatePatching']
+# Dimensiones del agregado de cumplimiento, además del día de creación y del último parche
+AGGREGATE_DIMENSIONS = ['AccountId', 'PlataformaName', 'PlataformVersion']
+AGGREGATE_COLUMNS = AGGREGATE_DIMENSIONS + ['creation_day', 'patch_day']
+# Un proceso que muere a mitad de sincronización libera el bloqueo pasado este tiempo
+SYNC_LOCK_SECONDS = 30 * 60
+
+
+def _aggregate_cell(values):
+    """Celda del agregado para una fila con las columnas indexadas
+
+    Los valores ausentes se guardan como cadena vacía para que formen parte
+    de la clave primaria.
+    """
+    cell = [values.get(name) or '' for name in AGGREGATE_DIMENSIONS]
+    cell.append((values.get('CreationDate') or '')[:10])
+    cell.append((values.get(WATERMARK_ATTRIBUTE) or '')[:10])
+    return cell
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return str(value)
+
+
+class PatchCache:
+    """Réplica local en SQLite de la tabla DynamoDB de parches"""
+
+    def __init__(self, db_path='patch_cache.db'):
+        self.db_path = db_path
+        self.init_db()
+
+    def init_db(self):
+        """Initialize the database and create tables if they don't exist"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+
+        columns = ', '.join(f'"{name}" TEXT' for name in INDEXED_COLUMNS)
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS patch_items (
+                item_key TEXT PRIMARY KEY,
+                {columns},
+                item TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_patch_account ON patch_items ("AccountId")')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_patch_creation ON patch_items ("CreationDate")')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_patch_updated ON patch_items ("LastUpdatePatching")')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+
+        # Número de instancias por cuenta, plataforma, versión, día de creación y día del último parche
+        columns = ', '.join(f'"{name}" TEXT NOT NULL' for name in AGGREGATE_COLUMNS)
+        key = ', '.join(f'"{name}"' for name in AGGREGATE_COLUMNS)
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS patch_aggregates (
+                {columns},
+                instances INTEGER NOT NULL,
+                PRIMARY KEY ({key})
+            )
+        ''')
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM patch_aggregates)')
+        has_aggregates = cursor.fetchone()[0]
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM patch_items)')
+        if cursor.fetchone()[0] and not has_aggregates:
+            self._rebuild_aggregates(cursor)
+
+        conn.commit()
+        conn.close()
+
+    def _rebuild_aggregates(self, cursor):
+        """Recalcula el agregado completo a partir de los items replicados"""
+        dimensions = ', '.join(f'COALESCE("{name}", \'\')' for name in AGGREGATE_DIMENSIONS)
+        cursor.execute('DELETE FROM patch_aggregates')
+        cursor.execute(f'''
+            INSERT INTO patch_aggregates
+            SELECT {dimensions},
+                   COALESCE(substr("CreationDate", 1, 10), ''),
+                   COALESCE(substr("{WATERMARK_ATTRIBUTE}", 1, 10), ''),
+                   COUNT(*)
+            FROM patch_items
+            GROUP BY 1, 2, 3, 4, 5
+        ''')
+
+    def _adjust_aggregate(self, cursor, values, delta):
+        """Suma delta a la celda del agregado que corresponde a una fila"""
+        key = ', '.join(f'"{name}"' for name in AGGREGATE_COLUMNS)
+        cell = _aggregate_cell(values)
+        cursor.execute(f'''
+            INSERT INTO patch_aggregates ({key}, instances) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT ({key}) DO UPDATE SET instances = instances + excluded.instances
+        ''', cell + [delta])
+        if delta < 0:
+            where = ' AND '.join(f'"{name}" = ?' for name in AGGREGATE_COLUMNS)
+            cursor.execute(f'DELETE FROM patch_aggregates WHERE {where} AND instances <= 0', cell)
+
+    def _get_indexed_values(self, cursor, item_key):
+        columns = ', '.join(f'"{name}"' for name in INDEXED_COLUMNS)
+        cursor.execute(f'SELECT {columns} FROM patch_items WHERE item_key = ?', (item_key,))
+        row = cursor.fetchone()
+        return dict(zip(INDEXED_COLUMNS, row)) if row else None
+
+    def _get_state(self, cursor, name):
+        cursor.execute('SELECT value FROM sync_state WHERE name = ?', (name,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, cursor, name, value):
+        cursor.execute(
+            'INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)',
+            (name, value)
+        )
+
+    @contextmanager
+    def sync_lock(self):
+        """Bloqueo compartido por todos los procesos que usan la base de datos
+
+        Devuelve True si se ha obtenido; False si otra sincronización está en
+        curso. El bloqueo es una fila de sync_state con caducidad, de modo que
+        funciona entre réplicas que montan el mismo volumen.
+        """
+        owner = uuid.uuid4().hex
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        value = self._get_state(cursor, 'sync_lock')
+        acquired = value is None or json.loads(value)['expires'] < time.time()
+        if acquired:
+            self._set_state(cursor, 'sync_lock', json.dumps({'owner': owner, 'expires': time.time() + SYNC_LOCK_SECONDS}))
+        conn.commit()
+        conn.close()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn = sqlite3.connect(self.db_path, timeout=30)
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                value = self._get_state(cursor, 'sync_lock')
+                if value is not None and json.loads(value)['owner'] == owner:
+                    cursor.execute('DELETE FROM sync_state WHERE name = ?', ('sync_lock',))
+                conn.commit()
+                conn.close()
+
+    def get_watermark(self):
+        """Mayor LastUpdatePatching replicado hasta ahora"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        value = self._get_state(conn.cursor(), 'watermark')
+        conn.close()
+        return value
+
+    def get_last_sync(self):
+        """Momento de la última sincronización o None si nunca se sincronizó"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        value = self._get_state(conn.cursor(), 'last_sync')
+        conn.close()
+        return datetime.fromisoformat(value) if value else None
+
+    def needs_sync(self, max_age_seconds):
+        """Indica si la réplica está vacía o es más antigua que max_age_seconds"""
+        last_sync = self.get_last_sync()
+        if last_sync is None:
+            return True
+        return (datetime.now() - last_sync).total_seconds() > max_age_seconds
+
+    def upsert_items(self, items, key_attributes):
+        """Guarda o reemplaza items; devuelve cuántos se guardaron
+
+        No toca la marca de agua: solo sync_from_table la avanza, y únicamente
+        cuando ha terminado de recorrer la tabla. La fila anterior se lee dentro
+        de una transacción de escritura (BEGIN IMMEDIATE) para que dos procesos
+        no resten y sumen dos veces el mismo item en el agregado.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+
+        placeholders = ', '.join('?' for _ in range(len(INDEXED_COLUMNS) + 2))
+        columns = ', '.join(f'"{name}"' for name in INDEXED_COLUMNS)
+        count = 0
+        for item in items:
+            key = json.dumps({name: item.get(name) for name in key_attributes}, default=_json_default, sort_keys=True)
+            values = {name: None if item.get(name) is None else str(item.get(name)) for name in INDEXED_COLUMNS}
+            # Mantener el agregado al día: se resta la versión anterior del item y se suma la nueva
+            previous = self._get_indexed_values(cursor, key)
+            if previous is not None:
+                self._adjust_aggregate(cursor, previous, -1)
+            self._adjust_aggregate(cursor, values, 1)
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO patch_items (item_key, {columns}, item)
+                VALUES ({placeholders})
+            ''', [key] + [values[name] for name in INDEXED_COLUMNS] + [json.dumps(item, default=_json_default)])
+            count += 1
+
+        conn.commit()
+        conn.close()
+        return count
+
+    def delete_keys(self, keys):
+        """Elimina de la réplica los items con las claves indicadas"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        for key in keys:
+            item_key = json.dumps(key, default=_json_default, sort_keys=True)
+            previous = self._get_indexed_values(cursor, item_key)
+            if previous is None:
+                continue
+            self._adjust_aggregate(cursor, previous, -1)
+            cursor.execute('DELETE FROM patch_items WHERE item_key = ?', (item_key,))
+        conn.commit()
+        conn.close()
+
+    def mark_synced(self, watermark=None):
+        """Registra una sincronización completa y, si se indica, la nueva marca de agua"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        if watermark is not None:
+            self._set_state(cursor, 'watermark', watermark)
+        self._set_state(cursor, 'last_sync', datetime.now().isoformat())
+        conn.commit()
+        conn.close()
+
+    def sync_from_table(self, table, partitions=None):
+        """Trae de DynamoDB solo los items con LastUpdatePatching igual o posterior a la marca de agua
+
+        La primera sincronización, sin marca de agua, copia la tabla completa.
+        Las siguientes consultan un GSI con LastUpdatePatching como clave de
+        rango si la tabla lo tiene y se indican los valores de su clave de
+        partición (`partitions`); así solo se leen, y se pagan en RCU, los items
+        cambiados. Sin ese índice se hace un Scan completo con FilterExpression,
+        que consume las mismas RCU que leer toda la tabla (solo ahorra
+        transferencia y escrituras locales).
+
+        Ni el Scan ni las consultas por partición devuelven los items en orden
+        global de fecha, así que la marca de agua solo se guarda al terminar: si
+        la sincronización falla a medias, la siguiente repite la lectura desde
+        la marca anterior. Se usa >= porque varios items pueden compartir la
+        fecha de la marca; volver a guardarlos no cambia nada.
+
+        Los items borrados en DynamoDB no se eliminan de la réplica; los
+        borrados solo llegan a través del fichero de cambios (PATCH_CHANGE_FEED).
+        Devuelve el número de items actualizados, o None si otra sincronización
+        tiene el bloqueo.
+        """
+        with self.sync_lock() as acquired:
+            if not acquired:
+                return None
+            return self._sync_from_table(table, partitions)
+
+    def _sync_from_table(self, table, partitions):
+        key_attributes = [k['AttributeName'] for k in table.key_schema]
+        watermark = self.get_watermark()
+        reads = [(table.scan, {})]
+        if watermark is not None:
+            queries = plan_sync_queries(get_table_indexes(table), WATERMARK_ATTRIBUTE, watermark, partitions) if partitions else None
+            if queries is not None:
+                reads = [(table.query, kwargs) for kwargs in queries]
+            else:
+                reads = [(table.scan, {'FilterExpression': Attr(WATERMARK_ATTRIBUTE).gte(watermark)})]
+
+        def _upsert(items):
+            nonlocal watermark
+            for item in items:
+                updated = item.get(WATERMARK_ATTRIBUTE)
+                if updated is not None and (watermark is None or str(updated) > watermark):
+                    watermark = str(updated)
+            return self.upsert_items(items, key_attributes)
+
+        count = 0
+        for read, kwargs in reads:
+            response = read(**kwargs)
+            count += _upsert(response.get('Items', []))
+            while 'LastEvaluatedKey' in response:
+                response = read(ExclusiveStartKey=response['LastEvaluatedKey'], **kwargs)
+                count += _upsert(response.get('Items', []))
+
+        self.mark_synced(watermark)
+        return count
+
+    def apply_change_feed(self, path):
+        """Aplica un fichero JSON Lines con registros en formato DynamoDB Streams
+
+        Cada línea es un registro con `eventName` (INSERT, MODIFY o REMOVE) y
+        `dynamodb.Keys` / `dynamodb.NewImage` en formato tipado. La posición
+        leída se guarda para que la siguiente llamada continúe desde ahí. No
+        avanza la marca de agua del Scan, que solo refleja lo que se ha leído
+        de la tabla. Devuelve el número de registros aplicados, o None si otra
+        sincronización tiene el bloqueo.
+        """
+        with self.sync_lock() as acquired:
+            if not acquired:
+                return None
+            return self._apply_change_feed(path)
+
+    def _apply_change_feed(self, path):
+        deserializer = TypeDeserializer()
+
+        def _plain(image):
+            return {name: deserializer.deserialize(value) for name, value in image.items()}
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        offset = int(self._get_state(conn.cursor(), f'feed:{path}') or 0)
+        conn.close()
+
+        count = 0
+        with open(path, 'rb') as feed:
+            feed.seek(offset)
+            for line in iter(feed.readline, b''):
+                if not line.endswith(b'\n'):
+                    # Línea incompleta: se leerá en la siguiente llamada
+                    break
+                offset += len(line)
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                change = record.get('dynamodb', {})
+                keys = _plain(change.get('Keys', {}))
+                if record.get('eventName') == 'REMOVE':
+                    self.delete_keys([keys])
+                elif 'NewImage' in change:
+                    self.upsert_items([_plain(change['NewImage'])], sorted(keys))
+                count += 1
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        self._set_state(cursor, f'feed:{path}', str(offset))
+        conn.commit()
+        conn.close()
+        return count
+
+    def get_distinct_values(self, column):
+        """Valores distintos de una columna indexada, para poblar los filtros"""
+        if column not in INDEXED_COLUMNS:
+            raise ValueError(f"Columna no indexada: {column}")
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT DISTINCT "{column}" FROM patch_items WHERE "{column}" IS NOT NULL ORDER BY 1')
+        values = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return values
+
+    def get_date_range(self):
+        """Fechas de creación mínima y máxima replicadas"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT MIN("CreationDate"), MAX("CreationDate") FROM patch_items')
+        row = cursor.fetchone()
+        conn.close()
+        return row
+
+    def load_aggregates(self):
+        """Agregado de cumplimiento como lista de diccionarios (vacíos como None)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM patch_aggregates')
+        names = [d[0] for d in cursor.description]
+        rows = [
+            {name: (value if value != '' else None) for name, value in zip(names, row)}
+            for row in cursor.fetchall()
+        ]
+        conn.close()
+        return rows
+
+    def _where(self, equals=None, date_range=None, search=None):
+        """Cláusula WHERE y parámetros para los filtros del dashboard"""
+        clauses, params = [], []
+        for name, value in (equals or {}).items():
+            if name not in INDEXED_COLUMNS:
+                raise ValueError(f"Columna no indexada: {name}")
+            clauses.append(f'"{name}" = ?')
+            params.append(str(value))
+        if date_range:
+            clauses.append('"CreationDate" BETWEEN ? AND ?')
+            params.extend(date_bounds(date_range))
+        if search:
+            # Solo en los valores del item, no en los nombres de los atributos
+            clauses.append("EXISTS (SELECT 1 FROM json_each(item) WHERE CAST(json_each.value AS TEXT) LIKE ? ESCAPE '\\')")
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+        if not clauses:
+            return '', params
+        return ' WHERE ' + ' AND '.join(clauses), params
+
+    def load_items(self, equals=None, date_range=None):
+        """Lee los items replicados aplicando los filtros en SQLite"""
+        where, params = self._where(equals, date_range)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT item FROM patch_items' + where, params)
+        items = [json.loads(row[0]) for row in cursor.fetchall()]
+        conn.close()
+        return items
+
+    def count_items(self, equals=None, date_range=None, search=None):
+        """Número de items que cumplen los filtros"""
+        where, params = self._where(equals, date_range, search)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM patch_items' + where, params)
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+
+    def load_page(self, equals=None, date_range=None, search=None,
+                  sort_by=None, ascending=True, offset=0, limit=50):
+        """Lee una sola página de items filtrados y ordenados por una columna indexada"""
+        where, params = self._where(equals, date_range, search)
+        query = 'SELECT item FROM patch_items' + where
+        if sort_by:
+            if sort_by not in INDEXED_COLUMNS:
+                raise ValueError(f"Columna no indexada: {sort_by}")
+            query += f' ORDER BY "{sort_by}" IS NULL, "{sort_by}" {"ASC" if ascending else "DESC"}, item_key'
+        query += ' LIMIT ? OFFSET ?'
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute(query, params + [limit, offset])
+        items = [json.loads(row[0]) for row in cursor.fetchall()]
+        conn.close()
+        return items
@@ -1,8 +1,25 @@
 import streamlit as st
 import boto3
+import os
+import sys
 import pandas as pd
 from datetime import datetime
 import plotly.express as px
+from patch_query import get_table_indexes, plan_query, run_query
+from patch_cache import PatchCache, INDEXED_COLUMNS
+from frame_utils import compact_dataframe, filter_mask
+from patch_aggregates import (
+    aggregates_from_rows, build_aggregates, count_by, patch_age_buckets,
+    slice_aggregates, unpatched_instances, AGE_BUCKET_EDGES
+)
+
+# Los componentes compartidos entre dashboards viven en la raíz del repositorio
+# (en la imagen Docker se copian junto a este script)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from paged_table import FramePageSource, render_paged_table
+from export_utils import render_export
+from swr_cache import swr_cache, format_age
+from shared_cache import shared_cache
 
 # Configuración de la página
 st.set_page_config(
@@ -19,77 +36,263 @@ Este dashboard muestra información sobre la instalación de parches en instanci
 # Parámetros de conexión
 DYNAMO_TABLE = "<NOMBRE_DE_TU_TABLA>"  # <-- Cambia esto por el nombre real de tu tabla
 REGION_NAME = "us-east-1"  # <-- Cambia esto si tu tabla está en otra región
+FILTER_ATTRIBUTES = ['AccountId', 'PlataformaName', 'PlataformVersion', 'CreationDate']
+DETAIL_COLUMNS = [
+    'instanceId', 'AccountId', 'InstanceName', 'PlataformaName',
+    'PlataformVersion', 'CreationDate', 'LastUpdatePatching'
+]
 
-@st.cache_data
-def load_dynamo_data():
+# Réplica local opcional de la tabla en SQLite (ruta del fichero). Por
+# defecto no se usa: cada combinación de filtros se lee de DynamoDB con un
+# Query sobre el índice que aplique y solo recurre al Scan si no hay ninguno
+PATCH_CACHE_DB = os.environ.get('PATCH_CACHE_DB', '')
+# Fichero JSON Lines opcional con cambios en formato DynamoDB Streams
+PATCH_CHANGE_FEED = os.environ.get('PATCH_CHANGE_FEED', '')
+# Valores de la clave de partición del GSI que tiene LastUpdatePatching como
+# clave de rango, separados por comas. Con ese índice cada sincronización lee
+# solo los items cambiados; sin él es un Scan completo que consume las mismas
+# RCU que leer la tabla entera, así que se sincroniza con mucha menos frecuencia
+PATCH_SYNC_PARTITIONS = [value for value in os.environ.get('PATCH_SYNC_PARTITIONS', '').split(',') if value]
+SYNC_INTERVAL_SECONDS = 15 * 60 if PATCH_SYNC_PARTITIONS else 6 * 60 * 60
+# Combinaciones de filtros leídas de la réplica que se mantienen en memoria
+READ_CACHE_ENTRIES = 16
+# Scan completo (sin réplica local): se refresca en segundo plano pasados
+# 15 minutos y se descarta pasadas 4 horas. Los resultados se comparten entre
+# réplicas a través de la caché en disco (SHARED_CACHE_PATH)
+SCAN_SOFT_TTL = 15 * 60
+SCAN_HARD_TTL = 4 * 60 * 60
+# Los valores de los filtros cambian poco: sin réplica se leen con un scan
+# proyectado como mucho cada 6 horas
+OPTIONS_TTL = 6 * 60 * 60
+
+def get_table():
     dynamodb = boto3.resource('dynamodb', region_name=REGION_NAME)
-    table = dynamodb.Table(DYNAMO_TABLE)
-    response = table.scan()
-    data = response.get('Items', [])
-    # Manejar paginación si hay más de 1MB de datos
-    while 'LastEvaluatedKey' in response:
-        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-        data.extend(response.get('Items', []))
+    return dynamodb.Table(DYNAMO_TABLE)
+
+def items_to_dataframe(data):
     df = pd.DataFrame(data)
+    # Un resultado vacío o incompleto conserva las columnas que usan los filtros y la tabla
+    missing = [name for name in DETAIL_COLUMNS if name not in df.columns]
+    if missing:
+        df = df.reindex(columns=list(df.columns) + missing)
     # Convertir fechas
     if 'CreationDate' in df.columns:
         df['CreationDate'] = pd.to_datetime(df['CreationDate'], errors='coerce')
     if 'LastUpdatePatching' in df.columns:
         df['LastUpdatePatching'] = pd.to_datetime(df['LastUpdatePatching'], errors='coerce')
+    return compact_dataframe(df)
+
+def scan_table(**kwargs):
+    table = get_table()
+    response = table.scan(**kwargs)
+    data = response.get('Items', [])
+    # Manejar paginación si hay más de 1MB de datos
+    while 'LastEvaluatedKey' in response:
+        response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'], **kwargs)
+        data.extend(response.get('Items', []))
+    return data
+
+# Los DataFrames se cachean como recurso: cada rerun recibe el mismo objeto
+# sin copiarlo, por lo que el script no debe modificarlos
+@swr_cache(soft_ttl=SCAN_SOFT_TTL, hard_ttl=SCAN_HARD_TTL, shared=True)
+def load_dynamo_data():
+    return items_to_dataframe(scan_table())
+
+@st.cache_resource
+def get_patch_cache():
+    return PatchCache(PATCH_CACHE_DB)
+
+def sync_patch_cache():
+    """Actualiza la réplica local solo con los cambios desde la última sincronización
+
+    Devuelve None si otra sesión o réplica ya está sincronizando.
+    """
+    cache = get_patch_cache()
+    changed = cache.sync_from_table(get_table(), PATCH_SYNC_PARTITIONS)
+    if changed is None:
+        return None
+    if PATCH_CHANGE_FEED and os.path.exists(PATCH_CHANGE_FEED):
+        changed += cache.apply_change_feed(PATCH_CHANGE_FEED) or 0
+    load_filter_options.clear()
+    read_patch_cache.clear()
+    load_cache_aggregates.clear()
+    return changed
+
+# Acotado en número de combinaciones y en tiempo: cada entrada es un
+# DataFrame completo y las combinaciones de filtros no tienen límite
+@st.cache_resource(max_entries=READ_CACHE_ENTRIES, ttl=SYNC_INTERVAL_SECONDS)
+def read_patch_cache(equals, date_range):
+    return items_to_dataframe(get_patch_cache().load_items(dict(equals), date_range))
+
+@st.cache_resource
+def load_cache_aggregates():
+    """Agregado de cumplimiento mantenido por la réplica local en cada sincronización"""
+    return aggregates_from_rows(get_patch_cache().load_aggregates())
+
+@shared_cache(ttl=OPTIONS_TTL)
+def load_filter_options():
+    """Valores disponibles para cada filtro y rango de CreationDate"""
+    if PATCH_CACHE_DB:
+        cache = get_patch_cache()
+        options = {name: cache.get_distinct_values(name) for name in FILTER_ATTRIBUTES[:3]}
+        options['CreationDate'] = tuple(pd.to_datetime(list(cache.get_date_range()), errors='coerce'))
+        return options
+
+    # Sin réplica local los valores salen del scan completo si ya está en
+    # caché; si no, de un scan proyectado a los atributos de los filtros. Cuesta
+    # las mismas RCU (DynamoDB cobra por el tamaño de los items leídos), pero
+    # se repite solo cada OPTIONS_TTL y deja que los datos se lean con Query
+    df = load_dynamo_data.peek()
+    if df is None:
+        names = {f'#a{i}': name for i, name in enumerate(FILTER_ATTRIBUTES)}
+        df = items_to_dataframe(scan_table(ProjectionExpression=', '.join(names), ExpressionAttributeNames=names))
+    options = {name: sorted(df[name].dropna().unique().tolist()) if name in df.columns else [] for name in FILTER_ATTRIBUTES[:3]}
+    if 'CreationDate' in df.columns:
+        options['CreationDate'] = (df['CreationDate'].min(), df['CreationDate'].max())
+    return options
+
+@swr_cache(soft_ttl=SCAN_SOFT_TTL, hard_ttl=SCAN_HARD_TTL, shared=True)
+def query_dynamo_data(equals, date_range):
+    """Consulta solo los items que cumplen los filtros si algún índice aplica
+
+    Devuelve None cuando no hay índice utilizable y hay que usar el scan completo.
+    """
+    table = get_table()
+    query_kwargs = plan_query(get_table_indexes(table), dict(equals), date_range)
+    if query_kwargs is None:
+        return None
+    return items_to_dataframe(run_query(table, query_kwargs))
+
+class PatchCachePageSource:
+    """Origen de páginas que resuelve búsqueda, orden y paginación en la réplica SQLite"""
+
+    def __init__(self, equals, date_range):
+        self.equals = equals
+        self.date_range = date_range
+        self.columns = DETAIL_COLUMNS
+        self.sortable_columns = [c for c in DETAIL_COLUMNS if c in INDEXED_COLUMNS]
+
+    def count(self, search):
+        return get_patch_cache().count_items(self.equals, self.date_range, search)
+
+    def page(self, search, sort_by, ascending, offset, limit):
+        items = get_patch_cache().load_page(
+            self.equals, self.date_range, search, sort_by, ascending, offset, limit
+        )
+        return items_to_dataframe(items).reindex(columns=self.columns)
+
+def load_patch_data(equals, date_range):
+    """Lee los datos filtrados de la réplica local o, si está desactivada, de DynamoDB
+
+    Sin réplica se reutiliza el scan completo si ya está en caché; si no, los
+    filtros se resuelven con un Query cuando algún índice aplica.
+    """
+    if PATCH_CACHE_DB:
+        return read_patch_cache(equals, date_range)
+    df = load_dynamo_data.peek()
+    if df is None:
+        df = query_dynamo_data(equals, date_range)
+    if df is None:
+        df = load_dynamo_data()
     return df
 
-# Cargar datos
+# Sin réplica local los datos se refrescan con el mismo calendario que el scan
+@swr_cache(soft_ttl=SCAN_SOFT_TTL, hard_ttl=SCAN_HARD_TTL, shared=True)
+def load_query_aggregates(equals, date_range):
+    return build_aggregates(load_patch_data(equals, date_range))
+
+# Sincronizar la réplica local si está vacía, caducada o se solicita
 try:
-    df = load_dynamo_data()
-    st.success(f"Datos cargados correctamente. Total registros: {len(df)}")
+    if PATCH_CACHE_DB:
+        if st.sidebar.button("Sincronizar con DynamoDB") or get_patch_cache().needs_sync(SYNC_INTERVAL_SECONDS):
+            with st.spinner("Sincronizando cambios desde DynamoDB..."):
+                changed = sync_patch_cache()
+            if changed is None:
+                st.sidebar.caption("Otra sesión está sincronizando la réplica; se muestran los datos locales")
+            else:
+                st.sidebar.caption(f"Items actualizados en la última sincronización: {changed}")
+        last_sync = get_patch_cache().get_last_sync()
+        if last_sync:
+            st.sidebar.caption(f"Réplica local sincronizada: {last_sync.strftime('%Y-%m-%d %H:%M:%S')}")
+    elif load_dynamo_data.info() is not None:
+        st.sidebar.caption(format_age(load_dynamo_data.info()))
+except Exception as e:
+    st.warning(f"No se pudo sincronizar con DynamoDB, se muestran los datos locales: {e}")
+
+# Cargar opciones de filtros
+try:
+    options = load_filter_options()
 except Exception as e:
     st.error(f"Error al cargar datos de DynamoDB: {e}")
     st.stop()
 
 # Filtros en la barra lateral
 st.sidebar.header("Filtros")
-account_ids = ['Todos'] + sorted(df['AccountId'].dropna().unique().tolist())
+account_ids = ['Todos'] + options['AccountId']
 selected_account = st.sidebar.selectbox('Cuenta AWS', account_ids)
-plataformas = ['Todas'] + sorted(df['PlataformaName'].dropna().unique().tolist())
+plataformas = ['Todas'] + options['PlataformaName']
 selected_plataforma = st.sidebar.selectbox('Plataforma', plataformas)
-versions = ['Todas'] + sorted(df['PlataformVersion'].dropna().unique().tolist())
+versions = ['Todas'] + options['PlataformVersion']
 selected_version = st.sidebar.selectbox('Versión de Plataforma', versions)
 
 # Filtro por fecha de creación
-if 'CreationDate' in df.columns:
-    min_date = df['CreationDate'].min()
-    max_date = df['CreationDate'].max()
+if 'CreationDate' in options and pd.notna(options['CreationDate'][0]):
+    min_date, max_date = options['CreationDate']
     start_date = st.sidebar.date_input('Fecha inicial (CreationDate)', min_date)
     end_date = st.sidebar.date_input('Fecha final (CreationDate)', max_date)
 else:
     start_date = end_date = None
 
-# Aplicar filtros
-filtered_df = df.copy()
+# Enviar a la réplica local o a DynamoDB los filtros que se puedan resolver allí
+equals = {}
 if selected_account != 'Todos':
-    filtered_df = filtered_df[filtered_df['AccountId'] == selected_account]
+    equals['AccountId'] = selected_account
 if selected_plataforma != 'Todas':
-    filtered_df = filtered_df[filtered_df['PlataformaName'] == selected_plataforma]
+    equals['PlataformaName'] = selected_plataforma
 if selected_version != 'Todas':
-    filtered_df = filtered_df[filtered_df['PlataformVersion'] == selected_version]
+    equals['PlataformVersion'] = selected_version
+date_range = (start_date, end_date) if start_date and end_date else None
+
+try:
+    df = load_patch_data(tuple(sorted(equals.items())), date_range)
+    st.success(f"Datos cargados correctamente. Total registros: {len(df)}")
+except Exception as e:
+    st.error(f"Error al cargar datos de DynamoDB: {e}")
+    st.stop()
+
+if 'memory_mb' in df.attrs:
+    before_mb, after_mb = df.attrs['memory_mb']
+    st.sidebar.caption(f"Memoria de los datos: {before_mb:.1f} MB → {after_mb:.1f} MB")
+
+# Aplicar filtros con una sola máscara para copiar solo las filas seleccionadas
+mask = filter_mask(df, equals)
 if start_date and end_date:
-    filtered_df = filtered_df[(filtered_df['CreationDate'] >= pd.to_datetime(start_date)) & (filtered_df['CreationDate'] <= pd.to_datetime(end_date))]
+    # La fecha final se incluye completa, igual que en los agregados por día
+    mask &= (df['CreationDate'] >= pd.to_datetime(start_date)) & (df['CreationDate'] < pd.to_datetime(end_date) + pd.Timedelta(days=1))
+filtered_df = df if mask.all() else df[mask]
+
+# Los indicadores y gráficos salen del agregado precalculado, no de las filas
+equals_key = tuple(sorted(equals.items()))
+cube = load_cache_aggregates() if PATCH_CACHE_DB else load_query_aggregates(equals_key, date_range)
+cube = slice_aggregates(cube, equals, date_range)
 
 # Métricas principales
+cuenta_counts = count_by(cube, 'AccountId')
+plataforma_counts = count_by(cube, 'PlataformaName')
 col1, col2, col3 = st.columns(3)
 with col1:
+    # Instancias distintas, como antes del agregado (que cuenta filas)
     st.metric("Total de Instancias", filtered_df['instanceId'].nunique())
 with col2:
-    st.metric("Cuentas Únicas", filtered_df['AccountId'].nunique())
+    st.metric("Cuentas Únicas", len(cuenta_counts))
 with col3:
-    st.metric("Plataformas Únicas", filtered_df['PlataformaName'].nunique())
+    st.metric("Plataformas Únicas", len(plataforma_counts))
 
 # Gráficos
 st.subheader("Instancias por Cuenta AWS")
-if not filtered_df.empty:
-    cuenta_counts = filtered_df['AccountId'].value_counts()
+if not cuenta_counts.empty:
     fig_cuenta = px.bar(
-        x=cuenta_counts.index,
+        x=cuenta_counts.index.astype(str),
         y=cuenta_counts.values,
         labels={'x': 'AccountId', 'y': 'Cantidad de Instancias'},
         title="Cantidad de Instancias por Cuenta AWS"
@@ -97,46 +300,60 @@ if not filtered_df.empty:
     st.plotly_chart(fig_cuenta, use_container_width=True)
 
     st.subheader("Instancias por Plataforma")
-    plataforma_counts = filtered_df['PlataformaName'].value_counts()
     fig_plataforma = px.pie(
         values=plataforma_counts.values,
-        names=plataforma_counts.index,
+        names=plataforma_counts.index.astype(str),
         title="Distribución por Plataforma"
     )
     st.plotly_chart(fig_plataforma, use_container_width=True)
 
     st.subheader("Evolución de Creación de Instancias")
-    if 'CreationDate' in filtered_df.columns:
-        daily = filtered_df.groupby(filtered_df['CreationDate'].dt.date).size()
-        fig_tiempo = px.line(
-            x=daily.index,
-            y=daily.values,
-            labels={'x': 'Fecha', 'y': 'Nuevas Instancias'},
-            title="Instancias creadas por día"
+    daily = cube.groupby('creation_day')['instances'].sum()
+    fig_tiempo = px.line(
+        x=daily.index,
+        y=daily.values,
+        labels={'x': 'Fecha', 'y': 'Nuevas Instancias'},
+        title="Instancias creadas por día"
+    )
+    st.plotly_chart(fig_tiempo, use_container_width=True)
+
+    st.subheader("Antigüedad del Último Parche")
+    min_days = st.select_slider(
+        "Mostrar instancias sin parchear en más de (días)",
+        options=AGE_BUCKET_EDGES,
+        value=30
+    )
+    st.metric(f"Instancias sin parchear > {min_days} días", unpatched_instances(cube, min_days))
+    age_counts = patch_age_buckets(cube)
+    fig_antiguedad = px.bar(
+        x=age_counts.index.astype(str),
+        y=age_counts.values,
+        labels={'x': 'Días desde el último parche', 'y': 'Cantidad de Instancias'},
+        title="Instancias por días desde LastUpdatePatching"
+    )
+    st.plotly_chart(fig_antiguedad, use_container_width=True)
+    if st.checkbox(f"Ver instancias sin parchear > {min_days} días") and 'LastUpdatePatching' in filtered_df.columns:
+        limit = pd.Timestamp.now().normalize() - pd.Timedelta(days=min_days)
+        unpatched = filtered_df['LastUpdatePatching'].isna() | (filtered_df['LastUpdatePatching'] < limit)
+        unpatched_columns = ['instanceId', 'AccountId', 'InstanceName', 'LastUpdatePatching']
+        render_paged_table(
+            FramePageSource(filtered_df.loc[unpatched, unpatched_columns], 'patch_unpatched'),
+            key='patch_unpatched',
+            default_sort='LastUpdatePatching'
         )
-        st.plotly_chart(fig_tiempo, use_container_width=True)
 else:
     st.info("No hay datos para mostrar con los filtros seleccionados.")
 
 # Tabla de datos detallada
 st.subheader("Detalles de Instancias")
-st.dataframe(
-    filtered_df[[
-        'instanceId', 'AccountId', 'InstanceName', 'PlataformaName',
-        'PlataformVersion', 'CreationDate', 'LastUpdatePatching'
-    ]],
-    use_container_width=True
-)
+if PATCH_CACHE_DB:
+    source = PatchCachePageSource(equals, date_range)
+else:
+    source = FramePageSource(filtered_df, 'patch_details', columns=DETAIL_COLUMNS)
+render_paged_table(source, key='patch_details')
 
 # Exportar datos
-if st.button("Exportar Datos Filtrados"):
-    csv = filtered_df.to_csv(index=False)
-    st.download_button(
-        label="Descargar CSV",
-        data=csv,
-        file_name="dynamo_patches_data.csv",
-        mime="text/csv"
-    )
+render_export(filtered_df, 'patch_data', file_name="dynamo_patches_data", label="Exportar Datos Filtrados")
 
 st.markdown("---")
 st.markdown("Dashboard creado con Streamlit y DynamoDB | Última actualización: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S")) 
\ No newline at end of file
@@ -0,0 +1,111 @@
+from boto3.dynamodb.conditions import Attr, Key
+
+# Atributo de fecha que se puede usar como clave de rango en la consulta
+DATE_ATTRIBUTE = 'CreationDate'
+
+
+def get_table_indexes(table):
+    """Devuelve la clave primaria y los índices utilizables de la tabla
+
+    Cada elemento es un diccionario con el nombre del índice (None para la
+    clave primaria), su clave de partición y su clave de rango. Solo se
+    incluyen los índices que proyectan todos los atributos, ya que el
+    dashboard necesita el item completo.
+    """
+    def _keys(key_schema):
+        keys = {k['KeyType']: k['AttributeName'] for k in key_schema}
+        return keys.get('HASH'), keys.get('RANGE')
+
+    hash_key, range_key = _keys(table.key_schema)
+    indexes = [{'name': None, 'hash': hash_key, 'range': range_key}]
+
+    secondary = (table.global_secondary_indexes or []) + (table.local_secondary_indexes or [])
+    for index in secondary:
+        if index.get('Projection', {}).get('ProjectionType') != 'ALL':
+            continue
+        if index.get('IndexStatus', 'ACTIVE') != 'ACTIVE':
+            continue
+        hash_key, range_key = _keys(index['KeySchema'])
+        indexes.append({'name': index['IndexName'], 'hash': hash_key, 'range': range_key})
+    return indexes
+
+
+def date_bounds(date_range):
+    """Convierte un rango de fechas en límites de texto ISO inclusivos"""
+    start_date, end_date = date_range
+    return start_date.isoformat(), end_date.isoformat() + 'T23:59:59.999999'
+
+
+def plan_query(indexes, equals, date_range=None):
+    """Elige la mejor forma de leer la tabla para los filtros indicados
+
+    `equals` es un diccionario atributo -> valor con los filtros de igualdad
+    y `date_range` una tupla (inicio, fin) sobre CreationDate. Devuelve los
+    argumentos para `table.query` o None si ningún índice aplica y hay que
+    recurrir al scan completo.
+    """
+    best, best_score = None, 0
+    for index in indexes:
+        if index['hash'] not in equals:
+            continue
+        score = 1
+        if index['range'] in equals or (index['range'] == DATE_ATTRIBUTE and date_range):
+            score = 2
+        if score > best_score:
+            best, best_score = index, score
+
+    if best is None:
+        return None
+
+    pending = dict(equals)
+    key_condition = Key(best['hash']).eq(pending.pop(best['hash']))
+    use_date_key = False
+    if best['range'] in pending:
+        key_condition &= Key(best['range']).eq(pending.pop(best['range']))
+    elif best['range'] == DATE_ATTRIBUTE and date_range:
+        key_condition &= Key(DATE_ATTRIBUTE).between(*date_bounds(date_range))
+        use_date_key = True
+
+    filter_expression = None
+    conditions = [Attr(name).eq(value) for name, value in pending.items()]
+    if date_range and not use_date_key:
+        conditions.append(Attr(DATE_ATTRIBUTE).between(*date_bounds(date_range)))
+    for condition in conditions:
+        filter_expression = condition if filter_expression is None else filter_expression & condition
+
+    kwargs = {'KeyConditionExpression': key_condition}
+    if best['name']:
+        kwargs['IndexName'] = best['name']
+    if filter_expression is not None:
+        kwargs['FilterExpression'] = filter_expression
+    return kwargs
+
+
+def plan_sync_queries(indexes, attribute, since, partitions):
+    """Consultas para leer solo los items con `attribute` >= since
+
+    DynamoDB exige igualdad sobre la clave de partición y solo admite rangos
+    sobre la de rango, así que hace falta un índice con `attribute` como clave
+    de rango, que se consulta una vez por cada valor de su clave de partición
+    (`partitions`). Devuelve None si no hay índice o no se conocen los valores.
+    """
+    index = next((index for index in indexes if index['range'] == attribute), None)
+    if index is None or not partitions:
+        return None
+    queries = []
+    for partition in partitions:
+        kwargs = {'KeyConditionExpression': Key(index['hash']).eq(partition) & Key(attribute).gte(since)}
+        if index['name']:
+            kwargs['IndexName'] = index['name']
+        queries.append(kwargs)
+    return queries
+
+
+def run_query(table, query_kwargs):
+    """Ejecuta la consulta recorriendo todas las páginas"""
+    response = table.query(**query_kwargs)
+    data = response.get('Items', [])
+    while 'LastEvaluatedKey' in response:
+        response = table.query(ExclusiveStartKey=response['LastEvaluatedKey'], **query_kwargs)
+        data.extend(response.get('Items', []))
+    return data
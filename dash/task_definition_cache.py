@@ -0,0 +1,232 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Failed ARNs are retried after this delay, doubled on every failure up to the maximum
+ERROR_RETRY_SECONDS = 60
+MAX_ERROR_RETRY_SECONDS = 3600
+# The trigram index only answers terms of at least this many characters
+MIN_INDEXED_TERM = 3
+
+
+class TaskDefinitionCache:
+    """Permanent on-disk cache of ECS task definitions keyed by ARN
+
+    Task definition revisions are immutable, so entries never expire. Besides
+    the full document, the family and the image of every container are stored
+    in their own tables to allow searching without describing anything. The
+    substring search uses an FTS5 trigram index with one row per container,
+    sharing the rowid of container_images; without FTS5 it scans with LIKE.
+    """
+
+    def __init__(self, db_path='task_definitions.db'):
+        self.db_path = db_path
+        self.fts = True
+        self.init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_db(self):
+        """Initialize the database and create tables if they don't exist"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS task_definitions (
+                arn TEXT PRIMARY KEY,
+                family TEXT,
+                revision INTEGER,
+                document TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS container_images (
+                arn TEXT,
+                container TEXT,
+                image TEXT,
+                FOREIGN KEY (arn) REFERENCES task_definitions(arn)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_td_family ON task_definitions (family)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_images_arn ON container_images (arn)')
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS task_definition_search
+                USING fts5(family, image, tokenize='trigram')
+            ''')
+        except sqlite3.OperationalError:
+            # SQLite without FTS5, or older than 3.34 (no trigram tokenizer)
+            self.fts = False
+        if self.fts:
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM task_definition_search)')
+            if not cursor.fetchone()[0]:
+                # Index the definitions cached before the search table existed
+                cursor.execute('''
+                    INSERT INTO task_definition_search (rowid, family, image)
+                    SELECT ci.rowid, td.family, ci.image
+                    FROM container_images ci JOIN task_definitions td ON td.arn = ci.arn
+                ''')
+
+        conn.commit()
+        conn.close()
+
+    def get(self, arn):
+        """Return the cached task definition or None"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT document FROM task_definitions WHERE arn = ?', (arn,))
+        row = cursor.fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else None
+
+    def put(self, task_definition):
+        """Store a task definition as returned by describe_task_definition"""
+        arn = task_definition['taskDefinitionArn']
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO task_definitions (arn, family, revision, document)
+            VALUES (?, ?, ?, ?)
+        ''', (
+            arn,
+            task_definition.get('family'),
+            task_definition.get('revision'),
+            json.dumps(task_definition, default=str)
+        ))
+        if self.fts:
+            cursor.execute(
+                'DELETE FROM task_definition_search WHERE rowid IN (SELECT rowid FROM container_images WHERE arn = ?)',
+                (arn,)
+            )
+        cursor.execute('DELETE FROM container_images WHERE arn = ?', (arn,))
+        for container in task_definition.get('containerDefinitions', []):
+            cursor.execute(
+                'INSERT INTO container_images (arn, container, image) VALUES (?, ?, ?)',
+                (arn, container.get('name'), container.get('image'))
+            )
+            if self.fts:
+                cursor.execute(
+                    'INSERT INTO task_definition_search (rowid, family, image) VALUES (?, ?, ?)',
+                    (cursor.lastrowid, task_definition.get('family'), container.get('image'))
+                )
+        conn.commit()
+        conn.close()
+
+    def missing(self, arns):
+        """Return the ARNs that are not cached yet, preserving order"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cached = set()
+        arns = list(arns)
+        # Stay below SQLite's limit of bound parameters per statement
+        for start in range(0, len(arns), 500):
+            chunk = arns[start:start + 500]
+            cursor.execute(
+                f'SELECT arn FROM task_definitions WHERE arn IN ({", ".join("?" for _ in chunk)})',
+                chunk
+            )
+            cached.update(row[0] for row in cursor.fetchall())
+        conn.close()
+        return [arn for arn in arns if arn not in cached]
+
+    def search(self, term, limit=200):
+        """Find cached task definitions whose family or container image contains term
+
+        Terms of MIN_INDEXED_TERM characters or more are answered from the
+        trigram index; shorter ones, or a SQLite without FTS5, scan with LIKE.
+        Both match case-insensitively.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        if self.fts and len(term) >= MIN_INDEXED_TERM:
+            # A quoted phrase matches the term literally as a substring
+            phrase = '"' + term.replace('"', '""') + '"'
+            cursor.execute('''
+                SELECT td.arn, td.family, td.revision, ci.container, ci.image
+                FROM task_definition_search s
+                JOIN container_images ci ON ci.rowid = s.rowid
+                JOIN task_definitions td ON td.arn = ci.arn
+                WHERE task_definition_search MATCH ?
+                ORDER BY td.family, td.revision DESC
+                LIMIT ?
+            ''', (phrase, limit))
+        else:
+            # Match % and _ in the term literally
+            escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            pattern = f'%{escaped}%'
+            cursor.execute('''
+                SELECT td.arn, td.family, td.revision, ci.container, ci.image
+                FROM task_definitions td
+                LEFT JOIN container_images ci ON ci.arn = td.arn
+                WHERE td.family LIKE ? ESCAPE '\\' OR ci.image LIKE ? ESCAPE '\\'
+                ORDER BY td.family, td.revision DESC
+                LIMIT ?
+            ''', (pattern, pattern, limit))
+        rows = [
+            dict(zip(['arn', 'family', 'revision', 'container', 'image'], row))
+            for row in cursor.fetchall()
+        ]
+        conn.close()
+        return rows
+
+    def count(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM task_definitions')
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+
+
+class TaskDefinitionPrefetcher:
+    """Describe uncached task definitions in the background, in batches
+
+    Failures such as throttling are not permanent: a failed ARN is skipped
+    until its retry time, which backs off exponentially with each failure.
+    """
+
+    def __init__(self, cache, ecs_client, batch_size=10, max_workers=4):
+        self.cache = cache
+        self.ecs_client = ecs_client
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='td-prefetch')
+        self.lock = threading.Lock()
+        self.in_flight = set()
+        self.errors = {}
+
+    def _fetch_batch(self, arns):
+        try:
+            for arn in arns:
+                try:
+                    response = self.ecs_client.describe_task_definition(taskDefinition=arn)
+                    self.cache.put(response['taskDefinition'])
+                    with self.lock:
+                        self.errors.pop(arn, None)
+                except Exception as e:
+                    with self.lock:
+                        failures = self.errors[arn]['failures'] + 1 if arn in self.errors else 1
+                        delay = min(MAX_ERROR_RETRY_SECONDS, ERROR_RETRY_SECONDS * 2 ** (failures - 1))
+                        self.errors[arn] = {'error': str(e), 'failures': failures, 'retry_at': time.monotonic() + delay}
+        finally:
+            with self.lock:
+                self.in_flight.difference_update(arns)
+
+    def prefetch(self, arns):
+        """Schedule every uncached ARN; returns how many were scheduled"""
+        now = time.monotonic()
+        with self.lock:
+            pending = [
+                arn for arn in self.cache.missing(arns)
+                if arn not in self.in_flight and (arn not in self.errors or self.errors[arn]['retry_at'] <= now)
+            ]
+            self.in_flight.update(pending)
+        for start in range(0, len(pending), self.batch_size):
+            self.executor.submit(self._fetch_batch, pending[start:start + self.batch_size])
+        return len(pending)
+
+    def pending(self):
+        with self.lock:
+            return len(self.in_flight)
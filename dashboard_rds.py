@@ -1,37 +1,90 @@
 import streamlit as st
 import boto3
 from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeDeserializer
 import pandas as pd
 import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from shared_cache import get_shared_cache
+from swr_cache import swr_cache
+from fanout import run_progressive, FANOUT_TIMEOUT_SECONDS
+from org_inventory import list_accounts, AssumedRoleCredentials, inventory_tasks, inventory_timeout, ASSUME_ROLE_WORKERS
 
 st.title('Dashboard de RDS Multi-Cuenta')
 
 # --- Configuración de cuentas y roles ---
-# Lista de cuentas y roles de la landing zone (puedes cargar esto de un archivo, variable de entorno o DynamoDB)
+# Las cuentas se descubren en AWS Organizations; esta lista solo se usa si la
+# cuenta del dashboard no puede listar la organización
 LANDING_ZONE_ACCOUNTS = [
     {"account_id": "111111111111", "name": "Cuenta Producción", "role": "arn:aws:iam::111111111111:role/RoleParaDashboard"},
     {"account_id": "222222222222", "name": "Cuenta Desarrollo", "role": "arn:aws:iam::222222222222:role/RoleParaDashboard"},
     # Agrega más cuentas aquí
 ]
 
+ACCOUNTS_SOFT_TTL = 60 * 60  # Las cuentas de la organización cambian poco
+ACCOUNTS_HARD_TTL = 24 * 60 * 60
+ACCOUNTS_ERROR_TTL = 5 * 60  # Tras un fallo no se vuelve a llamar a Organizations durante este tiempo
+
+@swr_cache(soft_ttl=ACCOUNTS_SOFT_TTL, hard_ttl=ACCOUNTS_HARD_TTL)
+def discover_accounts():
+    """Cuentas activas de la organización, paginadas desde AWS Organizations"""
+    return list_accounts(boto3.client('organizations'))
+
+@st.cache_resource
+def get_accounts_failure():
+    """Último fallo al listar la organización, compartido por todas las sesiones"""
+    return {}
+
+def load_accounts():
+    """Cuentas de la organización; tras un fallo se lanza el mismo error sin
+    reintentar hasta que pasa ACCOUNTS_ERROR_TTL"""
+    failure = get_accounts_failure()
+    if failure and time.time() - failure['at'] < ACCOUNTS_ERROR_TTL:
+        raise RuntimeError(failure['error'])
+    try:
+        accounts = discover_accounts()
+    except Exception as e:
+        failure.update(error=str(e), at=time.time())
+        raise
+    failure.clear()
+    return accounts
+
+# Credenciales de AssumeRole compartidas por todas las sesiones hasta que caducan
+@st.cache_resource
+def get_credentials():
+    return AssumedRoleCredentials(boto3.client('sts'))
+
 # --- Menú lateral ---
-menu = st.sidebar.radio('Selecciona el dashboard', ['Histórico', 'Tiempo Real'])
+menu = st.sidebar.radio('Selecciona el dashboard', ['Histórico', 'Tiempo Real', 'Inventario Flota'])
 
 # --- Selección de cuenta y región ---
-account_names = [f"{acc['name']} ({acc['account_id']})" for acc in LANDING_ZONE_ACCOUNTS]
-selected_account_idx = st.sidebar.selectbox('Cuenta AWS', range(len(account_names)), format_func=lambda i: account_names[i])
-selected_account = LANDING_ZONE_ACCOUNTS[selected_account_idx]
+try:
+    accounts = load_accounts()
+except Exception as e:
+    st.sidebar.warning(f"No se pudieron listar las cuentas de la organización, se usa la lista local: {e}")
+    accounts = LANDING_ZONE_ACCOUNTS
+# Se selecciona por account_id: un refresco de la lista que cambie el orden
+# de las cuentas no cambia la cuenta seleccionada
+accounts_by_id = {acc['account_id']: acc for acc in accounts}
+selected_account_id = st.sidebar.selectbox(
+    'Cuenta AWS',
+    list(accounts_by_id),
+    format_func=lambda account_id: f"{accounts_by_id[account_id]['name']} ({account_id})"
+)
+selected_account = accounts_by_id[selected_account_id]
 regions = ['us-east-1', 'us-west-2', 'eu-west-1']
 selected_region = st.sidebar.selectbox('Región', regions)
 
+# --- Lectura del histórico ---
+HISTORY_SCAN_SEGMENTS = 4  # Segmentos de scan paralelo
+HISTORY_TTL_SECONDS = 10 * 60  # Tiempo que se reutiliza el histórico leído
+HISTORY_PREVIEW_ROWS = 1000  # Filas que se muestran mientras se sigue leyendo
+
 # --- Función para asumir rol en otra cuenta ---
 def get_session_for_account(account):
-    sts = boto3.client('sts')
-    assumed = sts.assume_role(
-        RoleArn=account['role'],
-        RoleSessionName='DashboardSession'
-    )
-    creds = assumed['Credentials']
+    creds = get_credentials().get(account['role'])
     session = boto3.Session(
         aws_access_key_id=creds['AccessKeyId'],
         aws_secret_access_key=creds['SecretAccessKey'],
@@ -40,29 +93,84 @@ def get_session_for_account(account):
     )
     return session
 
+# --- Lectura paginada y paralela del histórico en DynamoDB ---
+def scan_segment(client, table_name, segment, total_segments, pages):
+    """Recorre todas las páginas de un segmento y deja cada una en la cola"""
+    deserializer = TypeDeserializer()
+    kwargs = {'TableName': table_name, 'Segment': segment, 'TotalSegments': total_segments}
+    while True:
+        response = client.scan(**kwargs)
+        items = [
+            {name: deserializer.deserialize(value) for name, value in item.items()}
+            for item in response.get('Items', [])
+        ]
+        pages.put(items)
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def read_rds_history(session, account_id, table_name, placeholder, refresh=False):
+    """Lee la tabla completa con scan paralelo y muestra los resultados según llegan
+
+    El histórico leído se guarda en la caché en disco compartida por todos los
+    procesos y réplicas (SHARED_CACHE_PATH), así que una réplica nueva no
+    vuelve a escanear la tabla.
+    """
+    cache = get_shared_cache()
+    key = f'rds_history:{account_id}:{session.region_name}:{table_name}'
+    cached = cache.get(key)
+    if cached and not refresh:
+        return cached[0]
+
+    # Los clientes de boto3 se pueden compartir entre hilos, los recursos no
+    client = session.client('dynamodb')
+    pages = queue.Queue()
+    items = []
+    with ThreadPoolExecutor(max_workers=HISTORY_SCAN_SEGMENTS) as executor:
+        futures = [
+            executor.submit(scan_segment, client, table_name, segment, HISTORY_SCAN_SEGMENTS, pages)
+            for segment in range(HISTORY_SCAN_SEGMENTS)
+        ]
+        while not all(f.done() for f in futures) or not pages.empty():
+            try:
+                page = pages.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if page:
+                items.extend(page)
+                with placeholder.container():
+                    st.caption(f"Cargando histórico... {len(items)} registros leídos")
+                    st.dataframe(pd.DataFrame(items[:HISTORY_PREVIEW_ROWS]))
+        # Propagar el primer error de los segmentos
+        for future in futures:
+            future.result()
+
+    cache.set(key, items, HISTORY_TTL_SECONDS)
+    return items
+
 # --- Dashboard Histórico ---
 def dashboard_historico():
     # Nombre de la tabla DynamoDB (puedes cambiarlo por el nombre real)
     dynamo_table_name = st.text_input('Nombre de la tabla DynamoDB con histórico de RDS', 'rds_historico')
-    def get_rds_history(session, table_name):
-        try:
-            dynamodb = session.resource('dynamodb')
-            table = dynamodb.Table(table_name)
-            response = table.scan()
-            items = response.get('Items', [])
-            return items
-        except Exception as e:
-            st.error(f"Error al obtener datos de DynamoDB: {e}")
-            return []
+    refresh = st.button('Recargar histórico')
     try:
         session = get_session_for_account(selected_account)
         st.header('Histórico de RDS (DynamoDB)')
-        history_data = get_rds_history(session, dynamo_table_name)
+        placeholder = st.empty()
+        try:
+            history_data = read_rds_history(
+                session, selected_account['account_id'], dynamo_table_name, placeholder, refresh
+            )
+        except Exception as e:
+            st.error(f"Error al obtener datos de DynamoDB: {e}")
+            history_data = []
         if history_data:
             df_history = pd.DataFrame(history_data)
-            st.dataframe(df_history)
+            with placeholder.container():
+                st.caption(f"{len(df_history)} registros")
+                st.dataframe(df_history)
         else:
-            st.info('No se encontraron datos históricos en DynamoDB o la tabla está vacía.')
+            placeholder.info('No se encontraron datos históricos en DynamoDB o la tabla está vacía.')
     except Exception as e:
         st.error(f"Error inesperado: {e}")
 
@@ -92,8 +200,50 @@ def dashboard_tiempo_real():
     except Exception as e:
         st.error(f"Error inesperado: {e}")
 
+# --- Inventario de toda la organización ---
+def dashboard_flota():
+    st.header(f"Inventario RDS de la organización ({len(accounts)} cuentas)")
+    fleet_regions = st.multiselect('Regiones', regions, default=[selected_region])
+    if not st.button('Consultar flota') or not fleet_regions:
+        return
+
+    # Se asume el rol en varias cuentas a la vez (ASSUME_ROLE_WORKERS como
+    # máximo) y la tabla crece según responde cada cuenta
+    results_placeholder = st.empty()
+
+    def _show(instances):
+        results_placeholder.dataframe(pd.DataFrame(instances), use_container_width=True)
+
+    # La espera crece con el número de cuentas y regiones: con el límite por
+    # defecto las cuentas de las últimas tandas se quedarían fuera del total
+    tasks = inventory_tasks(accounts, fleet_regions, get_credentials())
+    instances, errors = run_progressive(
+        tasks,
+        on_update=_show,
+        max_workers=ASSUME_ROLE_WORKERS,
+        timeout=max(FANOUT_TIMEOUT_SECONDS, inventory_timeout(len(tasks))),
+        label="Cuentas y regiones"
+    )
+
+    df_fleet = pd.DataFrame(instances)
+    col1, col2, col3 = st.columns(3)
+    col1.metric('Instancias', len(df_fleet))
+    col2.metric('Cuentas con instancias', df_fleet['AccountId'].nunique() if not df_fleet.empty else 0)
+    col3.metric('Orígenes con error', len(errors))
+    if df_fleet.empty:
+        results_placeholder.info('No se encontraron instancias RDS en la organización.')
+    if errors:
+        with st.expander(f"Errores ({len(errors)})"):
+            st.dataframe(
+                pd.DataFrame({'Origen': list(errors), 'Error': list(errors.values())}),
+                hide_index=True,
+                use_container_width=True
+            )
+
 # --- Renderizado según menú ---
 if menu == 'Histórico':
     dashboard_historico()
+elif menu == 'Tiempo Real':
+    dashboard_tiempo_real()
 else:
-    dashboard_tiempo_real() 
\ No newline at end of file
+    dashboard_flota() 
\ No newline at end of file
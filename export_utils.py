@@ -0,0 +1,174 @@
+import gzip
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import streamlit as st
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Filas por bloque al escribir el fichero de exportación
+CHUNK_ROWS = 50_000
+# A partir de este número de filas la exportación se hace en segundo plano y
+# no bloquea la ejecución del script
+BACKGROUND_ROWS = int(os.environ.get('EXPORT_BACKGROUND_ROWS', 20_000))
+# st.download_button carga el fichero entero en la memoria del servidor; por
+# encima de este tamaño no se sirve y se pide un formato comprimido o más filtros
+MAX_DOWNLOAD_MB = float(os.environ.get('EXPORT_MAX_DOWNLOAD_MB', 100))
+# Directorio temporal para los ficheros exportados y tiempo que se conservan
+SPOOL_DIR = os.path.join(tempfile.gettempdir(), 'dashboard_exports')
+SPOOL_MAX_AGE_SECONDS = 60 * 60
+
+# Los formatos comprimidos van primero para que sean la opción por defecto
+FORMATS = {
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'CSV comprimido (gzip)': ('.csv.gz', 'application/gzip'),
+    'CSV': ('.csv', 'text/csv'),
+}
+
+
+def available_formats():
+    """Formatos de exportación disponibles, comprimidos primero (Parquet requiere pyarrow)"""
+    return [name for name in FORMATS if name != 'Parquet' or pq is not None]
+
+
+def frame_chunks(df, chunk_rows=CHUNK_ROWS):
+    """Divide el DataFrame en bloques de filas sin copiarlo entero"""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def write_export(chunks, path, fmt):
+    """Escribe los bloques en el fichero indicado sin construirlo en memoria"""
+    if fmt == 'Parquet':
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                else:
+                    table = table.cast(writer.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        return path
+
+    opener = gzip.open if fmt == 'CSV comprimido (gzip)' else open
+    with opener(path, 'wt', newline='', encoding='utf-8') as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=(i == 0))
+    return path
+
+
+def _clean_spool():
+    """Elimina del directorio temporal las exportaciones antiguas"""
+    now = time.time()
+    for name in os.listdir(SPOOL_DIR):
+        path = os.path.join(SPOOL_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > SPOOL_MAX_AGE_SECONDS:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+@st.cache_resource
+def get_export_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix='export')
+
+
+def start_export(df, fmt):
+    """Lanza la exportación y devuelve un future con la ruta del fichero generado
+
+    Las exportaciones pequeñas se escriben en el momento; las grandes se
+    ejecutan en un hilo para que la interfaz siga respondiendo.
+    """
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    _clean_spool()
+    suffix = FORMATS[fmt][0]
+    path = os.path.join(SPOOL_DIR, f'{uuid.uuid4().hex}{suffix}')
+    if len(df) < BACKGROUND_ROWS:
+        future = Future()
+        try:
+            future.set_result(write_export(frame_chunks(df), path, fmt))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return get_export_executor().submit(write_export, frame_chunks(df), path, fmt)
+
+
+def _served(job_key, path):
+    """Tras la descarga se borra el fichero y se olvida el trabajo"""
+    st.session_state.pop(job_key, None)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def render_export(df, key, file_name, label="Exportar Datos"):
+    """Controles de exportación: formato, generación del fichero y descarga
+
+    El fichero se genera por bloques en disco, pero st.download_button no
+    admite streaming: lee el fichero entero en memoria del servidor al
+    mostrar el botón y en cada recarga mientras siga pendiente. Por eso el
+    formato por defecto es comprimido y los ficheros de más de
+    MAX_DOWNLOAD_MB no se sirven. El fichero se borra en cuanto se descarga;
+    si no se descarga, lo elimina la limpieza de SPOOL_MAX_AGE_SECONDS.
+    """
+    job_key = f'{key}_export_job'
+    col_format, col_button = st.columns([2, 1])
+    with col_format:
+        fmt = st.selectbox("Formato de exportación", available_formats(), key=f'{key}_export_format')
+    with col_button:
+        if st.button(label, key=f'{key}_export_button'):
+            previous = st.session_state.get(job_key)
+            if previous is not None and previous[1].done() and previous[1].exception() is None:
+                _served(job_key, previous[1].result())
+            st.session_state[job_key] = (fmt, start_export(df, fmt))
+
+    job = st.session_state.get(job_key)
+    if job is None:
+        return
+    fmt, future = job
+    if not future.done():
+        st.info("Generando el fichero de exportación en segundo plano...")
+        st.button("Actualizar estado", key=f'{key}_export_refresh')
+        return
+    error = future.exception()
+    if error is not None:
+        st.error(f"Error al exportar los datos: {error}")
+        return
+
+    suffix, mime = FORMATS[fmt]
+    path = future.result()
+    if not os.path.exists(path):
+        st.warning("El fichero exportado ya no está disponible, vuelve a generarlo.")
+        del st.session_state[job_key]
+        return
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    if size_mb > MAX_DOWNLOAD_MB:
+        st.warning(
+            f"El fichero ocupa {size_mb:.1f} MB y supera el límite de descarga ({MAX_DOWNLOAD_MB:.0f} MB). "
+            "Elige un formato comprimido o aplica más filtros."
+        )
+        _served(job_key, path)
+        return
+    with open(path, 'rb') as f:
+        st.download_button(
+            label=f"Descargar {fmt} ({size_mb:.1f} MB)",
+            data=f,
+            file_name=f'{file_name}{suffix}',
+            mime=mime,
+            key=f'{key}_export_download',
+            on_click=_served,
+            args=(job_key, path)
+        )
@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+import streamlit as st
+
+MAX_WORKERS = 8
+# Tiempo máximo de espera por el conjunto de orígenes; los que no respondan
+# se marcan como sin respuesta y la página se muestra sin ellos
+FANOUT_TIMEOUT_SECONDS = 60
+
+PENDING = '⏳ Pendiente'
+TIMED_OUT = '⌛ Sin respuesta'
+
+
+def run_progressive(tasks, on_update=None, max_workers=MAX_WORKERS, timeout=FANOUT_TIMEOUT_SECONDS,
+                    label="Consultando orígenes"):
+    """Ejecuta las tareas en paralelo y muestra los resultados según llegan
+
+    `tasks` es un dict {origen: función sin argumentos que devuelve una lista
+    de registros}. Las funciones se ejecutan en hilos, así que no deben usar
+    `st`: los errores se lanzan como excepciones y se muestran en la tabla de
+    estado. Cada vez que termina un origen se llama a `on_update(registros)`
+    desde el hilo del script con todos los registros recibidos hasta entonces;
+    no se llama mientras no haya ningún registro.
+
+    Devuelve (registros, errores) donde errores es {origen: mensaje}.
+    """
+    progress = st.progress(0.0, text=f"{label}: 0/{len(tasks)}")
+    status_placeholder = st.empty()
+    statuses = {source: PENDING for source in tasks}
+    records, errors = [], {}
+
+    def _show_status():
+        status_placeholder.dataframe(
+            pd.DataFrame({'Origen': list(statuses), 'Estado': list(statuses.values())}),
+            hide_index=True,
+            use_container_width=True
+        )
+
+    _show_status()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fanout')
+    try:
+        futures = {executor.submit(task): source for source, task in tasks.items()}
+        pending = set(futures)
+        deadline = time.monotonic() + timeout
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            updated = False
+            for future in done:
+                source = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors[source] = str(e)
+                    statuses[source] = f'❌ {e}'
+                    continue
+                records.extend(result)
+                statuses[source] = f'✅ {len(result)}'
+                # Los orígenes vacíos no cambian los resultados
+                updated = updated or bool(result)
+            finished = len(futures) - len(pending)
+            progress.progress(finished / len(futures), text=f"{label}: {finished}/{len(futures)}")
+            _show_status()
+            if updated and on_update is not None:
+                on_update(records)
+
+        for future in pending:
+            source = futures[future]
+            errors[source] = f'Sin respuesta en {timeout} s'
+            statuses[source] = TIMED_OUT
+        if pending:
+            _show_status()
+    finally:
+        # No se espera a los orígenes que no han respondido
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    progress.empty()
+    return records, errors
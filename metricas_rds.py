@@ -2,6 +2,7 @@ import streamlit as st
 import boto3
 from datetime import datetime, timedelta
 import pandas as pd
+from single_flight import coalesce
 
 def get_rds_instances(profile_name):
     """
@@ -11,7 +12,8 @@ def get_rds_instances(profile_name):
     rds_client = session.client('rds')
     
     try:
-        response = rds_client.describe_db_instances()
+        # Las sesiones que piden lo mismo a la vez comparten una sola llamada
+        response = coalesce(('describe_db_instances', profile_name), rds_client.describe_db_instances)
         instances = [instance['DBInstanceIdentifier'] for instance in response['DBInstances']]
         return instances
     except Exception as e:
@@ -41,7 +43,9 @@ def get_rds_metrics(profile_name, instance_identifier):
     
     for metric_name in metrics_to_fetch:
         try:
-            response = cloudwatch.get_metric_statistics(
+            response = coalesce(
+                ('get_metric_statistics', profile_name, instance_identifier, metric_name),
+                cloudwatch.get_metric_statistics,
                 Namespace='AWS/RDS',
                 MetricName=metric_name,
                 Dimensions=[
@@ -71,7 +75,9 @@ def get_rds_events(profile_name, instance_identifier):
     rds_client = session.client('rds')
     
     try:
-        response = rds_client.describe_events(
+        response = coalesce(
+            ('describe_events', profile_name, instance_identifier),
+            rds_client.describe_events,
             SourceType='DB_INSTANCE',
             SourceIdentifier=instance_identifier,
             Duration=720  # Eventos de las últimas 12 horas
@@ -2,12 +2,20 @@ import streamlit as st
 import boto3
 import pandas as pd
 from datetime import datetime, timedelta
+from swr_cache import swr_cache, format_age
+from single_flight import single_flight
+
+# Las instancias se sirven desde caché y se refrescan en segundo plano pasados
+# 5 minutos; pasada 1 hora sin refrescarse se vuelven a cargar esperando
+INSTANCES_SOFT_TTL = 5 * 60
+INSTANCES_HARD_TTL = 60 * 60
 
 # Configuración de AWS
 st.title("📊 Dashboard de Conexiones Activas en RDS")
 
 # Función para obtener instancias RDS
-@st.cache_data
+# swr_cache ya hace que las sesiones que cargan a la vez compartan una sola llamada
+@swr_cache(soft_ttl=INSTANCES_SOFT_TTL, hard_ttl=INSTANCES_HARD_TTL)
 def get_rds_instances():
     client = boto3.client("rds")
     response = client.describe_db_instances()
@@ -26,6 +34,7 @@ def get_rds_instances():
 
 # Obtener lista de instancias
 df_instances = get_rds_instances()
+st.caption(format_age(get_rds_instances.info()))
 
 # Mostrar DataFrame con checkboxes
 st.write("📌 Seleccione las instancias RDS:")
@@ -34,7 +43,9 @@ selected_rows = st.data_editor(df_instances, column_config={"Seleccionar": st.co
 # Filtrar las instancias seleccionadas
 selected_instances = selected_rows[selected_rows["Seleccionar"]]["ID"].tolist()
 
-# Función para obtener datos de conexiones desde CloudWatch
+# Función para obtener datos de conexiones desde CloudWatch; las sesiones que
+# consultan la misma instancia a la vez comparten la llamada
+@single_flight
 def get_rds_connections(instance_id):
     client = boto3.client("cloudwatch")
     end_time = datetime.utcnow()
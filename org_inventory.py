@@ -0,0 +1,141 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+from rate_limit import limited_call, CLIENT_CONFIG
+from single_flight import coalesce
+
+# Rol que el dashboard asume en cada cuenta de la organización
+DASHBOARD_ROLE_NAME = os.environ.get('DASHBOARD_ROLE_NAME', 'RoleParaDashboard')
+ROLE_SESSION_NAME = 'DashboardSession'
+# Cuentas consultadas a la vez; STS admite unas decenas de AssumeRole por segundo
+ASSUME_ROLE_WORKERS = 32
+# Las credenciales se renuevan este margen antes de caducar
+CREDENTIALS_MARGIN = timedelta(minutes=5)
+# Tiempo previsto por cuenta y región: AssumeRole más DescribeDBInstances
+# paginado, con margen para los reintentos por throttling
+TASK_SECONDS = 30
+
+
+def role_arn(account_id, role_name=DASHBOARD_ROLE_NAME):
+    return f"arn:aws:iam::{account_id}:role/{role_name}"
+
+
+def list_accounts(org_client, role_name=DASHBOARD_ROLE_NAME):
+    """Cuentas activas de la organización con el rol del dashboard de cada una
+
+    Devuelve registros con el mismo formato que LANDING_ZONE_ACCOUNTS.
+    """
+    accounts = []
+    for page in org_client.get_paginator('list_accounts').paginate():
+        for account in page['Accounts']:
+            if account.get('Status', 'ACTIVE') != 'ACTIVE':
+                continue
+            accounts.append({
+                'account_id': account['Id'],
+                'name': account.get('Name', account['Id']),
+                'role': role_arn(account['Id'], role_name),
+            })
+    return accounts
+
+
+def _boto3_client(service, region, credentials):
+    # Una sesión propia por llamada: la sesión por defecto de boto3 no se
+    # puede usar desde varios hilos a la vez
+    import boto3
+    session = boto3.session.Session(
+        aws_access_key_id=credentials['AccessKeyId'],
+        aws_secret_access_key=credentials['SecretAccessKey'],
+        aws_session_token=credentials['SessionToken'],
+        region_name=region,
+    )
+    return session.client(service, config=CLIENT_CONFIG)
+
+
+class AssumedRoleCredentials:
+    """Credenciales de AssumeRole por rol, reutilizadas hasta poco antes de caducar
+
+    Las peticiones concurrentes para el mismo rol comparten una sola llamada a
+    STS. `client_factory(service, region, credentials)` crea los clientes (sin
+    reintentos de botocore, ya que sus llamadas pasan por limited_call); se
+    puede sustituir para probar el fan-out con clientes simulados.
+    """
+
+    def __init__(self, sts_client, client_factory=_boto3_client, session_name=ROLE_SESSION_NAME):
+        self.sts_client = sts_client
+        self.client_factory = client_factory
+        self.session_name = session_name
+        self.credentials = {}
+        self.lock = threading.Lock()
+
+    def _assume(self, role):
+        return self.sts_client.assume_role(RoleArn=role, RoleSessionName=self.session_name)['Credentials']
+
+    def get(self, role):
+        with self.lock:
+            credentials = self.credentials.get(role)
+        if credentials is not None and credentials['Expiration'] - CREDENTIALS_MARGIN > datetime.now(timezone.utc):
+            return credentials
+        credentials = coalesce(('assume_role', id(self), role), self._assume, role)
+        with self.lock:
+            self.credentials[role] = credentials
+        return credentials
+
+    def client(self, account, service, region):
+        return self.client_factory(service, region, self.get(account['role']))
+
+
+def describe_account(credentials, account, region):
+    """Instancias RDS de una cuenta en una región; se ejecuta en un hilo, sin usar st"""
+    rds_client = credentials.client(account, 'rds', region)
+    instances = []
+    marker = None
+    while True:
+        kwargs = {'Marker': marker} if marker else {}
+        page = limited_call(
+            account['account_id'], region, 'DescribeDBInstances', rds_client.describe_db_instances, **kwargs
+        )
+        for db in page['DBInstances']:
+            instances.append({
+                'Cuenta': account['name'],
+                'AccountId': account['account_id'],
+                'Región': region,
+                'DBInstanceIdentifier': db['DBInstanceIdentifier'],
+                'Engine': db['Engine'],
+                'Status': db['DBInstanceStatus'],
+                'Clase': db['DBInstanceClass'],
+                'Endpoint': db.get('Endpoint', {}).get('Address', 'N/A'),
+                'Zona': db.get('AvailabilityZone', 'N/A'),
+            })
+        marker = page.get('Marker')
+        if not marker:
+            return instances
+
+
+def inventory_tasks(accounts, regions, credentials):
+    """{origen: función sin argumentos} por cuenta y región, para run_progressive"""
+    return {
+        f"{account['name']} ({account['account_id']}) / {region}":
+            (lambda account=account, region=region: describe_account(credentials, account, region))
+        for account in accounts
+        for region in regions
+    }
+
+
+def inventory_timeout(task_count, max_workers=ASSUME_ROLE_WORKERS):
+    """Espera máxima para el fan-out: TASK_SECONDS por cada tanda de max_workers tareas"""
+    return -(-task_count // max_workers) * TASK_SECONDS
+
+
+def collect_inventory(tasks, max_workers=ASSUME_ROLE_WORKERS):
+    """Ejecuta las tareas de inventory_tasks sin interfaz; devuelve (registros, errores)"""
+    records, errors = [], {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='org-inventory') as executor:
+        futures = {executor.submit(task): source for source, task in tasks.items()}
+        for future in as_completed(futures):
+            try:
+                records.extend(future.result())
+            except Exception as e:
+                errors[futures[future]] = str(e)
+    return records, errors
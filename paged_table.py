@@ -0,0 +1,109 @@
+import math
+
+import numpy as np
+import streamlit as st
+
+PAGE_SIZE = 50
+# Vistas (búsqueda + orden) que se conservan por tabla en la sesión
+MAX_CACHED_VIEWS = 4
+NO_SORT = '(sin orden)'
+
+
+class FramePageSource:
+    """Origen de páginas sobre un DataFrame ya cargado en memoria
+
+    El filtrado y la ordenación se calculan una sola vez por combinación de
+    búsqueda y orden y se guardan en la sesión como posiciones de fila; cambiar
+    de página solo extrae las filas visibles. Para aprovecharlo el DataFrame
+    debe ser el mismo objeto entre reruns (por ejemplo, cacheado como recurso);
+    con un DataFrame nuevo las vistas guardadas se descartan.
+    """
+
+    def __init__(self, df, key, columns=None):
+        self.df = df
+        self.key = key
+        self.columns = list(columns) if columns is not None else list(df.columns)
+        self.sortable_columns = self.columns
+
+    def _positions(self, search, sort_by, ascending):
+        # Las vistas se guardan junto al DataFrame del que salen: comparar el
+        # objeto (y no su id, que CPython reutiliza) evita aplicar posiciones
+        # de otro DataFrame
+        state = st.session_state.get(f'{self.key}_views')
+        if state is None or state['df'] is not self.df:
+            state = st.session_state[f'{self.key}_views'] = {'df': self.df, 'views': {}}
+        views = state['views']
+        signature = (search, sort_by, ascending)
+        if signature in views:
+            return views[signature]
+
+        positions = np.arange(len(self.df))
+        if search:
+            mask = np.zeros(len(self.df), dtype=bool)
+            for column in self.columns:
+                mask |= self.df[column].astype(str).str.contains(
+                    search, case=False, regex=False, na=False
+                ).to_numpy()
+            positions = positions[mask]
+        if sort_by:
+            values = self.df[sort_by].iloc[positions].reset_index(drop=True)
+            order = values.sort_values(ascending=ascending, na_position='last', kind='stable').index.to_numpy()
+            positions = positions[order]
+
+        if len(views) >= MAX_CACHED_VIEWS:
+            views.pop(next(iter(views)))
+        views[signature] = positions
+        return positions
+
+    def count(self, search):
+        return len(self._positions(search, None, True))
+
+    def page(self, search, sort_by, ascending, offset, limit):
+        positions = self._positions(search, sort_by, ascending)
+        return self.df[self.columns].iloc[positions[offset:offset + limit]]
+
+
+def render_paged_table(source, key, page_size=PAGE_SIZE, default_sort=None, default_ascending=True, searchable=True):
+    """Muestra una tabla paginada enviando al navegador solo la página visible
+
+    `source` debe ofrecer `columns`, `sortable_columns`, `count(search)` y
+    `page(search, sort_by, ascending, offset, limit)`, de modo que la búsqueda,
+    el orden y la paginación se resuelvan en el servidor. Con `searchable=False`
+    se omite la caja de búsqueda cuando el dashboard ya filtra por su cuenta.
+    """
+    col_search, col_sort, col_order = st.columns([3, 2, 1])
+    search = ''
+    if searchable:
+        with col_search:
+            search = st.text_input("Buscar", key=f'{key}_search').strip()
+    with col_sort:
+        sort_options = [NO_SORT] + list(source.sortable_columns)
+        sort_index = sort_options.index(default_sort) if default_sort in sort_options else 0
+        sort_by = st.selectbox("Ordenar por", sort_options, index=sort_index, key=f'{key}_sort')
+    with col_order:
+        order = st.radio(
+            "Orden", ["Asc", "Desc"],
+            index=0 if default_ascending else 1,
+            key=f'{key}_order',
+            horizontal=True
+        )
+
+    sort_by = None if sort_by == NO_SORT else sort_by
+    total = source.count(search)
+    pages = max(1, math.ceil(total / page_size))
+    page_key = f'{key}_page'
+    # Si la búsqueda reduce el número de páginas, volver a la última disponible
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    page = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, key=page_key)
+    offset = (page - 1) * page_size
+
+    st.dataframe(
+        source.page(search, sort_by, order == "Asc", offset, page_size),
+        use_container_width=True,
+        hide_index=True
+    )
+    if total:
+        st.caption(f"Mostrando {offset + 1}-{min(offset + page_size, total)} de {total} filas")
+    else:
+        st.caption("No hay filas que coincidan con la búsqueda")
@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Llamadas por segundo con las que empieza cada (cuenta, región, API); el
+# limitador sube o baja desde aquí según las respuestas de AWS
+DEFAULT_RATE = 10
+API_RATES = {
+    'GetMetricData': 25,
+    'GetMetricStatistics': 25,
+    'DescribeDBInstances': 5,
+    'DescribeEvents': 5,
+}
+MIN_RATE = 0.5
+# Aumento del ritmo tras cada llamada correcta
+RATE_STEP = 0.05
+MAX_RETRIES = 6
+BASE_BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 20
+
+# Configuración de los clientes cuyas llamadas pasan por limited_call: sin los
+# reintentos propios de botocore, el limitador ve cada throttle en cuanto
+# ocurre y cada intento es una sola petición
+CLIENT_CONFIG = Config(retries={'max_attempts': 1, 'mode': 'standard'})
+
+THROTTLE_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled',
+    'RequestThrottledException', 'RequestLimitExceeded', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'SlowDown',
+}
+# Errores transitorios del servicio que botocore reintentaría: se reintentan
+# aquí sin reducir el ritmo
+TRANSIENT_CODES = {'InternalFailure', 'InternalError', 'ServiceUnavailable', 'RequestTimeout', 'RequestTimeoutException'}
+
+
+class AdaptiveTokenBucket:
+    """Token bucket cuyo ritmo se adapta a los throttles de AWS
+
+    Cada throttle reduce el ritmo a la mitad; cada llamada correcta lo sube un
+    poco (aumento aditivo, reducción multiplicativa), de modo que el ritmo se
+    mantiene cerca de la cuota real sin conocerla de antemano.
+    """
+
+    def __init__(self, rate, max_rate=None):
+        self.rate = rate
+        self.max_rate = max_rate or rate * 2
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.throttles = 0
+
+    def _refill(self, now):
+        # Como mucho un segundo de ráfaga
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Espera hasta disponer de un token"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.calls += 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + RATE_STEP)
+
+    def on_throttle(self):
+        with self.lock:
+            self.throttles += 1
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+
+_BUCKETS = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def get_bucket(account, region, api):
+    """Limitador compartido por todo el proceso para (cuenta, región, API)"""
+    key = (account, region, api)
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None:
+            bucket = _BUCKETS[key] = AdaptiveTokenBucket(API_RATES.get(api, DEFAULT_RATE))
+        return bucket
+
+
+def is_throttle(error):
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in THROTTLE_CODES
+
+
+def limited_call(account, region, api, func, *args, **kwargs):
+    """Llama a func respetando el ritmo de (cuenta, región, API)
+
+    Los throttles no se devuelven como error: se reduce el ritmo y se
+    reintenta con backoff exponencial y jitter completo, hasta MAX_RETRIES.
+    Los errores transitorios del servicio también se reintentan, sin reducir
+    el ritmo, y los demás se lanzan sin reintentar. El cliente de func debe
+    crearse con CLIENT_CONFIG para que botocore no reintente por su cuenta.
+    """
+    bucket = get_bucket(account, region, api)
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            result = func(*args, **kwargs)
+        except ClientError as e:
+            transient = e.response.get('Error', {}).get('Code') in TRANSIENT_CODES
+            if not (is_throttle(e) or transient) or attempt == MAX_RETRIES:
+                raise
+            if not transient:
+                bucket.on_throttle()
+            time.sleep(random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt)))
+            continue
+        bucket.on_success()
+        return result
+
+
+def throttle_stats():
+    """Llamadas, throttles y ritmo actual de cada (cuenta, región, API)"""
+    with _BUCKETS_LOCK:
+        items = list(_BUCKETS.items())
+    return [
+        {
+            'Cuenta': account, 'Región': region, 'API': api,
+            'Llamadas': bucket.calls, 'Throttles': bucket.throttles, 'Ritmo (llamadas/s)': round(bucket.rate, 2)
+        }
+        for (account, region, api), bucket in items
+    ]
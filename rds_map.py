@@ -2,10 +2,22 @@ import streamlit as st
 import boto3
 import pandas as pd
 import plotly.express as px
-from botocore.exceptions import ProfileNotFound, ClientError
-import folium
-from streamlit_folium import folium_static
-import json
+from concurrent.futures import ThreadPoolExecutor
+from paged_table import FramePageSource, render_paged_table
+from export_utils import render_export
+from fanout import run_progressive, MAX_WORKERS
+from swr_cache import swr_cache, format_age
+from rate_limit import limited_call, throttle_stats, CLIENT_CONFIG
+from circuit_breaker import get_tracker, CircuitOpenError
+from single_flight import coalesce
+from region_catalog import get_region_catalog
+
+# Filas de la vista previa mientras siguen llegando regiones
+PREVIEW_ROWS = 500
+# El inventario se refresca en segundo plano pasados 10 minutos y se descarta
+# (y se vuelve a cargar mostrando el progreso) pasadas 6 horas
+INVENTORY_SOFT_TTL = 10 * 60
+INVENTORY_HARD_TTL = 6 * 60 * 60
 
 # Configurar la página
 st.set_page_config(
@@ -44,56 +56,182 @@ region_coordinates = {
     'eu-south-1': {'lat': 45.4642, 'lon': 9.1900},       # Milan
 }
 
-@st.cache_data
-def get_rds_instances():
-    """Obtener todas las instancias RDS de todos los perfiles"""
-    all_instances = []
+# Salud de cada (perfil, región); (perfil, ALL_REGIONS) es el propio perfil.
+# Los orígenes que fallan seguido se omiten y se sondean en segundo plano.
+ALL_REGIONS = '*'
+health = get_tracker('rds_map')
+
+def list_regions(profile):
+    """Regiones habilitadas para el perfil"""
+    session = boto3.Session(profile_name=profile)
+    ec2_client = session.client('ec2')
+    return [region['RegionName'] for region in ec2_client.describe_regions()['Regions']]
+
+def describe_region(profile, region):
+    """Instancias RDS de un perfil en una región; se ejecuta en un hilo, sin usar st"""
+    session = boto3.Session(profile_name=profile)
+    rds_client = session.client('rds', region_name=region, config=CLIENT_CONFIG)
+    
+    # Páginas pedidas una a una a través del limitador: ante un throttle se
+    # espera y se reintenta la página en lugar de perder la región entera
+    instances = []
+    marker = None
+    while True:
+        kwargs = {'Marker': marker} if marker else {}
+        page = limited_call(profile, region, 'DescribeDBInstances', rds_client.describe_db_instances, **kwargs)
+        for instance in page['DBInstances']:
+            instances.append({
+                'Profile': profile,
+                'Region': region,
+                'DBIdentifier': instance['DBInstanceIdentifier'],
+                'Engine': instance['Engine'],
+                'Status': instance['DBInstanceStatus'],
+                'Endpoint': instance.get('Endpoint', {}).get('Address', 'N/A'),
+                'Port': instance.get('Endpoint', {}).get('Port', 'N/A'),
+                'Latitude': region_coordinates.get(region, {}).get('lat', 0),
+                'Longitude': region_coordinates.get(region, {}).get('lon', 0)
+            })
+        marker = page.get('Marker')
+        if not marker:
+            return instances
+
+def scan_region(profile, region):
+    """describe_region anotando en el catálogo cuántas instancias tiene la región"""
+    instances = describe_region(profile, region)
+    get_region_catalog().record_scan(profile, region, len(instances))
+    return instances
+
+def profile_sources(profile, full_scan=False):
+    """(perfil, región) a consultar según el catálogo, sin las de circuito abierto
+
+    Salvo en un escaneo completo solo se incluyen las regiones con instancias
+    RDS o sin escanear todavía.
+    """
+    regions = health.call((profile, ALL_REGIONS), get_region_catalog().regions_to_query, profile, full_scan)
+    return [(profile, region) for region in regions if not health.is_open((profile, region))]
+
+def probe_source(source):
+    """Sondeo en segundo plano de un origen con el circuito abierto"""
+    profile, region = source
+    if region == ALL_REGIONS:
+        list_regions(profile)
+    else:
+        describe_region(profile, region)
+
+def _profile_sources(profile):
+    """(orígenes, error) de un perfil, sin lanzar el error"""
+    try:
+        return profile_sources(profile), None
+    except Exception as e:
+        return [], e
+
+def _describe_source(source):
+    """(instancias, error) de un origen, sin lanzar el error"""
+    try:
+        return health.call(source, scan_region, *source), None
+    except Exception as e:
+        return [], e
+
+def complete_full_scans(scanned_sources):
+    """Anota en el catálogo los perfiles cuyas regiones respondieron todas"""
+    catalog = get_region_catalog()
+    regions_by_profile = {}
+    for profile, region in scanned_sources:
+        regions_by_profile.setdefault(profile, set()).add(region)
+    for profile, regions in regions_by_profile.items():
+        catalog.complete_scan(profile, regions)
+
+# Todas las sesiones reciben el mismo DataFrame, así que la tabla paginada
+# conserva sus vistas entre reruns; el script no lo modifica
+@swr_cache(soft_ttl=INVENTORY_SOFT_TTL, hard_ttl=INVENTORY_HARD_TTL)
+def load_inventory():
+    """Inventario completo sin interfaz, usado para refrescarlo en segundo plano
+
+    Si falla algún perfil o región se lanza un error y la caché conserva el
+    inventario anterior en lugar de sustituirlo por uno incompleto. Los
+    orígenes con el circuito abierto no cuentan como fallo: ya se omiten en
+    todas las cargas. La primera carga, con el detalle de errores por región,
+    la hace get_rds_instances.
+    """
+    profiles = boto3.Session().available_profiles
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        profile_results = list(executor.map(_profile_sources, profiles))
+        sources = [source for sources, _ in profile_results for source in sources]
+        results = list(executor.map(_describe_source, sources))
+    complete_full_scans([source for source, (_, error) in zip(sources, results) if error is None])
+
+    errors = [(profile, error) for profile, (_, error) in zip(profiles, profile_results)]
+    errors += [(f"{profile} / {region}", error) for (profile, region), (_, error) in zip(sources, results)]
+    failed = [
+        f"{name}: {error}" for name, error in errors
+        if error is not None and not isinstance(error, CircuitOpenError)
+    ]
+    if failed:
+        raise RuntimeError(f"Inventario incompleto, {len(failed)} orígenes con error: " + '; '.join(failed[:5]))
+    return pd.DataFrame([record for records, _ in results for record in records])
+
+def get_rds_instances(results_placeholder, full_scan=False):
+    """Obtener todas las instancias RDS de todos los perfiles
+
+    Las regiones de todos los perfiles se consultan en paralelo y la vista
+    previa de resultados se actualiza cada vez que responde una región. Con
+    `full_scan` se consultan todas las regiones habilitadas, no solo las que
+    tenían instancias.
+    """
     profiles = boto3.Session().available_profiles
     
-    for profile in profiles:
-        try:
-            session = boto3.Session(profile_name=profile)
-            ec2_client = session.client('ec2')
-            regions = [region['RegionName'] for region in ec2_client.describe_regions()['Regions']]
-            
-            for region in regions:
-                try:
-                    rds_client = session.client('rds', region_name=region)
-                    instances = rds_client.describe_db_instances()
-                    
-                    for instance in instances['DBInstances']:
-                        all_instances.append({
-                            'Profile': profile,
-                            'Region': region,
-                            'DBIdentifier': instance['DBInstanceIdentifier'],
-                            'Engine': instance['Engine'],
-                            'Status': instance['DBInstanceStatus'],
-                            'Endpoint': instance['Endpoint']['Address'],
-                            'Port': instance['Endpoint']['Port'],
-                            'Latitude': region_coordinates.get(region, {}).get('lat', 0),
-                            'Longitude': region_coordinates.get(region, {}).get('lon', 0)
-                        })
-                except ClientError as e:
-                    st.warning(f"No se pudo acceder a la región {region} en el perfil {profile}: {str(e)}")
-                    continue
-                    
-        except ProfileNotFound:
-            st.warning(f"Perfil {profile} no encontrado")
-            continue
-        except Exception as e:
-            st.error(f"Error al procesar el perfil {profile}: {str(e)}")
-            continue
+    # Primero las regiones de cada perfil, que salen del catálogo salvo que haya caducado
+    region_tasks = {
+        profile: (lambda profile=profile: profile_sources(profile, full_scan))
+        for profile in profiles
+        if not health.is_open((profile, ALL_REGIONS))
+    }
+    sources, profile_errors = run_progressive(region_tasks, label="Perfiles")
+    for profile, message in profile_errors.items():
+        st.warning(f"Error al procesar el perfil {profile}: {message}")
+    
+    def _preview(records):
+        with results_placeholder.container():
+            render_results(pd.DataFrame(records), interactive=False)
+    
+    labels = {f"{profile} / {region}": (profile, region) for profile, region in sources}
+    tasks = {
+        label: (lambda source=source: health.call(source, scan_region, *source))
+        for label, source in labels.items()
+    }
+    records, errors = run_progressive(tasks, on_update=_preview, label="Regiones")
+    for source, message in errors.items():
+        st.warning(f"No se pudo acceder a {source}: {message}")
+    complete_full_scans([source for label, source in labels.items() if label not in errors])
     
-    return pd.DataFrame(all_instances)
+    results_placeholder.empty()
+    return pd.DataFrame(records)
 
-# Cargar datos
-df = get_rds_instances()
+def render_results(df, interactive=True):
+    """KPIs, tabla, mapa y gráfico de regiones
 
-if not df.empty:
+    Sin `interactive` no se crean widgets, de modo que la vista previa se
+    puede redibujar varias veces en la misma ejecución mientras llegan datos.
+    """
+    if df.empty:
+        st.info("No hay instancias RDS que mostrar.")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Instancias", len(df))
+    with col2:
+        st.metric("Perfiles", df['Profile'].nunique())
+    with col3:
+        st.metric("Regiones", df['Region'].nunique())
+    
     # Mostrar tabla de datos
     st.subheader("Tabla de Instancias RDS")
-    st.dataframe(df[['Profile', 'Region', 'DBIdentifier', 'Engine', 'Status', 'Endpoint', 'Port']], 
-                use_container_width=True)
+    columns = ['Profile', 'Region', 'DBIdentifier', 'Engine', 'Status', 'Endpoint', 'Port']
+    if interactive:
+        render_paged_table(FramePageSource(df, 'rds_instances', columns=columns), key='rds_instances')
+    else:
+        st.dataframe(df[columns].head(PREVIEW_ROWS), use_container_width=True, hide_index=True)
     
     # Crear mapa
     st.subheader("Distribución Global de Instancias RDS")
@@ -101,6 +239,10 @@ if not df.empty:
     # Agrupar por región para el tamaño de los marcadores
     region_counts = df.groupby(['Region', 'Latitude', 'Longitude']).size().reset_index(name='Count')
     
+    # folium solo se carga cuando hay instancias que mostrar en el mapa
+    import folium
+    from streamlit_folium import folium_static
+
     # Crear mapa base
     m = folium.Map(location=[20, 0], zoom_start=2)
     
@@ -129,14 +271,49 @@ if not df.empty:
     )
     st.plotly_chart(fig, use_container_width=True)
     
-    # Exportar datos
-    if st.button("Exportar Datos a CSV"):
-        csv = df.to_csv(index=False)
-        st.download_button(
-            label="Descargar CSV",
-            data=csv,
-            file_name="rds_instances.csv",
-            mime="text/csv"
-        )
+    if interactive:
+        # Exportar datos
+        render_export(df, 'rds_instances', file_name="rds_instances", label="Exportar Datos")
+
+# Cargar datos: el inventario en caché se muestra al momento aunque esté
+# refrescándose; sin caché se carga mostrando el progreso por región
+col_reload, col_scan = st.columns(2)
+if col_reload.button("Recargar inventario"):
+    load_inventory.clear()
+# Las cargas habituales solo consultan las regiones con instancias; el
+# escaneo completo recorre todas las habilitadas para descubrir las nuevas
+full_scan = col_scan.button("Escaneo completo de regiones")
+if full_scan:
+    load_inventory.clear()
+
+def first_load(results_placeholder, full_scan):
+    df = get_rds_instances(results_placeholder, full_scan)
+    load_inventory.prime(df)
+    return df
+
+df = load_inventory.peek()
+if df is None:
+    # Las sesiones que llegan con la caché vacía a la vez esperan a la
+    # primera carga en lugar de repetirla; una carga parcial y un escaneo
+    # completo devuelven resultados distintos y no se comparten
+    with st.spinner("Cargando inventario..."):
+        df = coalesce(('rds_map', 'first_load', full_scan), first_load, st.empty(), full_scan)
+st.caption(format_age(load_inventory.info()))
+
+# Orígenes omitidos por fallos recientes; los que cumplen su espera se sondean ahora
+health.probe_expired(probe_source)
+unhealthy = [row for row in health.report() if row['Abierto']]
+if unhealthy:
+    with st.expander(f"Orígenes omitidos por fallos recientes ({len(unhealthy)})"):
+        st.dataframe(pd.DataFrame(unhealthy).drop(columns='Abierto'), hide_index=True, use_container_width=True)
+
+# Ritmo al que el limitador deja llamar a cada cuenta y región tras los throttles
+throttles = [stats for stats in throttle_stats() if stats['Throttles']]
+if throttles:
+    with st.expander(f"Throttles de AWS ({sum(stats['Throttles'] for stats in throttles)})"):
+        st.dataframe(pd.DataFrame(throttles), hide_index=True, use_container_width=True)
+
+if not df.empty:
+    render_results(df)
 else:
-    st.error("No se encontraron instancias RDS en ningún perfil.") 
\ No newline at end of file
+    st.error("No se encontraron instancias RDS en ningún perfil.")
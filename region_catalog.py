@@ -0,0 +1,182 @@
+import os
+import sqlite3
+import time
+
+# Fichero SQLite con las regiones de cada perfil; se conserva entre reinicios
+REGION_CATALOG_DB = os.environ.get('REGION_CATALOG_DB', 'region_catalog.db')
+# Las regiones habilitadas de una cuenta cambian muy poco
+REGIONS_TTL_SECONDS = 7 * 24 * 3600
+# Pasado este tiempo sin escaneo completo se vuelven a consultar todas las regiones
+FULL_SCAN_TTL_SECONDS = 24 * 3600
+
+
+def discover_regions(profile):
+    """Regiones habilitadas y región por defecto del perfil, consultadas a AWS"""
+    import boto3
+    session = boto3.Session(profile_name=profile)
+    regions = [region['RegionName'] for region in session.client('ec2').describe_regions()['Regions']]
+    return regions, session.region_name
+
+
+class RegionCatalog:
+    """Regiones habilitadas por perfil y cuántas instancias RDS tenía cada una
+
+    Permite que las cargas habituales consulten solo las regiones donde hay
+    recursos (o que aún no se han escaneado) y que describe_regions se llame
+    una vez por semana en lugar de en cada carga.
+    """
+
+    def __init__(self, db_path=REGION_CATALOG_DB):
+        self.db_path = db_path
+        self.init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_db(self):
+        """Initialize the database and create tables if they don't exist"""
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS profiles (
+                profile TEXT PRIMARY KEY,
+                default_region TEXT,
+                regions_checked_at REAL,
+                full_scan_at REAL
+            )
+        ''')
+
+        # instance_count NULL: región habilitada que todavía no se ha escaneado
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS regions (
+                profile TEXT,
+                region TEXT,
+                instance_count INTEGER,
+                scanned_at REAL,
+                PRIMARY KEY (profile, region)
+            )
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def get_profile(self, profile):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT default_region, regions_checked_at, full_scan_at FROM profiles WHERE profile = ?', (profile,)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        if row is None:
+            return None
+        return {'default_region': row[0], 'regions_checked_at': row[1], 'full_scan_at': row[2]}
+
+    def save_regions(self, profile, regions, default_region):
+        """Sustituye las regiones habilitadas del perfil conservando los recuentos conocidos"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            f'DELETE FROM regions WHERE profile = ? AND region NOT IN ({",".join("?" * len(regions))})',
+            (profile, *regions)
+        )
+        cursor.executemany(
+            'INSERT OR IGNORE INTO regions (profile, region) VALUES (?, ?)',
+            [(profile, region) for region in regions]
+        )
+        cursor.execute('''
+            INSERT INTO profiles (profile, default_region, regions_checked_at) VALUES (?, ?, ?)
+            ON CONFLICT(profile) DO UPDATE SET
+                default_region = excluded.default_region,
+                regions_checked_at = excluded.regions_checked_at
+        ''', (profile, default_region, time.time()))
+        conn.commit()
+        conn.close()
+
+    def record_scan(self, profile, region, instance_count):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO regions (profile, region, instance_count, scanned_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(profile, region) DO UPDATE SET
+                instance_count = excluded.instance_count,
+                scanned_at = excluded.scanned_at
+        ''', (profile, region, instance_count, time.time()))
+        conn.commit()
+        conn.close()
+
+    def mark_full_scan(self, profile):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('UPDATE profiles SET full_scan_at = ? WHERE profile = ?', (time.time(), profile))
+        conn.commit()
+        conn.close()
+
+    def get_regions(self, profile, with_resources=False):
+        """Regiones habilitadas del perfil; con `with_resources` solo las que tenían
+        instancias RDS o no se han escaneado todavía"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        query = 'SELECT region FROM regions WHERE profile = ?'
+        if with_resources:
+            query += ' AND (instance_count IS NULL OR instance_count > 0)'
+        cursor.execute(query + ' ORDER BY region', (profile,))
+        regions = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return regions
+
+    def default_region(self, profile):
+        """Región por defecto del perfil sin crear una sesión cada vez"""
+        entry = self.get_profile(profile)
+        if entry is not None and entry['default_region'] is not None:
+            return entry['default_region']
+
+        import boto3
+        region = boto3.Session(profile_name=profile).region_name
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO profiles (profile, default_region) VALUES (?, ?)
+            ON CONFLICT(profile) DO UPDATE SET default_region = excluded.default_region
+        ''', (profile, region))
+        conn.commit()
+        conn.close()
+        return region
+
+    def regions_to_query(self, profile, full_scan=False):
+        """Regiones a consultar en una carga del inventario
+
+        Refresca las regiones habilitadas si han caducado. Devuelve todas si se
+        pide un escaneo completo o si el último tiene más de FULL_SCAN_TTL_SECONDS;
+        en otro caso solo las que tienen recursos.
+        """
+        now = time.time()
+        entry = self.get_profile(profile)
+        if entry is None or now - (entry['regions_checked_at'] or 0) > REGIONS_TTL_SECONDS:
+            self.save_regions(profile, *discover_regions(profile))
+            entry = self.get_profile(profile)
+        if full_scan or now - (entry['full_scan_at'] or 0) > FULL_SCAN_TTL_SECONDS:
+            return self.get_regions(profile)
+        return self.get_regions(profile, with_resources=True)
+
+    def complete_scan(self, profile, scanned_regions):
+        """Marca el escaneo completo del perfil si todas sus regiones habilitadas
+        respondieron en esta carga
+
+        Si alguna falló o se omitió, el escaneo completo se repite en la
+        siguiente carga en lugar de esperar FULL_SCAN_TTL_SECONDS.
+        """
+        regions = self.get_regions(profile)
+        if regions and set(regions) <= set(scanned_regions):
+            self.mark_full_scan(profile)
+
+
+_DEFAULT = {}
+
+
+def get_region_catalog():
+    """Instancia por proceso del catálogo configurado por entorno"""
+    if 'catalog' not in _DEFAULT:
+        _DEFAULT['catalog'] = RegionCatalog()
+    return _DEFAULT['catalog']
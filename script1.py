@@ -1,7 +1,6 @@
 import streamlit as st
 import boto3
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 
 # Configuración de AWS
@@ -52,7 +51,8 @@ if instance_id:
         st.write("📌 Datos históricos de conexiones:")
         st.dataframe(df)
 
-        # Crear gráfico de líneas
+        # Crear gráfico de líneas (matplotlib se carga solo si hay datos que dibujar)
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
         ax.plot(df["Tiempo"], df["Conexiones"], marker="o", linestyle="-", color="b")
         ax.set_xlabel("Tiempo")
@@ -2,6 +2,8 @@ import streamlit as st
 import boto3
 import pandas as pd
 from datetime import datetime, timedelta
+from fanout import run_progressive
+from rate_limit import limited_call, CLIENT_CONFIG
 
 # Configurar título
 st.title("📊 Dashboard de Conexiones en RDS")
@@ -17,11 +19,13 @@ if st.button("Consultar Conexiones"):
     if instance_id:
         # Función para obtener conexiones activas desde CloudWatch
         def get_rds_connections(instance_id):
-            client = boto3.client("cloudwatch")
+            client = boto3.client("cloudwatch", config=CLIENT_CONFIG)
             end_time = datetime.utcnow()
             start_time = end_time - timedelta(hours=1)  # Última hora
 
-            response = client.get_metric_statistics(
+            response = limited_call(
+                "default", client.meta.region_name, "GetMetricStatistics",
+                client.get_metric_statistics,
                 Namespace="AWS/RDS",
                 MetricName="DatabaseConnections",
                 Dimensions=[{"Name": "DBInstanceIdentifier", "Value": instance_id}],
@@ -62,35 +66,40 @@ if st.button("Consultar Conexiones"):
 
 # Botón para generar reporte de instancias en múltiples perfiles
 if st.button("Generar Reporte RDS"):
+    # Se ejecuta en un hilo por perfil: los errores se lanzan y se muestran en la tabla de estado
     def get_rds_instances_from_profile(profile):
-        try:
-            session = boto3.Session(profile_name=profile)
-            client = session.client("rds")
-            response = client.describe_db_instances()
-            instances = [
-                {
-                    "Perfil": profile,
-                    "ID": db.get("DBInstanceIdentifier", "N/A"),
-                    "Engine": db.get("Engine", "Desconocido"),
-                    "Estado": db.get("DBInstanceStatus", "Desconocido"),
-                    "Endpoint": db.get("Endpoint", {}).get("Address", "N/A"),
-                    "Puerto": db.get("Endpoint", {}).get("Port", "N/A"),
-                }
-                for db in response.get("DBInstances", [])
-            ]
-            return instances
-        except Exception as e:
-            st.error(f"⚠ Error en perfil {profile}: {e}")
-            return []
-
-    # Obtener instancias de todos los perfiles
-    all_instances = []
-    for profile in AWS_PROFILES:
-        all_instances.extend(get_rds_instances_from_profile(profile))
-
-    if all_instances:
-        df_report = pd.DataFrame(all_instances)
-        st.write("📋 Reporte de todas las instancias RDS en los perfiles configurados:")
-        st.dataframe(df_report)
-    else:
+        session = boto3.Session(profile_name=profile)
+        client = session.client("rds", config=CLIENT_CONFIG)
+        response = limited_call(profile, client.meta.region_name, 'DescribeDBInstances', client.describe_db_instances)
+        instances = [
+            {
+                "Perfil": profile,
+                "ID": db.get("DBInstanceIdentifier", "N/A"),
+                "Engine": db.get("Engine", "Desconocido"),
+                "Estado": db.get("DBInstanceStatus", "Desconocido"),
+                "Endpoint": db.get("Endpoint", {}).get("Address", "N/A"),
+                "Puerto": db.get("Endpoint", {}).get("Port", "N/A"),
+            }
+            for db in response.get("DBInstances", [])
+        ]
+        return instances
+
+    # El reporte crece según responde cada perfil
+    report_placeholder = st.empty()
+
+    def show_report(instances):
+        with report_placeholder.container():
+            st.write("📋 Reporte de todas las instancias RDS en los perfiles configurados:")
+            st.dataframe(pd.DataFrame(instances))
+
+    # Obtener instancias de todos los perfiles en paralelo
+    all_instances, errors = run_progressive(
+        {profile: (lambda profile=profile: get_rds_instances_from_profile(profile)) for profile in AWS_PROFILES},
+        on_update=show_report,
+        label="Perfiles"
+    )
+    for profile, error in errors.items():
+        st.error(f"⚠ Error en perfil {profile}: {error}")
+
+    if not all_instances:
         st.warning("⚠ No se encontraron instancias RDS en los perfiles configurados.")
@@ -0,0 +1,175 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+
+# Fichero SQLite compartido por todos los procesos (y réplicas del contenedor)
+# que montan el mismo volumen local
+SHARED_CACHE_PATH = os.environ.get(
+    'SHARED_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'dashboard_cache', 'shared_cache.db')
+)
+SHARED_CACHE_MAX_MB = int(os.environ.get('SHARED_CACHE_MAX_MB', '512'))
+
+
+class SharedCache:
+    """Caché de resultados en SQLite compartida entre procesos
+
+    Los valores se guardan serializados con pickle junto a su caducidad. SQLite
+    (en modo WAL) se encarga del bloqueo entre procesos; las escrituras usan
+    BEGIN IMMEDIATE para que la inserción y el desalojo sean atómicos. Cuando
+    el tamaño total supera `max_bytes` se eliminan las entradas usadas hace más
+    tiempo (LRU). Solo debe usarse en un volumen local: SQLite no garantiza el
+    bloqueo en sistemas de ficheros de red.
+    """
+
+    def __init__(self, db_path=SHARED_CACHE_PATH, max_bytes=SHARED_CACHE_MAX_MB * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def init_db(self):
+        """Initialize the database and create tables if they don't exist"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._connect()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB,
+                size INTEGER,
+                created REAL,
+                expires REAL,
+                last_access REAL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cache_access ON cache_entries (last_access)')
+
+        conn.close()
+
+    def get(self, key):
+        """Devuelve (valor, instante de creación) o None si no existe o ha caducado"""
+        now = time.time()
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT value, created FROM cache_entries WHERE key = ? AND expires > ?', (key, now))
+        row = cursor.fetchone()
+        if row is not None:
+            cursor.execute('UPDATE cache_entries SET last_access = ? WHERE key = ?', (now, key))
+        conn.close()
+        if row is None:
+            return None
+        try:
+            return pickle.loads(row[0]), row[1]
+        except Exception:
+            # Entrada escrita por otra versión del código: se ignora
+            return None
+
+    def set(self, key, value, ttl, created=None):
+        """Guarda el valor durante ttl segundos y aplica el límite de tamaño"""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return False
+        now = time.time()
+        created = created or now
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                INSERT OR REPLACE INTO cache_entries (key, value, size, created, expires, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, sqlite3.Binary(data), len(data), created, created + ttl, now))
+            self._evict(cursor, now)
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return True
+
+    def _evict(self, cursor, now):
+        cursor.execute('DELETE FROM cache_entries WHERE expires <= ?', (now,))
+        cursor.execute('SELECT COALESCE(SUM(size), 0) FROM cache_entries')
+        total = cursor.fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        cursor.execute('SELECT key, size FROM cache_entries ORDER BY last_access')
+        victims = []
+        for key, size in cursor.fetchall():
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        cursor.executemany('DELETE FROM cache_entries WHERE key = ?', victims)
+
+    def delete_prefix(self, prefix):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?', (len(prefix), prefix))
+        conn.close()
+
+    def stats(self):
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE expires > ?', (time.time(),))
+        entries, size = cursor.fetchone()
+        conn.close()
+        return {'entries': entries, 'size_mb': size / (1024 * 1024), 'max_mb': self.max_bytes / (1024 * 1024)}
+
+
+_DEFAULT = {}
+
+
+def get_shared_cache():
+    """Instancia por proceso de la caché compartida configurada por entorno"""
+    if 'cache' not in _DEFAULT:
+        _DEFAULT['cache'] = SharedCache()
+    return _DEFAULT['cache']
+
+
+def function_prefix(func):
+    return f'{func.__module__}.{func.__qualname__}:'
+
+
+def make_key(func, args, kwargs):
+    """Clave de la llamada; como en st.cache_data, los parámetros que empiezan
+    por '_' no forman parte de ella"""
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    params = tuple((name, value) for name, value in bound.arguments.items() if not name.startswith('_'))
+    return function_prefix(func) + hashlib.sha256(repr(params).encode()).hexdigest()
+
+
+def shared_cache(ttl):
+    """Decorador equivalente a st.cache_data(ttl=...) pero compartido entre procesos
+
+    Cada llamada devuelve una copia nueva (se deserializa), igual que
+    st.cache_data. `func.clear()` invalida las entradas de la función en
+    todos los procesos.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_shared_cache()
+            key = make_key(func, args, kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached[0]
+            value = func(*args, **kwargs)
+            cache.set(key, value, ttl)
+            return value
+
+        wrapper.clear = lambda: get_shared_cache().delete_prefix(function_prefix(func))
+        return wrapper
+    return decorator
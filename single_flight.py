@@ -0,0 +1,77 @@
+import functools
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Agrupa llamadas concurrentes con la misma clave en una sola ejecución
+
+    La primera llamada con una clave ejecuta la función; las que llegan
+    mientras tanto esperan a que termine y reciben el mismo resultado (o la
+    misma excepción). No es una caché: en cuanto la llamada termina, la
+    siguiente con esa clave vuelve a ejecutarse.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.stats = {'calls': 0, 'shared': 0}
+
+    def do(self, key, func, *args, **kwargs):
+        with self.lock:
+            self.stats['calls'] += 1
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+            else:
+                self.stats['shared'] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+
+# Grupo compartido por todas las sesiones del proceso de Streamlit
+_GROUP = SingleFlight()
+
+
+def coalesce(key, func, *args, **kwargs):
+    """Ejecuta func(*args, **kwargs) compartiendo el resultado con las llamadas
+    concurrentes de la misma clave
+
+    La clave debe identificar la consulta (API, perfil, región, parámetros...)
+    pero no los valores que cambian en cada llamada, como la hora actual.
+    Quien reciba el resultado no debe modificarlo, porque es el mismo objeto
+    para todas las sesiones que esperaban.
+    """
+    return _GROUP.do(key, func, *args, **kwargs)
+
+
+def single_flight(func):
+    """Decorador: las llamadas concurrentes con los mismos argumentos se agrupan
+
+    Los argumentos deben ser hashables.
+    """
+    name = (func.__module__, func.__qualname__)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return coalesce(name + args + tuple(sorted(kwargs.items())), func, *args, **kwargs)
+    return wrapper
+
+
+def coalesce_stats():
+    """Llamadas totales y cuántas reutilizaron una llamada en curso"""
+    with _GROUP.lock:
+        return dict(_GROUP.stats)
@@ -0,0 +1,208 @@
+import functools
+import hashlib
+import threading
+import time
+
+from single_flight import coalesce
+
+# Estado de todas las cachés del proceso, por módulo y nombre de la función.
+# Streamlit vuelve a ejecutar el script en cada rerun y crea funciones nuevas;
+# al guardar el estado aquí todas las sesiones y reruns comparten los valores.
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+class _Entry:
+    def __init__(self, value, loaded_at, load_seconds):
+        self.value = value
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+        self.refreshing = False
+        self.retry_after = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.last_error = None
+
+
+class SWRCache:
+    """Valores por clave que se sirven al momento y se refrescan en segundo plano
+
+    Pasado `soft_ttl` se sigue devolviendo el último valor y se lanza un hilo
+    que lo recarga; pasado `hard_ttl` el valor se descarta y la siguiente
+    llamada espera a la carga. El loader se ejecuta en hilos, así que no debe
+    usar `st`.
+
+    Con `shared` cada valor cargado se guarda también en la caché compartida
+    entre procesos (shared_cache.py), y un proceso sin el valor en memoria lo
+    toma de ahí antes de cargarlo, de modo que una réplica nueva arranca con
+    los datos de las demás.
+    """
+
+    def __init__(self, soft_ttl, hard_ttl, name=None, shared=False):
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.name = name
+        self.shared = shared
+        self.loader = None
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _shared_key(self, key):
+        return f'swr:{self.name}:' + hashlib.sha256(repr(key).encode()).hexdigest()
+
+    def _load(self, key, args, kwargs):
+        start = time.monotonic()
+        value = self.loader(*args, **kwargs)
+        load_seconds = time.monotonic() - start
+        if self.shared:
+            from shared_cache import get_shared_cache
+            get_shared_cache().set(self._shared_key(key), (value, load_seconds), self.hard_ttl)
+        return value, load_seconds
+
+    def _load_shared(self, key):
+        """Entrada cargada por otro proceso, o None"""
+        from shared_cache import get_shared_cache
+        cached = get_shared_cache().get(self._shared_key(key))
+        if cached is None:
+            return None
+        (value, load_seconds), created = cached
+        # La antigüedad se conserva: si ya pasó soft_ttl se refrescará en segundo plano
+        return _Entry(value, time.monotonic() - (time.time() - created), load_seconds)
+
+    def _refresh(self, key, args, kwargs):
+        try:
+            value, load_seconds = self._load(key, args, kwargs)
+        except Exception as e:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+                    entry.last_error = str(e)
+                    # No se reintenta hasta que pase otro soft_ttl
+                    entry.retry_after = time.monotonic() + self.soft_ttl
+            return
+        with self.lock:
+            old = self.entries.get(key)
+            entry = _Entry(value, time.monotonic(), load_seconds)
+            if old is not None:
+                entry.hits, entry.stale_hits, entry.refreshes = old.hits, old.stale_hits, old.refreshes + 1
+            self.entries[key] = entry
+
+    def _evict_expired(self, now):
+        for key in [k for k, e in self.entries.items() if now - e.loaded_at > self.hard_ttl]:
+            del self.entries[key]
+
+    def _lookup(self, key, args, kwargs, shared_entry=None):
+        """Entrada válida de la clave (lanzando el refresco si hace falta) o None"""
+        now = time.monotonic()
+        with self.lock:
+            self._evict_expired(now)
+            if shared_entry is not None:
+                self.entries.setdefault(key, shared_entry)
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            entry.hits += 1
+            if now - entry.loaded_at > self.soft_ttl:
+                entry.stale_hits += 1
+                if not entry.refreshing and now >= entry.retry_after:
+                    entry.refreshing = True
+                    threading.Thread(
+                        target=self._refresh, args=(key, args, kwargs),
+                        name='swr-refresh', daemon=True
+                    ).start()
+            return entry
+
+    def get(self, key, args, kwargs, load=True):
+        """Valor de la clave; con load=False devuelve None si no hay valor válido"""
+        entry = self._lookup(key, args, kwargs)
+        if entry is None and self.shared:
+            shared_entry = self._load_shared(key)
+            if shared_entry is not None:
+                entry = self._lookup(key, args, kwargs, shared_entry)
+        if entry is not None:
+            return entry.value
+        if not load:
+            return None
+
+        # Sin valor en caché, las llamadas concurrentes con la misma clave
+        # esperan a una sola carga
+        value, load_seconds = coalesce(('swr', self.name, key), self._load, key, args, kwargs)
+        self.put(key, value, load_seconds)
+        return value
+
+    def put(self, key, value, load_seconds=0.0):
+        with self.lock:
+            self.entries[key] = _Entry(value, time.monotonic(), load_seconds)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def info(self, key):
+        """Métricas de la clave: antigüedad, duración de la última carga, refrescos y errores"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            return {
+                'age_seconds': time.monotonic() - entry.loaded_at,
+                'load_seconds': entry.load_seconds,
+                'refreshing': entry.refreshing,
+                'refreshes': entry.refreshes,
+                'hits': entry.hits,
+                'stale_hits': entry.stale_hits,
+                'last_error': entry.last_error,
+            }
+
+
+def _make_key(args, kwargs):
+    return args + tuple(sorted(kwargs.items()))
+
+
+def swr_cache(soft_ttl, hard_ttl, shared=False):
+    """Decorador de caché stale-while-revalidate compartida por todo el proceso
+
+    Los argumentos de la función deben ser hashables y, con `shared`, tener un
+    repr estable para que la clave coincida entre procesos. Además de llamarla, la
+    función decorada ofrece:
+
+    - `peek(*args)`: valor en caché o None, sin cargar (también lanza el
+      refresco en segundo plano si el valor ha pasado soft_ttl)
+    - `prime(value, *args)`: guarda un valor cargado por otra vía
+    - `info(*args)`: métricas de la entrada (antigüedad, duración de la carga...)
+    - `clear()`: vacía la caché
+    """
+    def decorator(func):
+        name = (func.__module__, func.__qualname__)
+        with _CACHES_LOCK:
+            cache = _CACHES.get(name)
+            if cache is None:
+                cache = _CACHES[name] = SWRCache(soft_ttl, hard_ttl, '.'.join(name), shared)
+            cache.soft_ttl, cache.hard_ttl, cache.shared = soft_ttl, hard_ttl, shared
+            # La versión más reciente de la función es la que recarga
+            cache.loader = func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache.get(_make_key(args, kwargs), args, kwargs)
+
+        wrapper.peek = lambda *args, **kwargs: cache.get(_make_key(args, kwargs), args, kwargs, load=False)
+        wrapper.prime = lambda value, *args, **kwargs: cache.put(_make_key(args, kwargs), value)
+        wrapper.info = lambda *args, **kwargs: cache.info(_make_key(args, kwargs))
+        wrapper.clear = cache.clear
+        return wrapper
+    return decorator
+
+
+def format_age(info):
+    """Texto corto con la antigüedad de los datos para mostrar en el dashboard"""
+    if info is None:
+        return "Sin datos en caché"
+    text = f"Datos de hace {int(info['age_seconds'])} s (carga de {info['load_seconds']:.1f} s)"
+    if info['refreshing']:
+        text += ", actualizando en segundo plano"
+    if info['last_error']:
+        text += f". Último refresco fallido: {info['last_error']}"
+    return text
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('streamlit_authenticator')
+from streamlit.testing.v1 import AppTest
+
+DASH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dash')
+
+SCRIPT = f'''
+import sys
+sys.path.insert(0, {DASH_DIR!r})
+import auth
+if auth.login():
+    auth.logout()
+'''
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # auth.py usa config.yaml en el directorio de trabajo por defecto
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delitem(sys.modules, 'auth', raising=False)
+    return AppTest.from_string(SCRIPT, default_timeout=30)
+
+
+def test_login_form_reuses_authenticator_and_hashed_config(app, tmp_path):
+    app.run()
+    assert not app.exception
+    assert [field.label for field in app.text_input] == ['Usuario', 'Contraseña']
+    config = tmp_path / 'config.yaml'
+    created = config.stat().st_mtime_ns
+    credentials, authenticator = app.session_state['_authenticator']
+
+    app.run()
+    assert not app.exception
+    # El fichero no se vuelve a cifrar ni a escribir y el autenticador se reutiliza
+    assert config.stat().st_mtime_ns == created
+    assert app.session_state['_authenticator'][0] is credentials
+    assert app.session_state['_authenticator'][1] is authenticator
+
+
+def test_login_with_cached_credentials(app):
+    app.run()
+    app.text_input[0].input('admin')
+    app.text_input[1].input('admin123')
+    app.button[0].click().run()
+    assert not app.exception
+    assert any('Bienvenido' in message.value for message in app.success)
@@ -0,0 +1,141 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import boto3
+from botocore.stub import Stubber
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import org_inventory
+from org_inventory import AssumedRoleCredentials, collect_inventory, inventory_tasks, list_accounts
+
+
+def _client(service):
+    return boto3.session.Session(
+        aws_access_key_id='test', aws_secret_access_key='test', region_name='us-east-1'
+    ).client(service)
+
+
+def _credentials(expires_in):
+    return {
+        'AccessKeyId': 'AKIAEXAMPLEEXAMPLE',
+        'SecretAccessKey': 'secret',
+        'SessionToken': 'token',
+        'Expiration': datetime.now(timezone.utc) + expires_in,
+    }
+
+
+def _account(account_id, status='ACTIVE'):
+    return {
+        'Id': account_id,
+        'Arn': f'arn:aws:organizations::000000000000:account/o-example/{account_id}',
+        'Email': f'{account_id}@example.com',
+        'Name': f'Cuenta {account_id}',
+        'Status': status,
+    }
+
+
+class FakeRDS:
+    """Cliente RDS con dos páginas por cuenta y región"""
+
+    def __init__(self, account_id, region):
+        self.prefix = f'{account_id}-{region}'
+
+    def describe_db_instances(self, **kwargs):
+        page = 2 if 'Marker' in kwargs else 1
+        response = {'DBInstances': [{
+            'DBInstanceIdentifier': f'{self.prefix}-db{page}',
+            'Engine': 'postgres',
+            'DBInstanceStatus': 'available',
+            'DBInstanceClass': 'db.t3.micro',
+        }]}
+        if page == 1:
+            response['Marker'] = 'next'
+        return response
+
+
+def test_list_accounts_pages_and_skips_inactive():
+    org = _client('organizations')
+    with Stubber(org) as stubber:
+        stubber.add_response('list_accounts', {'Accounts': [_account('111111111111')], 'NextToken': 'page2'}, {})
+        stubber.add_response(
+            'list_accounts',
+            {'Accounts': [_account('222222222222'), _account('333333333333', 'SUSPENDED')]},
+            {'NextToken': 'page2'}
+        )
+        accounts = list_accounts(org)
+        stubber.assert_no_pending_responses()
+
+    assert [account['account_id'] for account in accounts] == ['111111111111', '222222222222']
+    assert accounts[0]['role'] == 'arn:aws:iam::111111111111:role/RoleParaDashboard'
+
+
+def test_credentials_are_reused_until_close_to_expiry():
+    sts = _client('sts')
+    role = 'arn:aws:iam::111111111111:role/RoleParaDashboard'
+    expected = {'RoleArn': role, 'RoleSessionName': 'DashboardSession'}
+    with Stubber(sts) as stubber:
+        stubber.add_response('assume_role', {'Credentials': _credentials(timedelta(minutes=2))}, expected)
+        stubber.add_response('assume_role', {'Credentials': _credentials(timedelta(hours=1))}, expected)
+        credentials = AssumedRoleCredentials(sts)
+
+        # Caduca dentro del margen de renovación: la segunda llamada vuelve a STS
+        credentials.get(role)
+        fresh = credentials.get(role)
+        assert credentials.get(role) is fresh
+        stubber.assert_no_pending_responses()
+
+
+def test_fanout_assumes_each_role_once_with_bounded_concurrency(monkeypatch):
+    monkeypatch.setattr(org_inventory, 'limited_call', lambda account, region, api, func, **kwargs: func(**kwargs))
+    lock = threading.Lock()
+    assumed, active, peak = [], [0], [0]
+
+    class FakeSTS:
+        def assume_role(self, RoleArn, RoleSessionName):
+            with lock:
+                assumed.append(RoleArn)
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            return {'Credentials': _credentials(timedelta(hours=1))}
+
+    accounts = [
+        {'account_id': f'{n:012d}', 'name': f'Cuenta {n}', 'role': org_inventory.role_arn(f'{n:012d}')}
+        for n in range(40)
+    ]
+    credentials = AssumedRoleCredentials(
+        FakeSTS(),
+        client_factory=lambda service, region, creds: FakeRDS(creds['AccessKeyId'], region)
+    )
+    records, errors = collect_inventory(
+        inventory_tasks(accounts, ['us-east-1', 'eu-west-1'], credentials), max_workers=8
+    )
+
+    assert errors == {}
+    assert len(records) == 40 * 2 * 2
+    assert sorted(assumed) == sorted(account['role'] for account in accounts)
+    assert peak[0] <= 8
+
+
+def test_fanout_reports_failing_accounts():
+    class DeniedSTS:
+        def assume_role(self, RoleArn, RoleSessionName):
+            raise RuntimeError('AccessDenied')
+
+    account = {'account_id': '111111111111', 'name': 'Cuenta', 'role': org_inventory.role_arn('111111111111')}
+    records, errors = collect_inventory(inventory_tasks([account], ['us-east-1'], AssumedRoleCredentials(DeniedSTS())))
+
+    assert records == []
+    assert errors == {'Cuenta (111111111111) / us-east-1': 'AccessDenied'}
+
+
+
+def test_inventory_timeout_grows_with_the_number_of_waves():
+    assert org_inventory.inventory_timeout(1) == org_inventory.TASK_SECONDS
+    assert org_inventory.inventory_timeout(32) == org_inventory.TASK_SECONDS
+    assert org_inventory.inventory_timeout(1000, max_workers=32) == 32 * org_inventory.TASK_SECONDS
@@ -0,0 +1,40 @@
+import importlib.util
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import check_startup
+from check_startup import BUDGETS_MS, ROOT, measure_script, run_importtime
+
+
+@pytest.fixture(scope='module')
+def baseline():
+    return {name for _, name in run_importtime('pass', ROOT)}
+
+
+def _uninstalled_dependency(error, script):
+    """Dependencia de terceros que falta, o None si el fallo es del propio código"""
+    match = re.match(r"ModuleNotFoundError: No module named '([\w.]+)'", str(error))
+    if match is None:
+        return None
+    name = match.group(1).split('.')[0]
+    local_dirs = {ROOT, os.path.dirname(os.path.join(ROOT, script))}
+    if any(os.path.exists(os.path.join(d, f'{name}.py')) for d in local_dirs) or importlib.util.find_spec(name):
+        return None
+    return name
+
+
+@pytest.mark.parametrize('script', sorted(BUDGETS_MS))
+def test_startup_within_budget(script, baseline):
+    try:
+        total, heaviest = measure_script(script, baseline, runs=check_startup.RUNS)
+    except RuntimeError as e:
+        missing = _uninstalled_dependency(e, script)
+        if missing is None:
+            raise
+        pytest.skip(f"{missing} no está instalado")
+    slowest = ', '.join(f'{name} {ms:.0f} ms' for ms, name in heaviest)
+    assert total <= BUDGETS_MS[script], f"{script}: {total:.0f} ms > {BUDGETS_MS[script]} ms ({slowest})"
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dash'))
+from task_definition_cache import TaskDefinitionCache
+
+
+def _definition(family, revision, images):
+    return {
+        'taskDefinitionArn': f'arn:aws:ecs:us-east-1:111111111111:task-definition/{family}:{revision}',
+        'family': family,
+        'revision': revision,
+        'containerDefinitions': [{'name': f'c{n}', 'image': image} for n, image in enumerate(images)],
+    }
+
+
+def _fill(cache):
+    cache.put(_definition('web_app', 1, ['nginx:1.25', 'repo/sidecar:2']))
+    cache.put(_definition('web_app', 2, ['nginx:1.27']))
+    cache.put(_definition('webxapp', 1, ['busybox:latest']))
+    cache.put(_definition('billing-50%', 3, ['Repo/Billing:3']))
+
+
+def _arns(rows):
+    return sorted((row['arn'], row['container']) for row in rows)
+
+
+def test_indexed_search_matches_like_scan(tmp_path):
+    indexed = TaskDefinitionCache(str(tmp_path / 'fts.db'))
+    scanned = TaskDefinitionCache(str(tmp_path / 'like.db'))
+    scanned.fts = False
+    _fill(indexed)
+    _fill(scanned)
+
+    for term in ['web_', 'nginx', 'repo/', 'REPO', '50%', 'app', 'zz', 'no-match', 'a"b']:
+        assert _arns(indexed.search(term)) == _arns(scanned.search(term)), term
+    assert {row['family'] for row in indexed.search('web_')} == {'web_app'}
+    assert {row['family'] for row in indexed.search('50%')} == {'billing-50%'}
+
+
+def test_put_replaces_indexed_images(tmp_path):
+    cache = TaskDefinitionCache(str(tmp_path / 'td.db'))
+    cache.put(_definition('api', 1, ['python:3.11']))
+    cache.put(_definition('api', 1, ['python:3.12']))
+
+    assert cache.search('3.11') == []
+    assert [row['image'] for row in cache.search('python')] == ['python:3.12']
+
+
+def test_existing_cache_is_indexed_on_open(tmp_path):
+    path = str(tmp_path / 'td.db')
+    old = TaskDefinitionCache(path)
+    old.fts = False
+    _fill(old)
+    conn = sqlite3.connect(path)
+    conn.execute('DROP TABLE task_definition_search')
+    conn.commit()
+    conn.close()
+
+    cache = TaskDefinitionCache(path)
+    assert {row['image'] for row in cache.search('nginx')} == {'nginx:1.25', 'nginx:1.27'}